@@ -0,0 +1,610 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, List, Any, AsyncIterator, Tuple, Union
+import aiohttp
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+from config import Config
+from rate_limiter import RateLimiter, get_retry_after
+from thread_registry import ThreadRegistry, MemoryThreadRegistry, create_thread_registry, sqlite_path
+from thread_cache import ThreadMessageCache
+from instrumentation import Hook, call_event, emit
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AsyncSlackThreadClient:
+    """
+    asyncio counterpart of SlackThreadClient.
+
+    All API calls share one long-lived aiohttp session, so connections are
+    kept alive and reused and many sends can be in flight on one event loop.
+    Use it as an async context manager, or call close() when done.
+
+    Lookups in a persistent thread registry and the message cache are
+    SQLite queries, so they run in a worker thread via asyncio.to_thread
+    instead of blocking the event loop.
+    """
+
+    def __init__(
+        self,
+        token: str = None,
+        base_url: str = None,
+        max_connections: int = None,
+        keepalive_timeout: float = None,
+        timeout: int = 30,
+        rate_limiter: RateLimiter = None,
+        max_retries: int = None,
+        thread_registry: ThreadRegistry = None,
+        message_cache: ThreadMessageCache = None,
+        hooks: List[Hook] = None
+    ):
+        self.token = token or Config.SLACK_BOT_TOKEN
+        self.max_connections = max_connections or Config.SLACK_MAX_CONNECTIONS
+        self.keepalive_timeout = keepalive_timeout or Config.SLACK_KEEPALIVE_TIMEOUT
+        self.client = AsyncWebClient(
+            token=self.token,
+            base_url=base_url or Config.SLACK_API_BASE_URL or AsyncWebClient.BASE_URL,
+            timeout=timeout
+        )
+        self.default_channel = Config.SLACK_CHANNEL_ID
+        self.active_threads = (
+            create_thread_registry() if thread_registry is None else thread_registry
+        )
+        self.message_cache = message_cache
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = Config.SLACK_MAX_RETRIES if max_retries is None else max_retries
+        self.hooks = list(hooks or [])
+        self._session = None
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """
+        Create the shared aiohttp session on first use
+
+        The session has to be created inside a running event loop, so it is
+        built lazily rather than in __init__.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self.client.session = self._session
+        return self._session
+
+    async def close(self):
+        """
+        Close the shared HTTP session and release pooled connections
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self.client.session = None
+
+    async def _blocking(self, func, *args):
+        """
+        Run a registry or cache call without blocking the event loop
+
+        Args:
+            func: Callable that may do SQLite I/O
+            *args: Arguments for func
+
+        Returns:
+            Whatever func returns
+        """
+        if isinstance(getattr(func, '__self__', None), MemoryThreadRegistry):
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    async def _api_call(self, method: str, **kwargs):
+        """
+        Call a Web API method through the rate limiter
+
+        Args:
+            method: Web API method name, e.g. 'chat.postMessage'
+            **kwargs: Arguments for the AsyncWebClient method
+
+        Returns:
+            AsyncSlackResponse from the AsyncWebClient
+        """
+        self._ensure_session()
+        api = getattr(self.client, method.replace('.', '_'))
+        channel = kwargs.get('channel') or kwargs.get('channels')
+        attempt = 0
+        waited = 0.0
+        error = None
+        start = time.perf_counter()
+
+        try:
+            while True:
+                waited += await self.rate_limiter.acquire_async(method, channel)
+                try:
+                    return await api(**kwargs)
+                except SlackApiError as e:
+                    retry_after = get_retry_after(e)
+                    if retry_after is None or attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    logger.warning("Rate limited on %s, retrying in %ss", method, retry_after)
+                    self.rate_limiter.backoff(method, retry_after, channel)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.hooks:
+                emit(self.hooks, call_event(
+                    method, channel, kwargs, time.perf_counter() - start, waited, attempt, error
+                ))
+
+    async def send_message(
+        self,
+        text: str,
+        channel: str = None,
+        thread_ts: str = None,
+        blocks: List[Dict] = None,
+        attachments: List[Dict] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Send a message to Slack channel or thread
+
+        Args:
+            text: Message text
+            channel: Channel ID (defaults to configured channel)
+            thread_ts: Thread timestamp for threading
+            blocks: Slack blocks for rich formatting
+            attachments: Message attachments
+
+        Returns:
+            Response with thread_ts for future replies
+        """
+        try:
+            channel = channel or self.default_channel
+
+            response = await self._api_call(
+                'chat.postMessage',
+                channel=channel,
+                text=text,
+                thread_ts=thread_ts,
+                blocks=blocks,
+                attachments=attachments
+            )
+
+            result = {
+                'ok': True,
+                'channel': response['channel'],
+                'ts': response['ts'],
+                'thread_ts': thread_ts or response['ts'],
+                'message': response.get('message', {})
+            }
+
+            if not thread_ts:
+                logger.info("New message sent. Thread ID: %s", response['ts'])
+                await self._blocking(self.active_threads.set, response['ts'], {
+                    'channel': channel,
+                    'initial_message': text[:100]
+                })
+            else:
+                logger.info("Reply added to thread: %s", thread_ts)
+
+            return result
+
+        except SlackApiError as e:
+            logger.error("Slack API Error: %s", e.response['error'])
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            logger.error("Unexpected error sending message: %s", e)
+            return {'ok': False, 'error': str(e)}
+
+    async def start_thread(
+        self,
+        initial_message: str,
+        channel: str = None,
+        blocks: List[Dict] = None
+    ) -> Optional[str]:
+        """
+        Create a new thread and return thread_ts for future replies
+
+        Args:
+            initial_message: The first message in the thread
+            channel: Channel ID
+            blocks: Slack blocks for rich formatting
+
+        Returns:
+            Thread timestamp (use this for future replies)
+        """
+        response = await self.send_message(
+            text=initial_message,
+            channel=channel,
+            blocks=blocks
+        )
+
+        if response and response.get('ok'):
+            thread_ts = response['ts']
+            logger.info("Thread started with ID: %s", thread_ts)
+            return thread_ts
+        return None
+
+    async def reply_to_thread(
+        self,
+        thread_ts: str,
+        text: str,
+        channel: str = None,
+        blocks: List[Dict] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Reply to an existing thread using thread_ts
+
+        Args:
+            thread_ts: Thread timestamp from initial message
+            text: Reply message text
+            channel: Channel ID (must match original thread channel)
+            blocks: Slack blocks for rich formatting
+
+        Returns:
+            Response from Slack API
+        """
+        if not channel:
+            thread = await self._blocking(self.active_threads.get, thread_ts)
+            channel = thread['channel'] if thread else self.default_channel
+
+        return await self.send_message(
+            text=text,
+            channel=channel,
+            thread_ts=thread_ts,
+            blocks=blocks
+        )
+
+    async def send_batch_to_thread(
+        self,
+        thread_ts: str,
+        messages: List[str],
+        channel: str = None,
+        delay_seconds: float = 0
+    ) -> List[Dict]:
+        """
+        Send multiple messages to a thread, in order
+
+        Args:
+            thread_ts: Thread timestamp
+            messages: List of message texts
+            channel: Channel ID
+            delay_seconds: Extra delay between messages
+
+        Returns:
+            List of responses
+        """
+        responses = []
+
+        for i, message in enumerate(messages):
+            response = await self.reply_to_thread(
+                thread_ts=thread_ts,
+                text=message,
+                channel=channel
+            )
+            responses.append(response)
+            if delay_seconds > 0 and i < len(messages) - 1:
+                await asyncio.sleep(delay_seconds)
+
+        return responses
+
+    async def _resolve_target(self, target: Union[str, Tuple[str, str]]) -> Tuple[str, str]:
+        """
+        Turn a broadcast target into a (channel, thread_ts) pair
+
+        Args:
+            target: thread_ts, or (channel, thread_ts) tuple
+
+        Returns:
+            (channel, thread_ts)
+        """
+        if isinstance(target, str):
+            thread = await self._blocking(self.active_threads.get, target)
+            return (thread['channel'] if thread else self.default_channel), target
+        return target[0], target[1]
+
+    async def broadcast_to_threads(
+        self,
+        targets: List[Union[str, Tuple[str, str]]],
+        text: str,
+        blocks: List[Dict] = None,
+        max_workers: int = 8
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Post the same reply to many threads concurrently
+
+        Same semantics as SlackThreadClient.broadcast_to_threads: one task
+        per channel, at most max_workers channels at once, per-channel
+        order preserved, results yielded as they complete.
+
+        Args:
+            targets: thread_ts values, or (channel, thread_ts) tuples
+            text: Reply message text
+            blocks: Slack blocks for rich formatting
+            max_workers: Maximum number of channels sent to at once
+
+        Returns:
+            Async iterator of send_message result dicts
+        """
+        by_channel = {}
+        for target in targets:
+            channel, thread_ts = await self._resolve_target(target)
+            by_channel.setdefault(channel, []).append(thread_ts)
+
+        results = asyncio.Queue()
+        workers = asyncio.Semaphore(max(1, max_workers))
+
+        async def send_channel(channel, thread_list):
+            async with workers:
+                for thread_ts in thread_list:
+                    try:
+                        result = await self.send_message(
+                            text=text,
+                            channel=channel,
+                            thread_ts=thread_ts,
+                            blocks=blocks
+                        ) or {'ok': False, 'error': 'no response'}
+                    except Exception as e:
+                        # Every target must produce a result or the caller waits forever
+                        logger.error("Unexpected error broadcasting to thread %s: %s", thread_ts, e)
+                        result = {'ok': False, 'error': str(e)}
+                    result.setdefault('channel', channel)
+                    result.setdefault('thread_ts', thread_ts)
+                    await results.put(result)
+
+        total = sum(len(thread_list) for thread_list in by_channel.values())
+        tasks = [
+            asyncio.ensure_future(send_channel(channel, thread_list))
+            for channel, thread_list in by_channel.items()
+        ]
+
+        try:
+            for _ in range(total):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def iter_thread_replies(
+        self,
+        channel: str,
+        thread_ts: str,
+        page_size: int = 200,
+        prefetch: bool = False,
+        oldest: str = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Iterate over every message in a thread, one page at a time
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+            page_size: Messages requested per conversations.replies call
+            prefetch: Request the next page while the caller is processing
+                the current one
+            oldest: Only return replies newer than this ts
+
+        Returns:
+            Async iterator of messages, parent message first
+
+        Raises:
+            SlackApiError: If a page cannot be fetched
+        """
+        def fetch(cursor):
+            return asyncio.ensure_future(self._api_call(
+                'conversations.replies',
+                channel=channel,
+                ts=thread_ts,
+                limit=page_size,
+                cursor=cursor,
+                oldest=oldest
+            ))
+
+        pending = None
+        count = 0
+
+        try:
+            response = await fetch(None)
+            while True:
+                cursor = (response.get('response_metadata') or {}).get('next_cursor')
+                pending = fetch(cursor) if prefetch and cursor else None
+
+                for message in response.get('messages', []):
+                    count += 1
+                    yield message
+
+                if not cursor:
+                    break
+                response = await (pending or fetch(cursor))
+                pending = None
+
+            logger.info("Retrieved %s messages from thread %s", count, thread_ts)
+
+        except SlackApiError as e:
+            logger.error("Error fetching thread replies: %s", e.response['error'])
+            raise
+        finally:
+            if pending and not pending.done():
+                pending.cancel()
+
+    async def get_thread_replies(
+        self,
+        channel: str,
+        thread_ts: str,
+        limit: int = None
+    ) -> Optional[List[Dict]]:
+        """
+        Get all replies in a thread
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+            limit: Maximum number of messages to retrieve (default: all)
+
+        Returns:
+            List of messages in the thread
+        """
+        messages = []
+        replies = self.iter_thread_replies(
+            channel=channel,
+            thread_ts=thread_ts,
+            page_size=min(limit, 200) if limit else 200
+        )
+        try:
+            async for message in replies:
+                messages.append(message)
+                if limit and len(messages) >= limit:
+                    break
+            return messages
+
+        except SlackApiError:
+            return None
+        finally:
+            await replies.aclose()
+
+    async def sync_thread(
+        self,
+        channel: str,
+        thread_ts: str,
+        full: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Bring the local copy of a thread up to date
+
+        Only replies newer than the cached watermark are requested, and
+        edits and tombstones among them are merged into the cache. Edits
+        and deletions of older replies are only seen by a full sync, which
+        re-reads the whole thread and marks missing messages deleted.
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+            full: Re-read the whole thread instead of only new replies
+
+        Returns:
+            Dict with ok, fetched, new, updated, deleted and latest_ts
+        """
+        if self.message_cache is None:
+            self.message_cache = await self._blocking(
+                ThreadMessageCache, sqlite_path(Config.SQLALCHEMY_DATABASE_URI)
+            )
+
+        oldest = None if full else await self._blocking(
+            self.message_cache.get_watermark, channel, thread_ts
+        )
+        try:
+            messages = [
+                message async for message in self.iter_thread_replies(
+                    channel=channel,
+                    thread_ts=thread_ts,
+                    oldest=oldest
+                )
+            ]
+        except SlackApiError as e:
+            return {'ok': False, 'error': str(e)}
+
+        stats = await self._blocking(
+            self.message_cache.merge, channel, thread_ts, messages, oldest is None
+        )
+        logger.info(
+            "Synced thread %s: %s new, %s updated, %s deleted",
+            thread_ts, stats['new'], stats['updated'], stats['deleted']
+        )
+        return {'ok': True, 'fetched': len(messages), **stats}
+
+    def get_active_threads(self) -> Dict:
+        """
+        Get all active thread IDs stored in the thread registry
+
+        Returns:
+            Dictionary of active threads with their metadata
+        """
+        return self.active_threads.to_dict()
+
+    async def upload_file(
+        self,
+        file_path: str = None,
+        file_content: bytes = None,
+        filename: str = None,
+        channel: str = None,
+        thread_ts: str = None,
+        initial_comment: str = None,
+        title: str = None
+    ) -> Optional[Dict]:
+        """
+        Upload a file or image to Slack channel or thread
+
+        Args:
+            file_path: Path to local file (use this OR file_content)
+            file_content: File bytes content (use this OR file_path)
+            filename: Name for the file (required if using file_content)
+            channel: Channel ID
+            thread_ts: Thread timestamp for threading
+            initial_comment: Comment with the file
+            title: File title
+
+        Returns:
+            Response from Slack API or None on error
+        """
+        try:
+            channel = channel or self.default_channel
+
+            upload_kwargs = {
+                'channels': channel,
+                'initial_comment': initial_comment,
+                'title': title
+            }
+
+            if thread_ts:
+                upload_kwargs['thread_ts'] = thread_ts
+
+            if file_path:
+                response = await self._api_call(
+                    'files.upload_v2',
+                    file=file_path,
+                    **upload_kwargs
+                )
+                logger.info("File uploaded from path: %s", file_path)
+            elif file_content and filename:
+                response = await self._api_call(
+                    'files.upload_v2',
+                    content=file_content,
+                    filename=filename,
+                    **upload_kwargs
+                )
+                logger.info("File uploaded from content: %s", filename)
+            else:
+                logger.error("Must provide either file_path or (file_content + filename)")
+                return None
+
+            if response.get('ok'):
+                file_info = response.get('file', {})
+                result = {
+                    'ok': True,
+                    'file_id': file_info.get('id'),
+                    'url': file_info.get('url_private'),
+                    'permalink': file_info.get('permalink'),
+                    'thread_ts': thread_ts
+                }
+
+                if thread_ts:
+                    logger.info("File uploaded to thread: %s", thread_ts)
+                else:
+                    logger.info("File uploaded to channel: %s", channel)
+
+                return result
+
+        except SlackApiError as e:
+            logger.error("Error uploading file: %s", e.response['error'])
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            logger.error("Unexpected error uploading file: %s", e)
+            return {'ok': False, 'error': str(e)}
@@ -0,0 +1,392 @@
+"""
+Throughput and latency benchmarks for SlackThreadClient
+
+Runs send_message, send_batch_to_thread, get_thread_replies and
+upload_file against a local FakeSlackServer at several concurrency levels
+and payload sizes, and writes the results as JSON. With --transports the
+cases are repeated for each HTTP transport.
+
+    python benchmark.py --output results.json
+    python benchmark.py --output new.json --compare results.json
+    python benchmark.py --scenarios send_message --transports urllib,urllib3,httpx
+"""
+import argparse
+import json
+import logging
+import math
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional, Tuple
+import slack_sdk
+from fake_slack import FakeSlackServer
+from http_transport import create_transport
+from rate_limiter import unlimited_rate_limiter
+from slack_thread_client import SlackThreadClient
+from streaming_upload import peak_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ['send_message', 'send_batch_to_thread', 'get_thread_replies', 'upload_file']
+DEFAULT_CONCURRENCY = [1, 4, 16]
+# Payload sizes: characters of text for messages, bytes for uploads
+DEFAULT_TEXT_SIZES = [100, 4000]
+DEFAULT_UPLOAD_SIZES = [64 * 1024, 1024 * 1024, 8 * 1024 * 1024]
+DEFAULT_TRANSPORTS = ['urllib']
+BATCH_SIZE = 20
+THREAD_SIZE = 1000
+
+# Compared between runs; higher is better unless listed in LOWER_IS_BETTER
+COMPARED_METRICS = ['msgs_per_sec', 'bytes_per_sec', 'p50_ms', 'p95_ms', 'p99_ms']
+LOWER_IS_BETTER = {'p50_ms', 'p95_ms', 'p99_ms'}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile
+
+    Args:
+        sorted_values: Values in ascending order
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile value (0.0 for no values)
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_case(
+    operation: Callable[[int], Tuple[bool, int, int]],
+    operations: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """
+    Run an operation repeatedly from a pool of threads and time each call
+
+    Args:
+        operation: Called with the operation index; returns
+            (ok, messages handled, bytes handled)
+        operations: Number of calls
+        concurrency: Threads making calls at once
+
+    Returns:
+        Dict of ops, messages, bytes, errors, seconds, rates and
+        latency percentiles
+    """
+    def timed(index: int) -> Tuple[float, bool, int, int]:
+        start = time.perf_counter()
+        try:
+            ok, messages, size = operation(index)
+        except Exception as e:
+            logger.debug("Benchmark operation failed: %s", e)
+            ok, messages, size = False, 0, 0
+        return time.perf_counter() - start, ok, messages, size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(timed, range(operations)))
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    messages = sum(sample[2] for sample in samples)
+    size = sum(sample[3] for sample in samples)
+    return {
+        'ops': operations,
+        'messages': messages,
+        'bytes': size,
+        'errors': sum(1 for sample in samples if not sample[1]),
+        'seconds': round(seconds, 4),
+        'ops_per_sec': round(operations / seconds, 2),
+        'msgs_per_sec': round(messages / seconds, 2),
+        'bytes_per_sec': round(size / seconds, 2),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+        # ru_maxrss is a high-water mark for the whole process so far
+        'peak_rss_bytes': peak_rss_bytes()
+    }
+
+
+def bench_send_message(client: SlackThreadClient, size: int, operations: int, concurrency: int) -> Dict[str, Any]:
+    text = 'x' * size
+
+    def operation(index: int) -> Tuple[bool, int, int]:
+        response = client.send_message(text=text, channel=f'CBENCH{index % 64}')
+        return response['ok'], 1, len(text)
+
+    return run_case(operation, operations, concurrency)
+
+
+def bench_send_batch(client: SlackThreadClient, size: int, operations: int, concurrency: int) -> Dict[str, Any]:
+    batches = max(1, operations // BATCH_SIZE)
+    messages = ['x' * size] * BATCH_SIZE
+    threads = [
+        client.start_thread('benchmark batch', channel=f'CBATCH{i}')
+        for i in range(concurrency)
+    ]
+
+    def operation(index: int) -> Tuple[bool, int, int]:
+        responses = client.send_batch_to_thread(
+            threads[index % len(threads)], messages, channel=f'CBATCH{index % len(threads)}'
+        )
+        return all(r['ok'] for r in responses), len(responses), size * len(responses)
+
+    return run_case(operation, batches, concurrency)
+
+
+def bench_get_replies(
+    client: SlackThreadClient,
+    server: FakeSlackServer,
+    size: int,
+    operations: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    # Seed the thread directly in the server, skipping HTTP
+    channel = f'CREPLIES{size}'
+    thread_ts = server.call('chat.postMessage', {'channel': channel, 'text': 'thread'}, 'seed')['ts']
+    for _ in range(THREAD_SIZE):
+        server.call('chat.postMessage', {'channel': channel, 'text': 'x' * size, 'thread_ts': thread_ts}, 'seed')
+    fetches = max(1, operations // 100)
+
+    def operation(index: int) -> Tuple[bool, int, int]:
+        replies = client.get_thread_replies(channel, thread_ts)
+        return len(replies) == THREAD_SIZE + 1, len(replies), sum(len(r.get('text', '')) for r in replies)
+
+    return run_case(operation, fetches, concurrency)
+
+
+def bench_upload(client: SlackThreadClient, size: int, operations: int, concurrency: int) -> Dict[str, Any]:
+    content = b'\0' * size
+    # Keep the bytes moved per case similar across sizes
+    uploads = max(concurrency, min(operations, (64 * 1024 * 1024) // size))
+
+    def operation(index: int) -> Tuple[bool, int, int]:
+        response = client.upload_file(
+            file_content=content,
+            filename=f'bench-{index}.bin',
+            channel='CUPLOAD'
+        )
+        return bool(response and response.get('ok')), 0, size
+
+    return run_case(operation, uploads, concurrency)
+
+
+def run_benchmarks(
+    scenarios: List[str] = None,
+    concurrency: List[int] = None,
+    text_sizes: List[int] = None,
+    upload_sizes: List[int] = None,
+    operations: int = 500,
+    latency: float = 0.0,
+    transports: List[str] = None
+) -> Dict[str, Any]:
+    """
+    Run every scenario at every concurrency level and payload size
+
+    Args:
+        scenarios: Scenario names (default: all of SCENARIOS)
+        concurrency: Thread counts to test
+        text_sizes: Message sizes in characters
+        upload_sizes: Upload sizes in bytes
+        operations: Messages per case (uploads and fetches are scaled down)
+        latency: Simulated server latency in seconds
+        transports: HTTP transport names (see http_transport.create_transport)
+
+    Returns:
+        Dict with run metadata and a list of results
+    """
+    scenarios = scenarios or SCENARIOS
+    concurrency = concurrency or DEFAULT_CONCURRENCY
+    text_sizes = text_sizes or DEFAULT_TEXT_SIZES
+    upload_sizes = upload_sizes or DEFAULT_UPLOAD_SIZES
+    transports = transports or DEFAULT_TRANSPORTS
+    results = []
+
+    with FakeSlackServer(latency=latency) as server:
+        for transport_name in transports:
+            transport = create_transport(transport_name, pool_size=max(concurrency))
+            client = SlackThreadClient(
+                token='xoxb-benchmark',
+                base_url=server.base_url,
+                rate_limiter=unlimited_rate_limiter(),
+                transport=transport
+            )
+            try:
+                results.extend(_run_scenarios(
+                    client, server, transport_name, scenarios, concurrency,
+                    text_sizes, upload_sizes, operations
+                ))
+            finally:
+                if transport is not None:
+                    transport.close()
+
+    return {
+        'metadata': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'slack_sdk': slack_sdk.version.__version__,
+            'latency': latency,
+            'operations': operations
+        },
+        'results': results
+    }
+
+
+def _run_scenarios(
+    client: SlackThreadClient,
+    server: FakeSlackServer,
+    transport: str,
+    scenarios: List[str],
+    concurrency: List[int],
+    text_sizes: List[int],
+    upload_sizes: List[int],
+    operations: int
+) -> List[Dict[str, Any]]:
+    results = []
+    server.reset()
+    for scenario in scenarios:
+        sizes = upload_sizes if scenario == 'upload_file' else text_sizes
+        for size in sizes:
+            for threads in concurrency:
+                if scenario == 'send_message':
+                    result = bench_send_message(client, size, operations, threads)
+                elif scenario == 'send_batch_to_thread':
+                    result = bench_send_batch(client, size, operations, threads)
+                elif scenario == 'get_thread_replies':
+                    result = bench_get_replies(client, server, size, operations, threads)
+                elif scenario == 'upload_file':
+                    result = bench_upload(client, size, operations, threads)
+                else:
+                    raise ValueError(f"Unknown scenario: {scenario}")
+                result = {
+                    'scenario': scenario, 'transport': transport, 'concurrency': threads,
+                    'payload_size': size, **result, 'connections': server.get_stats()['connections']
+                }
+                results.append(result)
+                logger.info(
+                    "%s %s size=%s concurrency=%s: %s ops/s, %s msgs/s, %.1f MB/s, p95 %s ms, "
+                    "errors %s, connections %s",
+                    scenario, transport, size, threads, result['ops_per_sec'], result['msgs_per_sec'],
+                    result['bytes_per_sec'] / 1e6, result['p95_ms'], result['errors'], result['connections']
+                )
+                # Don't let one case's messages slow the next one down
+                server.reset()
+
+    return results
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Find cases that got worse than a baseline run
+
+    Args:
+        current: run_benchmarks() output
+        baseline: Earlier run_benchmarks() output
+        threshold: Relative change that counts as a regression (0.1 = 10%)
+
+    Returns:
+        List of regressions with scenario, transport, concurrency,
+        payload_size, metric, baseline, current and change
+    """
+    def key(result: Dict[str, Any]) -> Tuple:
+        # Runs from before transports were compared used urllib
+        return (
+            result['scenario'], result.get('transport', 'urllib'),
+            result['concurrency'], result['payload_size']
+        )
+
+    previous = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            if worse:
+                regressions.append({
+                    'scenario': result['scenario'],
+                    'transport': result.get('transport', 'urllib'),
+                    'concurrency': result['concurrency'],
+                    'payload_size': result['payload_size'],
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'change': round(change, 4)
+                })
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',') if item]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark SlackThreadClient against a local fake Slack API')
+    parser.add_argument('--scenarios', type=lambda v: v.split(','), default=SCENARIOS,
+                        help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', type=_int_list, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--text-sizes', type=_int_list, default=DEFAULT_TEXT_SIZES,
+                        help='Message sizes in characters')
+    parser.add_argument('--upload-sizes', type=_int_list, default=DEFAULT_UPLOAD_SIZES,
+                        help='Upload sizes in bytes')
+    parser.add_argument('--operations', type=int, default=500, help='Messages per case')
+    parser.add_argument('--transports', type=lambda v: v.split(','), default=DEFAULT_TRANSPORTS,
+                        help='Comma-separated HTTP transports: urllib, urllib3, httpx')
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated server latency in seconds')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative change counted as a regression')
+    args = parser.parse_args(argv)
+
+    # The client logs every message at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    report = run_benchmarks(
+        scenarios=args.scenarios,
+        concurrency=args.concurrency,
+        text_sizes=args.text_sizes,
+        upload_sizes=args.upload_sizes,
+        operations=args.operations,
+        latency=args.latency,
+        transports=args.transports
+    )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info("Results written to %s", args.output)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for r in regressions:
+            logger.warning(
+                "Regression: %s %s size=%s concurrency=%s %s %s -> %s (%+.1f%%)",
+                r['scenario'], r['transport'], r['payload_size'], r['concurrency'],
+                r['metric'], r['baseline'], r['current'], r['change'] * 100
+            )
+        if regressions:
+            return 1
+        logger.info("No regressions against %s", args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from string import Formatter
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
+
+# https://api.slack.com/reference/block-kit/blocks
+MAX_BLOCKS = 50
+MAX_BLOCK_ID = 255
+TEXT_LIMITS = {
+    'section': 3000,
+    'header': 150,
+    'context': 2000,
+}
+MAX_SECTION_FIELDS = 10
+MAX_FIELD_TEXT = 2000
+MAX_CONTEXT_ELEMENTS = 10
+MAX_ACTIONS_ELEMENTS = 25
+
+_formatter = Formatter()
+_field_root = re.compile(r'[.\[]')
+
+
+class BlockValidationError(ValueError):
+    """Blocks break one of Slack's Block Kit limits"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__('; '.join(errors))
+
+
+def _list(value: Any) -> list:
+    return value if isinstance(value, list) else []
+
+
+def _text(obj: Any) -> str:
+    text = obj.get('text') if isinstance(obj, dict) else None
+    return text if isinstance(text, str) else ''
+
+
+def validate_blocks(blocks: List[Dict]) -> List[str]:
+    """
+    Check blocks against Slack's Block Kit size limits
+
+    Args:
+        blocks: List of Slack blocks
+
+    Returns:
+        List of problems (empty if the blocks are valid)
+    """
+    # Placeholders left in a template (e.g. "fields": "{fields}") are
+    # skipped here and checked once rendered
+    errors = []
+    if not isinstance(blocks, list):
+        return errors
+    if len(blocks) > MAX_BLOCKS:
+        errors.append(f"{len(blocks)} blocks (max {MAX_BLOCKS})")
+
+    for i, block in enumerate(blocks):
+        if not isinstance(block, dict):
+            continue
+        block_type = block.get('type')
+        if len(block.get('block_id') or '') > MAX_BLOCK_ID:
+            errors.append(f"block {i}: block_id longer than {MAX_BLOCK_ID}")
+
+        text = _text(block.get('text'))
+        limit = TEXT_LIMITS.get(block_type)
+        if limit and len(text) > limit:
+            errors.append(f"block {i} ({block_type}): text is {len(text)} chars (max {limit})")
+
+        fields = _list(block.get('fields'))
+        if len(fields) > MAX_SECTION_FIELDS:
+            errors.append(f"block {i}: {len(fields)} fields (max {MAX_SECTION_FIELDS})")
+        for field in fields:
+            if len(_text(field)) > MAX_FIELD_TEXT:
+                errors.append(f"block {i}: field text longer than {MAX_FIELD_TEXT}")
+
+        elements = _list(block.get('elements'))
+        if block_type == 'context':
+            if len(elements) > MAX_CONTEXT_ELEMENTS:
+                errors.append(f"block {i}: {len(elements)} context elements (max {MAX_CONTEXT_ELEMENTS})")
+            for element in elements:
+                if len(_text(element)) > TEXT_LIMITS['context']:
+                    errors.append(f"block {i}: context text longer than {TEXT_LIMITS['context']}")
+        elif block_type == 'actions' and len(elements) > MAX_ACTIONS_ELEMENTS:
+            errors.append(f"block {i}: {len(elements)} actions elements (max {MAX_ACTIONS_ELEMENTS})")
+
+    return errors
+
+
+def _copy(node: Any) -> Any:
+    # Cached renders are handed out as copies, so callers may modify them;
+    # blocks are plain JSON data, which makes this much cheaper than deepcopy
+    if isinstance(node, dict):
+        return {key: _copy(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_copy(item) for item in node]
+    return node
+
+
+def _compile(node: Any, fields: set, key: str = None) -> Optional[Callable[[Dict], Any]]:
+    # Returns None for parts of the template without placeholders; those
+    # are shared between renders instead of being rebuilt. key is the dict
+    # key the node is stored under, if any
+    if isinstance(node, str):
+        parsed = list(_formatter.parse(node))
+        names = [name for _, name, _, _ in parsed if name is not None]
+        if not names:
+            return None
+        fields.update(_field_root.split(name, 1)[0] for name in names)
+        literal, name, spec, conversion = parsed[0]
+        if len(parsed) == 1 and not literal and not spec and not conversion and key != 'text':
+            # "{items}" alone inserts the value as is, e.g. a list of fields;
+            # names are resolved like str.format ("{user.name}", "{rows[0]}")
+            return lambda context: _formatter.get_field(name, (), context)[0]
+        return lambda context: node.format_map(context)
+
+    if isinstance(node, dict):
+        dynamic = {key: _compile(value, fields, key) for key, value in node.items()}
+        dynamic = {key: render for key, render in dynamic.items() if render}
+        if not dynamic:
+            return None
+        static = {key: value for key, value in node.items() if key not in dynamic}
+        return lambda context: {
+            **static,
+            **{key: render(context) for key, render in dynamic.items()}
+        }
+
+    if isinstance(node, list):
+        renders = [_compile(item, fields) for item in node]
+        if not any(renders):
+            return None
+        return lambda context: [
+            render(context) if render else item
+            for item, render in zip(node, renders)
+        ]
+
+    return None
+
+
+class BlockTemplate:
+    """
+    Block Kit template compiled once and rendered from a context dict
+
+    Strings in the template use str.format placeholders ("{status}",
+    "{uptime:.1f}"). A string that is only a placeholder ("{fields}") is
+    replaced by the context value itself, so lists can be inserted;
+    "text" values are always rendered as strings.
+    Static parts are checked against Slack's limits at compile time and
+    every new render is checked before it is cached. Renders are cached
+    by the values of the fields the template uses.
+
+    Args:
+        blocks: Template blocks, as a list or a JSON string
+        cache_size: Number of distinct renders kept
+    """
+
+    def __init__(self, blocks: Union[List[Dict], str], cache_size: int = 256):
+        if isinstance(blocks, str):
+            blocks = json.loads(blocks)
+        self.blocks = blocks
+        self.fields = set()
+        self._render = _compile(blocks, self.fields)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'renders': 0, 'cache_hits': 0}
+
+        errors = validate_blocks(blocks)
+        if errors:
+            raise BlockValidationError(errors)
+
+    def _key(self, context: Dict[str, Any]) -> Optional[Tuple]:
+        # Values that cannot be serialized are rendered without caching
+        try:
+            return tuple(json.dumps(context[field], sort_keys=True) for field in sorted(self.fields))
+        except (TypeError, ValueError):
+            return None
+
+    def _rendered(self, context: Dict[str, Any]) -> List[Dict]:
+        key = self._key(context)
+        with self._lock:
+            self.stats['renders'] += 1
+            if key is not None and key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return self._cache[key]
+
+        blocks = self._render(context) if self._render else self.blocks
+        errors = validate_blocks(blocks)
+        if errors:
+            raise BlockValidationError(errors)
+        if key is not None:
+            with self._lock:
+                self._cache[key] = blocks
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return blocks
+
+    def render(self, context: Dict[str, Any] = None, **fields) -> List[Dict]:
+        """
+        Render the template
+
+        Args:
+            context: Values for the placeholders
+            **fields: Placeholder values as keyword arguments
+
+        Returns:
+            List of Slack blocks ready for send_message(blocks=...)
+
+        Raises:
+            KeyError: A placeholder has no value
+            BlockValidationError: The result breaks a Block Kit limit
+        """
+        return _copy(self._rendered({**(context or {}), **fields}))
+
+    def render_json(self, context: Dict[str, Any] = None, **fields) -> str:
+        """
+        Render the template to its compact JSON string
+
+        For callers that need the JSON text itself (response_url, incoming
+        webhooks, storage); send_message takes render()'s list.
+
+        Args:
+            context: Values for the placeholders
+            **fields: Placeholder values as keyword arguments
+
+        Returns:
+            JSON array of Slack blocks
+        """
+        return json.dumps(self._rendered({**(context or {}), **fields}), separators=(',', ':'))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get render counters
+
+        Returns:
+            renders, cache_hits and cached entries
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached'] = len(self._cache)
+        return stats
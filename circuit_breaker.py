@@ -0,0 +1,280 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any
+from slack_sdk.errors import SlackApiError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Slack while a method's circuit is open"""
+
+    def __init__(self, method: str, retry_in: float):
+        self.method = method
+        self.retry_in = retry_in
+        super().__init__(f"Circuit open for {method}, retry in {retry_in:.1f}s")
+
+
+def is_failure(error: Optional[BaseException]) -> bool:
+    """
+    Whether an error means Slack (or the network to it) is unhealthy
+
+    Timeouts, connection errors and HTTP 5xx count; Slack answering with
+    an error such as channel_not_found does not, and neither does a 429,
+    which the rate limiter handles.
+
+    Args:
+        error: Exception raised by the call, or None
+
+    Returns:
+        True if the call counts as a failure
+    """
+    if error is None:
+        return False
+    if isinstance(error, SlackApiError):
+        status = getattr(error.response, 'status_code', None) or 0
+        return status >= 500
+    return True
+
+
+class _Circuit:
+    def __init__(self):
+        self.state = CLOSED
+        self.outcomes = deque()
+        self.failures = 0
+        self.latencies = deque(maxlen=1000)
+        self.timeout = None
+        self.samples_since_timeout = 0
+        self.open_until = 0.0
+        self.open_seconds = 0.0
+        self.probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """
+    Per-method circuit breaker with latency-based timeouts
+
+    Each Web API method has its own circuit. While closed, call outcomes
+    are kept for a rolling window; once at least min_calls are in the
+    window and the failure rate reaches error_threshold, the circuit
+    opens and calls fail fast with CircuitOpenError. After open_seconds
+    it goes half-open and lets half_open_calls probe calls through: a
+    successful probe closes it, a failed one reopens it for twice as
+    long (up to max_open_seconds).
+
+    The timeout suggested for a method is timeout_multiplier times the
+    timeout_percentile of its recent successful latencies, kept between
+    min_timeout and max_timeout, once min_samples calls have succeeded.
+
+    Args:
+        window: Seconds of call history used for the failure rate
+        min_calls: Calls needed in the window before the circuit can open
+        error_threshold: Failure rate (0-1) that opens the circuit
+        open_seconds: First open period in seconds
+        max_open_seconds: Longest open period after repeated failures
+        half_open_calls: Probe calls allowed while half-open
+        timeout_percentile: Latency percentile used for timeouts
+        timeout_multiplier: Timeout as a multiple of that percentile
+        min_timeout: Lower bound for the suggested timeout
+        max_timeout: Upper bound (None = the client's own timeout)
+        min_samples: Successful calls needed before suggesting timeouts
+    """
+
+    def __init__(
+        self,
+        window: float = 30.0,
+        min_calls: int = 10,
+        error_threshold: float = 0.5,
+        open_seconds: float = 5.0,
+        max_open_seconds: float = 120.0,
+        half_open_calls: int = 1,
+        timeout_percentile: float = 99.0,
+        timeout_multiplier: float = 3.0,
+        min_timeout: float = 1.0,
+        max_timeout: float = None,
+        min_samples: int = 50
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_calls = half_open_calls
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, method: str) -> _Circuit:
+        circuit = self._circuits.get(method)
+        if circuit is None:
+            circuit = self._circuits[method] = _Circuit()
+        return circuit
+
+    def before_call(self, method: str):
+        """
+        Claim permission for one call
+
+        Every successful before_call() must be followed by after_call(),
+        or by release() if the call was never made.
+
+        Args:
+            method: Web API method name
+
+        Raises:
+            CircuitOpenError: The circuit is open, or half-open with all
+                probes already in flight
+        """
+        with self._lock:
+            circuit = self._circuit(method)
+            now = time.monotonic()
+            if circuit.state == OPEN:
+                if now < circuit.open_until:
+                    circuit.rejected += 1
+                    raise CircuitOpenError(method, circuit.open_until - now)
+                circuit.state = HALF_OPEN
+                circuit.probes = 0
+                logger.info("Circuit for %s half-open, probing", method)
+            if circuit.state == HALF_OPEN:
+                if circuit.probes >= self.half_open_calls:
+                    circuit.rejected += 1
+                    raise CircuitOpenError(method, max(0.1, circuit.open_until - now))
+                circuit.probes += 1
+
+    def after_call(self, method: str, error: Optional[BaseException], latency: float):
+        """
+        Record the outcome of a call allowed by before_call()
+
+        Args:
+            method: Web API method name
+            error: Exception raised by the call, or None
+            latency: Seconds the HTTP call took
+        """
+        failed = is_failure(error)
+        with self._lock:
+            circuit = self._circuit(method)
+            now = time.monotonic()
+
+            if circuit.state == HALF_OPEN:
+                circuit.probes -= 1
+                if failed:
+                    self._open(method, circuit, now, circuit.open_seconds * 2)
+                    return
+                circuit.state = CLOSED
+                circuit.outcomes.clear()
+                circuit.failures = 0
+                circuit.open_seconds = 0.0
+                logger.info("Circuit for %s closed", method)
+
+            if not failed:
+                circuit.latencies.append(latency)
+                circuit.samples_since_timeout += 1
+            circuit.outcomes.append((now, failed))
+            circuit.failures += failed
+            while circuit.outcomes and circuit.outcomes[0][0] < now - self.window:
+                circuit.failures -= circuit.outcomes.popleft()[1]
+
+            calls = len(circuit.outcomes)
+            if (
+                circuit.state == CLOSED and calls >= self.min_calls
+                and circuit.failures / calls >= self.error_threshold
+            ):
+                self._open(method, circuit, now, self.open_seconds)
+
+    def release(self, method: str):
+        """
+        Give back a call allowed by before_call() that was never made
+
+        Frees a half-open probe slot without recording an outcome.
+
+        Args:
+            method: Web API method name
+        """
+        with self._lock:
+            circuit = self._circuit(method)
+            if circuit.state == HALF_OPEN and circuit.probes > 0:
+                circuit.probes -= 1
+
+    def _open(self, method: str, circuit: _Circuit, now: float, seconds: float):
+        # Caller holds self._lock
+        seconds = min(max(seconds, self.open_seconds), self.max_open_seconds)
+        circuit.state = OPEN
+        circuit.open_seconds = seconds
+        circuit.open_until = now + seconds
+        circuit.times_opened += 1
+        logger.warning("Circuit for %s opened for %.1fs", method, seconds)
+
+    def timeout_for(self, method: str, default: float = None) -> Optional[float]:
+        """
+        Suggested HTTP timeout for a method based on observed latency
+
+        Args:
+            method: Web API method name
+            default: Client timeout, used as the upper bound
+
+        Returns:
+            Timeout in seconds, or None until enough calls have been seen
+        """
+        with self._lock:
+            circuit = self._circuit(method)
+            if len(circuit.latencies) < self.min_samples:
+                return None
+            # Recomputed every few dozen calls rather than on every call
+            if circuit.timeout is None or circuit.samples_since_timeout >= 50:
+                ordered = sorted(circuit.latencies)
+                rank = max(1, math.ceil(self.timeout_percentile / 100 * len(ordered)))
+                timeout = max(self.min_timeout, ordered[rank - 1] * self.timeout_multiplier)
+                upper = self.max_timeout or default
+                circuit.timeout = min(timeout, upper) if upper else timeout
+                circuit.samples_since_timeout = 0
+            return circuit.timeout
+
+    def get_state(self, method: str) -> str:
+        """
+        Current state of a method's circuit
+
+        Args:
+            method: Web API method name
+
+        Returns:
+            'closed', 'open' or 'half_open'
+        """
+        with self._lock:
+            circuit = self._circuit(method)
+            if circuit.state == OPEN and time.monotonic() >= circuit.open_until:
+                return HALF_OPEN
+            return circuit.state
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get circuit state per method
+
+        Returns:
+            Dictionary of method -> state, calls and error_rate in the
+            window, times_opened, rejected calls and current timeout
+        """
+        with self._lock:
+            stats = {}
+            for method, circuit in self._circuits.items():
+                calls = len(circuit.outcomes)
+                stats[method] = {
+                    'state': circuit.state,
+                    'calls': calls,
+                    'error_rate': circuit.failures / calls if calls else 0.0,
+                    'times_opened': circuit.times_opened,
+                    'rejected': circuit.rejected,
+                    'timeout': circuit.timeout
+                }
+            return stats
@@ -0,0 +1,263 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Dict, List, Any, Union
+from config import Config
+from rate_limiter import RateLimiter
+from circuit_breaker import CircuitBreaker
+from instrumentation import Hook
+from slack_thread_client import SlackThreadClient
+from thread_registry import create_thread_registry
+
+logger = logging.getLogger(__name__)
+
+# Returns the bot token for a team ID, or None if the app is not installed there
+TokenResolver = Callable[[str], Optional[str]]
+
+
+class SlackClientPool:
+    """
+    Long-lived SlackThreadClients for many workspaces, keyed by team ID
+
+    Each workspace gets its own client, and with it its own rate limiter,
+    circuit breaker and thread registry, so a workspace that is being rate
+    limited or failing does not slow down the others. With the SQLite
+    registry backend, each workspace's threads are kept in their own table
+    of the shared file, so no workspace sees another's threads. At most
+    max_clients clients are kept; the least recently used one is dropped
+    when a new workspace needs a client. Its rate limiter, circuit breaker and thread
+    registry are kept for up to retain_state evicted workspaces, so limits
+    still hold when the client is built again.
+
+    Tokens come from add_workspace() or, for workspaces not added, from
+    token_resolver (e.g. a lookup in your OAuth installation store).
+
+        pool = SlackClientPool(token_resolver=installations.bot_token)
+        pool.send_message("Deploy finished", team='T0123', channel='C0456')
+
+    Args:
+        tokens: team ID -> bot token
+        token_resolver: Called with a team ID not in tokens
+        max_clients: Clients kept at once
+        retain_state: Evicted workspaces whose limiter and breaker are kept
+        circuit_breaker: Give each workspace a CircuitBreaker built with
+            circuit_breaker_kwargs
+        circuit_breaker_kwargs: Arguments for each CircuitBreaker
+        hooks: Instrumentation hooks; events also carry the 'team'
+        **client_kwargs: Passed to every SlackThreadClient (base_url,
+            max_retries, search_index, ...)
+    """
+
+    def __init__(
+        self,
+        tokens: Dict[str, str] = None,
+        token_resolver: TokenResolver = None,
+        max_clients: int = None,
+        retain_state: int = 1000,
+        circuit_breaker: bool = False,
+        circuit_breaker_kwargs: Dict[str, Any] = None,
+        hooks: List[Hook] = None,
+        **client_kwargs
+    ):
+        self.tokens = dict(tokens or {})
+        self.token_resolver = token_resolver
+        self.max_clients = max_clients or Config.SLACK_CLIENT_POOL_SIZE
+        self.retain_state = retain_state
+        self.circuit_breaker = circuit_breaker
+        self.circuit_breaker_kwargs = circuit_breaker_kwargs or {}
+        self.hooks = list(hooks or [])
+        self.client_kwargs = client_kwargs
+        self._default_channels = {}
+        self._clients = OrderedDict()
+        self._retained = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'created': 0, 'evicted': 0}
+
+    def add_workspace(self, team: str, token: str, default_channel: str = None):
+        """
+        Register a workspace's bot token
+
+        A client already built for the team with another token is rebuilt
+        on next use, keeping its rate limit and circuit state.
+
+        Args:
+            team: Team (workspace) ID
+            token: Bot token for the workspace
+            default_channel: Channel used when a call gives none
+        """
+        with self._lock:
+            self.tokens[team] = token
+            if default_channel:
+                self._default_channels[team] = default_channel
+            client = self._clients.get(team)
+            if client is not None and client.token != token:
+                del self._clients[team]
+                self._retained[team] = (client.rate_limiter, client.circuit_breaker, client.active_threads)
+
+    def remove_workspace(self, team: str):
+        """
+        Forget a workspace, its client and its rate limit state
+
+        Args:
+            team: Team (workspace) ID
+        """
+        with self._lock:
+            self.tokens.pop(team, None)
+            self._default_channels.pop(team, None)
+            self._clients.pop(team, None)
+            self._retained.pop(team, None)
+
+    def _token(self, team: str) -> str:
+        token = self.tokens.get(team)
+        if token is None and self.token_resolver is not None:
+            token = self.token_resolver(team)
+        if not token:
+            raise KeyError(f"No token for workspace {team}")
+        return token
+
+    def _team_hooks(self, team: str) -> List[Hook]:
+        return [lambda event, hook=hook: hook(dict(event, team=team)) for hook in self.hooks]
+
+    def get(self, team: str) -> SlackThreadClient:
+        """
+        Get the client for a workspace, building it if needed
+
+        Args:
+            team: Team (workspace) ID
+
+        Returns:
+            The workspace's SlackThreadClient
+
+        Raises:
+            KeyError: No token is known for the team
+        """
+        with self._lock:
+            client = self._clients.get(team)
+            if client is not None:
+                self._clients.move_to_end(team)
+                self._stats['hits'] += 1
+                return client
+
+        # Resolving the token may be slow (a database lookup), so it runs
+        # without the lock; if two threads race, the first client wins
+        token = self._token(team)
+
+        with self._lock:
+            client = self._clients.get(team)
+            if client is not None:
+                self._clients.move_to_end(team)
+                self._stats['hits'] += 1
+                return client
+
+            state = self._retained.pop(team, None)
+            if state is None:
+                breaker = (
+                    CircuitBreaker(**self.circuit_breaker_kwargs) if self.circuit_breaker else None
+                )
+                # Workspaces share the SQLite file, so each gets its own table
+                state = (RateLimiter(), breaker, create_thread_registry(namespace=team))
+            rate_limiter, breaker, registry = state
+            client = SlackThreadClient(
+                token=token,
+                rate_limiter=rate_limiter,
+                circuit_breaker=breaker,
+                thread_registry=registry,
+                hooks=self._team_hooks(team),
+                **self.client_kwargs
+            )
+            if team in self._default_channels:
+                client.default_channel = self._default_channels[team]
+            self._clients[team] = client
+            self._stats['created'] += 1
+
+            while len(self._clients) > self.max_clients:
+                evicted_team, evicted = self._clients.popitem(last=False)
+                self._retained[evicted_team] = (
+                    evicted.rate_limiter, evicted.circuit_breaker, evicted.active_threads
+                )
+                self._stats['evicted'] += 1
+                logger.debug("Evicted client for workspace %s", evicted_team)
+            while len(self._retained) > self.retain_state:
+                self._retained.popitem(last=False)
+            return client
+
+    def call(self, team: str, method: str, *args, **kwargs) -> Any:
+        """
+        Call any SlackThreadClient method on a workspace's client
+
+        Args:
+            team: Team (workspace) ID
+            method: Client method name, e.g. 'upload_file'
+            *args: Positional arguments for the method
+            **kwargs: Keyword arguments for the method
+
+        Returns:
+            Whatever the client method returns
+        """
+        return getattr(self.get(team), method)(*args, **kwargs)
+
+    def send_message(
+        self,
+        text: str,
+        team: str,
+        channel: str = None,
+        thread_ts: str = None,
+        blocks: Union[List[Dict], str] = None,
+        attachments: List[Dict] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Send a message in a workspace (same arguments as
+        SlackThreadClient.send_message, plus team)
+
+        Returns:
+            Response from send_message, or {'ok': False, 'error': ...}
+            if the workspace has no token
+        """
+        try:
+            client = self.get(team)
+        except KeyError as e:
+            logger.error("%s", e.args[0])
+            return {'ok': False, 'error': e.args[0]}
+        return client.send_message(
+            text=text,
+            channel=channel,
+            thread_ts=thread_ts,
+            blocks=blocks,
+            attachments=attachments
+        )
+
+    def reply_to_thread(self, thread_ts: str, text: str, team: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Reply to a thread in a workspace (same arguments as
+        SlackThreadClient.reply_to_thread, plus team)
+
+        Returns:
+            Response from reply_to_thread
+        """
+        try:
+            client = self.get(team)
+        except KeyError as e:
+            logger.error("%s", e.args[0])
+            return {'ok': False, 'error': e.args[0]}
+        return client.reply_to_thread(thread_ts, text, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool counters and per-workspace circuit state
+
+        Returns:
+            Dictionary with clients, retained, hits, created, evicted and
+            circuits (team -> CircuitBreaker.get_stats(), when enabled)
+        """
+        with self._lock:
+            circuits = {
+                team: client.circuit_breaker.get_stats()
+                for team, client in self._clients.items()
+                if client.circuit_breaker is not None
+            }
+            return dict(
+                self._stats,
+                clients=len(self._clients),
+                retained=len(self._retained),
+                circuits=circuits
+            )
@@ -7,10 +7,40 @@ class Config:
     SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
     SLACK_SIGNING_SECRET = os.getenv('SLACK_SIGNING_SECRET')
     SLACK_CHANNEL_ID = os.getenv('SLACK_CHANNEL_ID')
+    # Web API base URL, e.g. http://127.0.0.1:8765/api/ for fake_slack.py
+    SLACK_API_BASE_URL = os.getenv('SLACK_API_BASE_URL')
+
+    SLACK_MAX_CONNECTIONS = int(os.getenv('SLACK_MAX_CONNECTIONS', 100))
+    SLACK_KEEPALIVE_TIMEOUT = float(os.getenv('SLACK_KEEPALIVE_TIMEOUT', 30))
+    SLACK_MAX_RETRIES = int(os.getenv('SLACK_MAX_RETRIES', 3))
+
+    # HTTP transport for SlackThreadClient: 'urllib' (slack_sdk default,
+    # new connection per call), 'urllib3' or 'httpx' (pooled keep-alive)
+    SLACK_HTTP_TRANSPORT = os.getenv('SLACK_HTTP_TRANSPORT', 'urllib')
+    SLACK_HTTP_POOL_SIZE = int(os.getenv('SLACK_HTTP_POOL_SIZE', 10))
+    SLACK_HTTP_CONNECT_TIMEOUT = float(os.getenv('SLACK_HTTP_CONNECT_TIMEOUT', 5))
+    SLACK_HTTP_READ_TIMEOUT = float(os.getenv('SLACK_HTTP_READ_TIMEOUT', 30))
+    SLACK_HTTP2 = os.getenv('SLACK_HTTP2', 'False').lower() == 'true'
+
+    # Workspace clients kept by SlackClientPool
+    SLACK_CLIENT_POOL_SIZE = int(os.getenv('SLACK_CLIENT_POOL_SIZE', 64))
 
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///slack_messages.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # 'memory' (per-process LRU) or 'sqlite' (shared via SQLALCHEMY_DATABASE_URI)
+    THREAD_REGISTRY_BACKEND = os.getenv('THREAD_REGISTRY_BACKEND', 'memory')
+    THREAD_REGISTRY_MAX_SIZE = int(os.getenv('THREAD_REGISTRY_MAX_SIZE', 10000))
+    THREAD_REGISTRY_TTL = float(os.getenv('THREAD_REGISTRY_TTL', 7 * 24 * 3600))
+
+    OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'slack_outbox.db')
+
+    # SQLite FTS5 index used by SearchIndex
+    SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', 'slack_search.db')
+
+    # Processes used by ShardedSender (0 = one per CPU)
+    SLACK_WORKER_PROCESSES = int(os.getenv('SLACK_WORKER_PROCESSES', 0))
+
     SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key')
     DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
     PORT = int(os.getenv('FLASK_PORT', 5000))
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Shared pytest fixtures for the offline tests
+
+Every test talks to a local FakeSlackServer, so the suite needs no token
+or network access:
+
+    python -m pytest
+"""
+import pytest
+from fake_slack import FakeSlackServer
+from rate_limiter import unlimited_rate_limiter
+from slack_thread_client import SlackThreadClient
+from thread_registry import MemoryThreadRegistry
+
+TOKEN = 'xoxb-test'
+
+# Manual scripts that post to the workspace in .env as soon as they are imported
+collect_ignore = ['test_thread_only.py', 'test_image_upload.py', 'test_image_moderate.py']
+
+
+@pytest.fixture
+def server(request):
+    """
+    Running FakeSlackServer, stopped after the test
+
+    Pass FakeSlackServer arguments with indirect parametrization, e.g.
+    @pytest.mark.parametrize('server', [{'latency': 0.02}], indirect=True)
+    """
+    with FakeSlackServer(**getattr(request, 'param', {})) as fake:
+        yield fake
+
+
+@pytest.fixture
+def make_client(server):
+    """
+    Factory for clients pointed at the fake server
+
+    Clients get an unlimited rate limiter, an in-memory thread registry and
+    'C1' as their default channel unless the test passes its own.
+    """
+    def make(client_class=SlackThreadClient, **kwargs):
+        kwargs.setdefault('base_url', server.base_url)
+        kwargs.setdefault('rate_limiter', unlimited_rate_limiter())
+        kwargs.setdefault('thread_registry', MemoryThreadRegistry())
+        client = client_class(token=TOKEN, **kwargs)
+        client.default_channel = 'C1'
+        return client
+    return make
+
+
+@pytest.fixture
+def client(make_client) -> SlackThreadClient:
+    return make_client()
+
+
+@pytest.fixture
+def make_thread(server):
+    """
+    Factory that posts a parent message and replies straight into the fake server
+
+    Returns the new thread's ts.
+    """
+    def make(replies: int, channel: str = 'C1', text: str = 'Reply') -> str:
+        thread_ts = server.call('chat.postMessage', {'channel': channel, 'text': 'Parent'}, TOKEN)['ts']
+        for i in range(replies):
+            server.call(
+                'chat.postMessage', {'channel': channel, 'text': f"{text} {i}", 'thread_ts': thread_ts}, TOKEN
+            )
+        return thread_ts
+    return make
@@ -0,0 +1,449 @@
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Optional, Dict, Any, Mapping, Tuple
+from urllib.parse import urlparse
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Called with the inner event dict of each dispatched event
+EventHandler = Callable[[Dict[str, Any]], None]
+
+SIGNATURE_VERSION = 'v0'
+
+
+def compute_signature(signing_secret: str, timestamp: str, body: bytes) -> str:
+    """
+    Compute the X-Slack-Signature value for a request body
+
+    Args:
+        signing_secret: App signing secret
+        timestamp: X-Slack-Request-Timestamp value
+        body: Raw request body
+
+    Returns:
+        Signature string, e.g. 'v0=5f3c...'
+    """
+    base = f'{SIGNATURE_VERSION}:{timestamp}:'.encode('utf-8') + body
+    digest = hmac.new(signing_secret.encode('utf-8'), base, hashlib.sha256).hexdigest()
+    return f'{SIGNATURE_VERSION}={digest}'
+
+
+def verify_signature(
+    signing_secret: str,
+    timestamp: Optional[str],
+    body: bytes,
+    signature: Optional[str],
+    max_age: float = 300,
+    now: float = None
+) -> bool:
+    """
+    Check a request's signature and that it is recent enough
+
+    The comparison runs in constant time, and requests whose timestamp is
+    more than max_age seconds from now are rejected so a captured request
+    cannot be replayed later.
+
+    Args:
+        signing_secret: App signing secret
+        timestamp: X-Slack-Request-Timestamp header
+        body: Raw request body
+        signature: X-Slack-Signature header
+        max_age: Allowed clock difference in seconds
+        now: Current Unix time (default: time.time())
+
+    Returns:
+        True if the request is authentic and within the replay window
+    """
+    if not signing_secret or not timestamp or not signature:
+        return False
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        return False
+    if abs((time.time() if now is None else now) - sent_at) > max_age:
+        return False
+    expected = compute_signature(signing_secret, timestamp, body)
+    return hmac.compare_digest(expected.encode('utf-8'), signature.encode('utf-8'))
+
+
+def sign_request(signing_secret: str, body: bytes, timestamp: int = None) -> Dict[str, str]:
+    """
+    Build the headers Slack would send with a body, for local testing
+
+    Args:
+        signing_secret: App signing secret
+        body: Raw request body
+        timestamp: Unix time to sign with (default: now)
+
+    Returns:
+        Dictionary with X-Slack-Request-Timestamp, X-Slack-Signature and
+        Content-Type headers
+    """
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    return {
+        'X-Slack-Request-Timestamp': timestamp,
+        'X-Slack-Signature': compute_signature(signing_secret, timestamp, body),
+        'Content-Type': 'application/json'
+    }
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class EventReceiver:
+    """
+    Receives Slack Events API requests and dispatches thread replies
+
+    handle() verifies the signature, answers url_verification, drops
+    deliveries whose event_id was already seen (Slack retries when an ack
+    is late) and puts the event on a bounded queue, so the ack never waits
+    for a handler. Worker threads take events off the queue and call the
+    handlers registered for the message's thread_ts, then any catch-all
+    handlers. Messages in one thread are handled in order when workers=1;
+    with more workers, handlers for one thread may run concurrently.
+
+    When the queue is full the request is answered with 503 and its
+    event_id forgotten, so Slack's retry can be accepted later.
+
+        receiver = EventReceiver()
+        thread_ts = client.start_thread("Any questions?")
+        receiver.on_thread(thread_ts, lambda event: print(event['text']))
+        receiver.serve(port=3000)
+
+    Args:
+        signing_secret: App signing secret (defaults to Config.SLACK_SIGNING_SECRET)
+        max_age: Replay window in seconds for request timestamps
+        workers: Handler threads
+        queue_size: Events that may wait for a worker
+        dedup_size: event_ids remembered for deduplication
+        dedup_ttl: Seconds an event_id is remembered
+        ignore_bots: Skip messages posted by bots, including this app's own
+    """
+
+    def __init__(
+        self,
+        signing_secret: str = None,
+        max_age: float = 300,
+        workers: int = 4,
+        queue_size: int = 1000,
+        dedup_size: int = 10000,
+        dedup_ttl: float = 3600,
+        ignore_bots: bool = True
+    ):
+        self.signing_secret = signing_secret or Config.SLACK_SIGNING_SECRET
+        if not self.signing_secret:
+            raise ValueError("SLACK_SIGNING_SECRET is required to verify Slack events")
+        self.max_age = max_age
+        self.workers = workers
+        self.dedup_size = dedup_size
+        self.dedup_ttl = dedup_ttl
+        self.ignore_bots = ignore_bots
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._seen = OrderedDict()
+        self._thread_handlers = {}
+        self._message_handlers = []
+        self._lock = threading.Lock()
+        self._threads = []
+        self._server = None
+        self._server_thread = None
+        self._stats = {
+            'received': 0, 'rejected': 0, 'duplicates': 0, 'dropped': 0,
+            'dispatched': 0, 'handler_errors': 0
+        }
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def on_thread(self, thread_ts: str, handler: EventHandler, channel: str = None):
+        """
+        Register a handler for messages posted in a thread
+
+        Args:
+            thread_ts: Timestamp of the thread's parent message
+            handler: Called with the message event
+            channel: Only handle the thread in this channel
+        """
+        with self._lock:
+            self._thread_handlers.setdefault(thread_ts, []).append((channel, handler))
+
+    def remove_thread(self, thread_ts: str, handler: EventHandler = None):
+        """
+        Unregister handlers for a thread
+
+        Args:
+            thread_ts: Timestamp of the thread's parent message
+            handler: Handler to remove (default: all of the thread's handlers)
+        """
+        with self._lock:
+            if handler is None:
+                self._thread_handlers.pop(thread_ts, None)
+                return
+            remaining = [h for h in self._thread_handlers.get(thread_ts, []) if h[1] is not handler]
+            if remaining:
+                self._thread_handlers[thread_ts] = remaining
+            else:
+                self._thread_handlers.pop(thread_ts, None)
+
+    def on_message(self, handler: EventHandler):
+        """
+        Register a handler for every message event, threaded or not
+
+        Args:
+            handler: Called with the message event
+        """
+        with self._lock:
+            self._message_handlers.append(handler)
+
+    def handle(self, body: bytes, headers: Mapping[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Process one Events API request
+
+        Does not wait for handlers, so it can be called from any web
+        framework's view and answered well within the 3 second deadline.
+
+        Args:
+            body: Raw request body (exactly as received; it is signed)
+            headers: Request headers; lookups are case-insensitive
+
+        Returns:
+            (HTTP status, response headers, response body)
+        """
+        headers = {k.lower(): v for k, v in headers.items()}
+        if not verify_signature(
+            self.signing_secret,
+            headers.get('x-slack-request-timestamp'),
+            body,
+            headers.get('x-slack-signature'),
+            self.max_age
+        ):
+            with self._lock:
+                self._stats['rejected'] += 1
+            logger.warning("Rejected Slack request with invalid or expired signature")
+            return 401, {'Content-Type': 'text/plain'}, b'invalid signature'
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, {'Content-Type': 'text/plain'}, b'invalid JSON'
+        if not isinstance(payload, dict):
+            return 400, {'Content-Type': 'text/plain'}, b'expected a JSON object'
+
+        if payload.get('type') == 'url_verification':
+            return 200, {'Content-Type': 'text/plain'}, str(payload.get('challenge', '')).encode('utf-8')
+        if payload.get('type') != 'event_callback':
+            return 200, {}, b''
+        if not isinstance(payload.get('event'), dict):
+            return 400, {'Content-Type': 'text/plain'}, b'expected an event object'
+
+        event_id = payload.get('event_id')
+        if not isinstance(event_id, str):
+            event_id = None
+        with self._lock:
+            self._stats['received'] += 1
+            if event_id and self._remember(event_id):
+                self._stats['duplicates'] += 1
+                logger.debug("Duplicate delivery of %s (retry %s)", event_id, headers.get('x-slack-retry-num'))
+                return 200, {}, b''
+
+        if not self._threads:
+            self.start()
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+                self._seen.pop(event_id, None)
+            logger.warning("Event queue full, asking Slack to retry %s", event_id)
+            return 503, {'Content-Type': 'text/plain'}, b'busy'
+        return 200, {}, b''
+
+    def _remember(self, event_id: str) -> bool:
+        # Caller holds self._lock; returns True if event_id was already seen
+        now = time.monotonic()
+        while self._seen:
+            oldest, seen_at = next(iter(self._seen.items()))
+            if len(self._seen) < self.dedup_size and now - seen_at < self.dedup_ttl:
+                break
+            self._seen.pop(oldest)
+        if event_id in self._seen:
+            return True
+        self._seen[event_id] = now
+        return False
+
+    def start(self):
+        """
+        Start the worker threads
+        """
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._run, name=f'slack-events-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while True:
+            payload = self._queue.get()
+            try:
+                if payload is None:
+                    return
+                self._dispatch(payload.get('event') or {})
+            finally:
+                self._queue.task_done()
+
+    def _dispatch(self, event: Dict[str, Any]):
+        if event.get('type') != 'message':
+            return
+        # Edits carry the changed message in a nested "message" field
+        message = event.get('message') if event.get('subtype') == 'message_changed' else event
+        if not isinstance(message, dict):
+            return
+        if self.ignore_bots and (message.get('bot_id') or message.get('subtype') == 'bot_message'):
+            return
+
+        thread_ts = message.get('thread_ts')
+        channel = event.get('channel')
+        with self._lock:
+            handlers = [
+                handler for handler_channel, handler in self._thread_handlers.get(thread_ts, [])
+                if handler_channel in (None, channel)
+            ] if thread_ts else []
+            handlers.extend(self._message_handlers)
+
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception:
+                with self._lock:
+                    self._stats['handler_errors'] += 1
+                logger.exception("Event handler %r failed", handler)
+        if handlers:
+            with self._lock:
+                self._stats['dispatched'] += 1
+
+    def join(self):
+        """
+        Wait until every queued event has been handled
+        """
+        self._queue.join()
+
+    def serve(self, host: str = '0.0.0.0', port: int = None, path: str = '/slack/events') -> Tuple[str, int]:
+        """
+        Serve the Request URL with the standard library HTTP server
+
+        Runs in a background thread; call stop() to shut it down.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (defaults to Config.PORT; 0 = any free port)
+            path: URL path Slack posts to
+
+        Returns:
+            (host, port) the server is bound to
+        """
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+            def do_POST(self):
+                if urlparse(self.path).path != path:
+                    self._reply(404, {'Content-Type': 'text/plain'}, b'Not Found')
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                self._reply(*receiver.handle(body, dict(self.headers.items())))
+
+            def _reply(self, status: int, headers: Dict[str, str], body: bytes):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.start()
+        self._server = _HTTPServer((host, Config.PORT if port is None else port), Handler)
+        self._server_thread = threading.Thread(
+            target=self._server.serve_forever, name='slack-events-http', daemon=True
+        )
+        self._server_thread.start()
+        address = self._server.server_address[:2]
+        logger.info("Listening for Slack events on http://%s:%s%s", address[0], address[1], path)
+        return address
+
+    def stop(self, timeout: float = None):
+        """
+        Stop the HTTP server, finish queued events and stop the workers
+
+        Args:
+            timeout: Seconds to wait for each worker
+        """
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get receiver counters
+
+        Returns:
+            Dictionary with received, rejected, duplicates, dropped,
+            dispatched, handler_errors and queued counts
+        """
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Log Slack message events')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=Config.PORT)
+    parser.add_argument('--path', default='/slack/events')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    receiver = EventReceiver()
+    receiver.on_message(lambda event: logger.info(
+        "%s in %s (thread %s): %s",
+        event.get('user'), event.get('channel'), event.get('thread_ts'), event.get('text')
+    ))
+    receiver.serve(args.host, args.port, args.path)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.stop()
+
+
+if __name__ == '__main__':
+    main()
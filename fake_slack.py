@@ -0,0 +1,593 @@
+import argparse
+import base64
+import gzip
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, List, Any, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_CHARS = 40000
+MAX_BLOCKS = 50
+# JSON responses at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = 1024
+
+
+class _Bucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        # Returns 0 if a token was taken, else seconds until one is free
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load,
+    # which shows up as 1s+ TCP retransmit stalls
+    request_queue_size = 1024
+
+
+class FakeSlackError(Exception):
+    def __init__(self, error: str, status: int = 200, retry_after: float = None):
+        self.error = error
+        self.status = status
+        self.retry_after = retry_after
+        super().__init__(error)
+
+
+class FakeSlackServer:
+    """
+    Local stand-in for the Slack Web API, for offline and load testing
+
+    Implements chat.postMessage, chat.update, conversations.replies and
+    conversations.history (with cursors), files.getUploadURLExternal, the
+    upload URL, files.completeUploadExternal and auth.test, keeping
+    messages and files in memory. Point a client at base_url:
+
+        with FakeSlackServer(latency=0.05) as slack:
+            client = SlackThreadClient(token='xoxb-test', base_url=slack.base_url)
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on (0 = any free port)
+        latency: Seconds added to every response
+        jitter: Extra random latency, uniform in [0, jitter]
+        rate_limits: method -> (requests/second, burst); calls past the
+            limit get HTTP 429 with Retry-After
+        channel_rate_limits: Same, applied per channel (e.g. chat.postMessage)
+        error_rate: Fraction of calls that fail with error_status
+        error_status: HTTP status of randomly failed calls
+        seed: Seed for latency jitter and random errors
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limits: Dict[str, Tuple[float, float]] = None,
+        channel_rate_limits: Dict[str, Tuple[float, float]] = None,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: int = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limits = dict(rate_limits or {})
+        self.channel_rate_limits = dict(channel_rate_limits or {})
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.messages = {}
+        self.files = {}
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self.errors = Counter()
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._buckets = {}
+        self._injected = {}
+        self._last_ts = 0.0
+        self._file_ids = 0
+        self._lock = threading.Lock()
+        self._server = _HTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        """Web API base URL to give the client"""
+        return f"{self.url}/api/"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self) -> 'FakeSlackServer':
+        """
+        Serve requests on a background thread
+
+        Returns:
+            self
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, name='fake-slack', daemon=True
+            )
+            self._thread.start()
+            logger.info("Fake Slack API listening on %s", self.base_url)
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def inject_error(
+        self,
+        method: str,
+        error: str = 'internal_error',
+        status: int = 200,
+        count: int = 1,
+        retry_after: float = None
+    ):
+        """
+        Make the next calls to a method fail
+
+        Slack reports most errors as HTTP 200 with ok=false; use status 429
+        with retry_after to simulate a rate limit, or 5xx for an outage.
+
+        Args:
+            method: Web API method name, or '*' for any method
+            error: Slack error code returned ('ratelimited' for status 429)
+            status: HTTP status
+            count: Number of calls to fail
+            retry_after: Retry-After header value in seconds
+        """
+        if status == 429:
+            error = 'ratelimited'
+        with self._lock:
+            queued = self._injected.setdefault(method, deque())
+            queued.extend([(error, status, retry_after)] * count)
+
+    def get_thread(self, channel: str, thread_ts: str) -> List[Dict[str, Any]]:
+        """
+        Messages of a thread, parent first
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+
+        Returns:
+            List of message dicts
+        """
+        with self._lock:
+            return [
+                dict(m) for m in self.messages.get(channel, [])
+                if m['ts'] == thread_ts or m.get('thread_ts') == thread_ts
+            ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request counters
+
+        Returns:
+            calls, rate_limited and errors per method, message and file
+            totals, and TCP connections accepted
+        """
+        with self._lock:
+            return {
+                'connections': self.connections,
+                'calls': dict(self.calls),
+                'rate_limited': dict(self.rate_limited),
+                'errors': dict(self.errors),
+                'messages': sum(len(m) for m in self.messages.values()),
+                'files': len(self.files)
+            }
+
+    def reset(self):
+        """
+        Forget all messages, files, counters, rate limit state and
+        injected errors
+        """
+        with self._lock:
+            self.messages.clear()
+            self.files.clear()
+            self.calls.clear()
+            self.rate_limited.clear()
+            self.errors.clear()
+            self.connections = 0
+            self._buckets.clear()
+            self._injected.clear()
+
+    def _next_ts(self) -> str:
+        # Caller holds self._lock; timestamps are unique and increasing
+        self._last_ts = max(round(time.time(), 6), round(self._last_ts + 0.000001, 6))
+        return f"{self._last_ts:.6f}"
+
+    def _check_limits(self, method: str, channel: Optional[str]):
+        # Caller holds self._lock
+        queued = self._injected.get(method) or self._injected.get('*')
+        if queued:
+            error, status, retry_after = queued.popleft()
+            raise FakeSlackError(error, status, retry_after)
+
+        checks = [((method, None), self.rate_limits.get(method))]
+        if channel:
+            checks.append(((method, channel), self.channel_rate_limits.get(method)))
+        for key, limit in checks:
+            if not limit:
+                continue
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(*limit)
+            wait = bucket.take()
+            if wait:
+                raise FakeSlackError('ratelimited', 429, wait)
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise FakeSlackError('internal_error', self.error_status)
+
+    def call(self, method: str, params: Dict[str, Any], token: str = None) -> Dict[str, Any]:
+        """
+        Run one Web API method against the in-memory workspace
+
+        Args:
+            method: Web API method name
+            params: Request arguments
+            token: Bearer token from the request
+
+        Returns:
+            Response body
+
+        Raises:
+            FakeSlackError: The call fails, is rate limited or was injected
+        """
+        channel = params.get('channel') or params.get('channel_id')
+        with self._lock:
+            self.calls[method] += 1
+            try:
+                if not token:
+                    raise FakeSlackError('not_authed')
+                self._check_limits(method, channel)
+                handler = self._methods.get(method)
+                if handler is None:
+                    raise FakeSlackError('unknown_method')
+                return handler(self, params)
+            except FakeSlackError as e:
+                if e.status == 429:
+                    self.rate_limited[method] += 1
+                else:
+                    self.errors[method] += 1
+                raise
+
+    def _post_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        channel = params.get('channel')
+        if not channel:
+            raise FakeSlackError('channel_not_found')
+        text = params.get('text') or ''
+        blocks = _json_param(params.get('blocks'))
+        if not text and not blocks:
+            raise FakeSlackError('no_text')
+        if len(text) > MAX_TEXT_CHARS:
+            raise FakeSlackError('msg_too_long')
+        if blocks and len(blocks) > MAX_BLOCKS:
+            raise FakeSlackError('invalid_blocks')
+
+        message = {
+            'type': 'message',
+            'user': 'UFAKEBOT',
+            'bot_id': 'BFAKEBOT',
+            'text': text,
+            'ts': self._next_ts()
+        }
+        if blocks:
+            message['blocks'] = blocks
+        metadata = _json_param(params.get('metadata'))
+        if metadata:
+            message['metadata'] = metadata
+        thread_ts = params.get('thread_ts')
+        if thread_ts:
+            message['thread_ts'] = thread_ts
+            parent = self._find(channel, thread_ts)
+            if parent is not None:
+                parent['thread_ts'] = thread_ts
+                parent['reply_count'] = parent.get('reply_count', 0) + 1
+        self.messages.setdefault(channel, []).append(message)
+        return {'ok': True, 'channel': channel, 'ts': message['ts'], 'message': dict(message)}
+
+    def _update(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        channel = params.get('channel')
+        message = self._find(channel, params.get('ts'))
+        if message is None:
+            raise FakeSlackError('message_not_found')
+        text = params.get('text') or ''
+        if len(text) > MAX_TEXT_CHARS:
+            raise FakeSlackError('msg_too_long')
+        message['text'] = text
+        blocks = _json_param(params.get('blocks'))
+        if blocks is not None:
+            message['blocks'] = blocks
+        message['edited'] = {'user': 'UFAKEBOT', 'ts': self._next_ts()}
+        return {'ok': True, 'channel': channel, 'ts': message['ts'], 'text': text, 'message': dict(message)}
+
+    def _replies(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        channel = params.get('channel')
+        thread_ts = params.get('ts')
+        if channel not in self.messages:
+            raise FakeSlackError('channel_not_found')
+        parent = self._find(channel, thread_ts)
+        if parent is None:
+            raise FakeSlackError('thread_not_found')
+        replies = [
+            m for m in self.messages[channel]
+            if m.get('thread_ts') == thread_ts and m['ts'] != thread_ts
+        ]
+        # The parent always comes first, like the real API
+        return self._page([parent] + _in_range(replies, params), params)
+
+    def _history(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        channel = params.get('channel')
+        if channel not in self.messages:
+            raise FakeSlackError('channel_not_found')
+        top_level = [
+            m for m in self.messages[channel]
+            if m.get('thread_ts') in (None, m['ts'])
+        ]
+        return self._page(list(reversed(_in_range(top_level, params))), params)
+
+    @staticmethod
+    def _page(messages: List[Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+        limit = max(1, min(int(params.get('limit') or 100), 1000))
+        cursor = params.get('cursor')
+        offset = int(base64.b64decode(cursor).decode()[7:]) if cursor else 0
+        page = messages[offset:offset + limit]
+        has_more = offset + limit < len(messages)
+        next_cursor = base64.b64encode(f"offset:{offset + limit}".encode()).decode() if has_more else ''
+        return {
+            'ok': True,
+            'messages': [dict(m) for m in page],
+            'has_more': has_more,
+            'response_metadata': {'next_cursor': next_cursor}
+        }
+
+    def _get_upload_url(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        filename = params.get('filename')
+        if not filename or not params.get('length'):
+            raise FakeSlackError('invalid_arguments')
+        self._file_ids += 1
+        file_id = f"F{self._file_ids:08d}"
+        self.files[file_id] = {
+            'id': file_id,
+            'name': filename,
+            'title': filename,
+            'size': None,
+            'expected_size': int(params['length']),
+            'created': int(time.time())
+        }
+        return {'ok': True, 'file_id': file_id, 'upload_url': f"{self.url}/upload/{file_id}"}
+
+    def _receive_upload(self, file_id: str, size: int) -> bool:
+        with self._lock:
+            info = self.files.get(file_id)
+            if info is None:
+                return False
+            info['size'] = size
+            return True
+
+    def _complete_upload(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        files = []
+        for entry in _json_param(params.get('files')) or []:
+            info = self.files.get(entry.get('id'))
+            if info is None or info['size'] is None:
+                raise FakeSlackError('file_not_found')
+            info['title'] = entry.get('title') or info['title']
+            info['permalink'] = f"{self.url}/files/{info['id']}/{info['name']}"
+            info['url_private'] = f"{self.url}/files-pri/{info['id']}/{info['name']}"
+            files.append(dict(info))
+
+        channel = params.get('channel_id') or params.get('channels')
+        if channel:
+            message = self._post_message({
+                'channel': channel.split(',')[0],
+                'thread_ts': params.get('thread_ts'),
+                'text': params.get('initial_comment') or ' '
+            })
+            self._find(message['channel'], message['ts'])['files'] = [f['id'] for f in files]
+        return {'ok': True, 'files': files}
+
+    def _auth_test(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'ok': True,
+            'url': f"{self.url}/",
+            'team': 'Fake Workspace',
+            'user': 'fake-bot',
+            'team_id': 'TFAKE',
+            'user_id': 'UFAKEBOT',
+            'bot_id': 'BFAKEBOT'
+        }
+
+    def _find(self, channel: str, ts: str) -> Optional[Dict[str, Any]]:
+        for message in self.messages.get(channel, []):
+            if message['ts'] == ts:
+                return message
+        return None
+
+    _methods = {
+        'chat.postMessage': _post_message,
+        'chat.update': _update,
+        'conversations.replies': _replies,
+        'conversations.history': _history,
+        'files.getUploadURLExternal': _get_upload_url,
+        'files.completeUploadExternal': _complete_upload,
+        'auth.test': _auth_test,
+    }
+
+    def _delay(self):
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle on, a
+            # keep-alive client waits ~40ms for the delayed ACK on each call
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+            def do_GET(self):
+                self._handle()
+
+            def do_POST(self):
+                self._handle()
+
+            def do_PUT(self):
+                self._handle()
+
+            def _handle(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                server._delay()
+
+                if url.path.startswith('/upload/'):
+                    size = 0
+                    while size < length:
+                        size += len(self.rfile.read(min(1024 * 1024, length - size)))
+                    found = server._receive_upload(url.path.rsplit('/', 1)[-1], size)
+                    self._reply(200 if found else 404, b'OK' if found else b'Not Found', 'text/plain')
+                    return
+
+                body = self.rfile.read(length) if length else b''
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if body:
+                    if (self.headers.get('Content-Type') or '').startswith('application/json'):
+                        params.update(json.loads(body))
+                    else:
+                        params.update({k: v[0] for k, v in parse_qs(body.decode()).items()})
+                auth = self.headers.get('Authorization') or ''
+                token = auth[7:] if auth.startswith('Bearer ') else params.get('token')
+
+                method = url.path.rstrip('/').rsplit('/', 1)[-1]
+                try:
+                    response = server.call(method, params, token)
+                    status, headers = 200, {}
+                except FakeSlackError as e:
+                    response = {'ok': False, 'error': e.error}
+                    status = e.status
+                    headers = {'Retry-After': str(math.ceil(e.retry_after))} if e.retry_after else {}
+                body = json.dumps(response).encode()
+                if len(body) >= GZIP_MIN_BYTES and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+                    body = gzip.compress(body, 5)
+                    headers['Content-Encoding'] = 'gzip'
+                self._reply(status, body, 'application/json', headers)
+
+            def _reply(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def _json_param(value: Any) -> Any:
+    # Form-encoded requests carry blocks, files and metadata as JSON strings
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _in_range(messages: List[Dict[str, Any]], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    oldest = float(params.get('oldest') or 0)
+    latest = float(params.get('latest') or 'inf')
+    inclusive = str(params.get('inclusive', '')).lower() in ('1', 'true')
+    if inclusive:
+        return [m for m in messages if oldest <= float(m['ts']) <= latest]
+    return [m for m in messages if oldest < float(m['ts']) < latest]
+
+
+def _parse_limit(value: str) -> Tuple[str, Tuple[float, float]]:
+    method, _, limit = value.partition('=')
+    rate, _, burst = limit.partition(':')
+    return method, (float(rate), float(burst or 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local fake Slack Web API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency (max seconds)')
+    parser.add_argument('--rate', action='append', default=[], type=_parse_limit,
+                        metavar='METHOD=RATE[:BURST]', help='Workspace rate limit per method')
+    parser.add_argument('--channel-rate', action='append', default=[], type=_parse_limit,
+                        metavar='METHOD=RATE[:BURST]', help='Rate limit per method and channel')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls that fail')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeSlackServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limits=dict(args.rate),
+        channel_rate_limits=dict(args.channel_rate),
+        error_rate=args.error_rate
+    )
+    print(f"SLACK_API_BASE_URL={server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+import logging
+import os
+import threading
+from ssl import SSLContext
+from typing import Optional, Dict, Tuple
+from urllib.error import URLError
+from slack_sdk.proxy_env_variable_loader import load_http_proxy_from_env
+from config import Config
+
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ('urllib', 'urllib3', 'httpx')
+
+_default = None
+_default_lock = threading.Lock()
+
+
+class HttpTransport:
+    """
+    Sends the HTTP requests built by WebClient
+
+    slack_sdk's WebClient opens a new connection (and TLS handshake) with
+    urllib for every call. A transport given to SlackThreadClient replaces
+    that one step; building requests and parsing responses is unchanged.
+    Subclasses keep a pool of keep-alive connections and are safe to share
+    between clients and threads.
+
+    Errors are raised the way urllib raises them, so slack_sdk's retry
+    handlers treat them the same: connection failures as URLError and
+    read timeouts as TimeoutError.
+
+    Args:
+        pool_size: Connections kept open per host
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for a response (a circuit breaker's
+            per-call timeout takes precedence)
+        gzip: Ask for gzip-compressed responses
+        proxy: Proxy URL (defaults to HTTPS_PROXY / HTTP_PROXY, as in
+            slack_sdk)
+        ssl: SSL context for HTTPS connections
+    """
+
+    def __init__(
+        self,
+        pool_size: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        gzip: bool = True,
+        proxy: str = None,
+        ssl: SSLContext = None
+    ):
+        self.pool_size = pool_size or Config.SLACK_HTTP_POOL_SIZE
+        self.connect_timeout = connect_timeout or Config.SLACK_HTTP_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout or Config.SLACK_HTTP_READ_TIMEOUT
+        self.gzip = gzip
+        self.proxy = proxy or load_http_proxy_from_env(logger)
+        self.ssl = ssl
+
+    def _headers(self, headers: Dict[str, str]) -> Dict[str, str]:
+        headers = {name: str(value) for name, value in headers.items()}
+        headers['Accept-Encoding'] = 'gzip' if self.gzip else 'identity'
+        return headers
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+        timeout: float = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send one request
+
+        Args:
+            method: HTTP method
+            url: Full URL
+            body: Request body
+            headers: Request headers
+            timeout: Read timeout for this request (default: read_timeout)
+
+        Returns:
+            (status, headers with lowercase names, decompressed body)
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Close pooled connections"""
+
+
+class Urllib3Transport(HttpTransport):
+    """
+    Keep-alive transport backed by a urllib3 PoolManager
+
+    Args:
+        pool_size: Connections kept open per host
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for a response
+        gzip: Ask for gzip-compressed responses
+        proxy: Proxy URL (defaults to HTTPS_PROXY / HTTP_PROXY)
+        ssl: SSL context for HTTPS connections
+        **pool_kwargs: Passed to urllib3.PoolManager
+    """
+
+    def __init__(
+        self,
+        pool_size: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        gzip: bool = True,
+        proxy: str = None,
+        ssl: SSLContext = None,
+        **pool_kwargs
+    ):
+        if urllib3 is None:
+            raise ImportError("urllib3 is required for Urllib3Transport")
+        super().__init__(pool_size, connect_timeout, read_timeout, gzip, proxy, ssl)
+        if self.ssl is not None:
+            pool_kwargs['ssl_context'] = self.ssl
+        # block=True makes extra threads wait for a pooled connection
+        # instead of opening (and then discarding) one of their own
+        pool_kwargs.update(maxsize=self.pool_size, block=True, retries=False)
+        if self.proxy:
+            self.pool = urllib3.ProxyManager(self.proxy, **pool_kwargs)
+        else:
+            self.pool = urllib3.PoolManager(**pool_kwargs)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+        timeout: float = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        try:
+            response = self.pool.request(
+                method,
+                url,
+                body=body,
+                headers=self._headers(headers),
+                timeout=urllib3.Timeout(connect=self.connect_timeout, read=timeout or self.read_timeout),
+                redirect=False,
+                preload_content=True
+            )
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise TimeoutError(str(e)) from e
+        except urllib3.exceptions.HTTPError as e:
+            raise URLError(e) from e
+        return response.status, {k.lower(): v for k, v in response.headers.items()}, response.data
+
+    def close(self):
+        self.pool.clear()
+
+
+class HttpxTransport(HttpTransport):
+    """
+    Keep-alive transport backed by an httpx.Client, optionally HTTP/2
+
+    With http2=True (needs the h2 package) all calls to slack.com share
+    one multiplexed TLS connection.
+
+    Args:
+        pool_size: Connections kept open
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for a response
+        gzip: Ask for gzip-compressed responses
+        http2: Negotiate HTTP/2 where the server supports it
+        proxy: Proxy URL (defaults to HTTPS_PROXY / HTTP_PROXY)
+        ssl: SSL context for HTTPS connections
+        **client_kwargs: Passed to httpx.Client
+    """
+
+    def __init__(
+        self,
+        pool_size: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        gzip: bool = True,
+        http2: bool = None,
+        proxy: str = None,
+        ssl: SSLContext = None,
+        **client_kwargs
+    ):
+        if httpx is None:
+            raise ImportError("httpx is required for HttpxTransport")
+        super().__init__(pool_size, connect_timeout, read_timeout, gzip, proxy, ssl)
+        self.http2 = Config.SLACK_HTTP2 if http2 is None else http2
+        if self.proxy:
+            client_kwargs['proxy'] = self.proxy
+        if self.ssl is not None:
+            client_kwargs['verify'] = self.ssl
+        self.client = httpx.Client(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size
+            ),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            **client_kwargs
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+        timeout: float = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        try:
+            response = self.client.request(
+                method,
+                url,
+                content=body,
+                headers=self._headers(headers),
+                timeout=httpx.Timeout(timeout or self.read_timeout, connect=self.connect_timeout)
+            )
+        except (httpx.ReadTimeout, httpx.WriteTimeout, httpx.PoolTimeout) as e:
+            raise TimeoutError(str(e)) from e
+        except httpx.TransportError as e:
+            raise URLError(e) from e
+        return response.status_code, dict(response.headers), response.content
+
+    def close(self):
+        self.client.close()
+
+
+def create_transport(name: str = None, **kwargs) -> Optional[HttpTransport]:
+    """
+    Build the transport named by name or Config.SLACK_HTTP_TRANSPORT
+
+    Args:
+        name: 'urllib' (slack_sdk's default), 'urllib3' or 'httpx'
+        **kwargs: Transport settings (pool_size, timeouts, gzip, ...)
+
+    Returns:
+        A transport, or None for slack_sdk's own urllib requests
+    """
+    name = (name or Config.SLACK_HTTP_TRANSPORT or 'urllib').lower()
+    if name == 'urllib':
+        return None
+    if name == 'urllib3':
+        return Urllib3Transport(**kwargs)
+    if name == 'httpx':
+        return HttpxTransport(**kwargs)
+    raise ValueError(f"Unknown HTTP transport: {name}")
+
+
+def default_transport() -> Optional[HttpTransport]:
+    """
+    The transport shared by clients created without one
+
+    Built from Config.SLACK_HTTP_TRANSPORT on first use, so every client
+    in the process reuses the same connection pool. A forked child
+    builds its own instead of sharing its parent's sockets.
+
+    Returns:
+        The shared transport, or None for slack_sdk's own urllib requests
+    """
+    global _default
+    with _default_lock:
+        if _default is None or _default[0] != os.getpid():
+            _default = (os.getpid(), create_transport())
+        return _default[1]
@@ -0,0 +1,253 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple, Any
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# GIFs are left alone so animations survive
+OPTIMIZABLE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+FORMAT_EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg', 'PNG': '.png'}
+
+logger = logging.getLogger(__name__)
+
+
+def is_optimizable(filename: str) -> bool:
+    """
+    Check whether a file looks like an image the optimizer can re-encode
+
+    Args:
+        filename: File name or path
+
+    Returns:
+        True for still image formats Pillow can read
+    """
+    return filename.lower().endswith(OPTIMIZABLE_EXTENSIONS)
+
+
+def optimize_image(
+    data: bytes,
+    max_dimension: int = 1920,
+    image_format: str = 'WEBP',
+    quality: int = 80
+) -> Tuple[bytes, str]:
+    """
+    Downscale and re-encode one image without its metadata
+
+    The EXIF orientation is applied to the pixels before the metadata is
+    dropped, so photos keep their rotation.
+
+    Args:
+        data: Encoded image bytes
+        max_dimension: Longest side in pixels after scaling (0 = no limit)
+        image_format: Output format: 'WEBP', 'JPEG' or 'PNG'
+        quality: Encoder quality for WEBP/JPEG (1-100)
+
+    Returns:
+        (encoded bytes, output format)
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        if max_dimension and max(img.size) > max_dimension:
+            img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        if image_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        elif img.mode == 'P':
+            img = img.convert('RGBA')
+        elif img.mode not in ('RGB', 'RGBA', 'L', 'LA', '1'):
+            # CMYK, float and other modes the PNG encoder cannot write
+            img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+        if image_format == 'WEBP':
+            save_kwargs = {'quality': quality, 'method': 4}
+        elif image_format == 'JPEG':
+            save_kwargs = {'quality': quality, 'optimize': True}
+        else:
+            save_kwargs = {'optimize': True}
+
+        out = io.BytesIO()
+        img.save(out, format=image_format, **save_kwargs)
+        return out.getvalue(), image_format
+
+
+def _optimize_worker(args: Tuple[bytes, int, str, int]) -> Tuple[bytes, str]:
+    return optimize_image(*args)
+
+
+class ImageOptimizer:
+    """
+    Image pre-processing stage for uploads
+
+    Resizes, converts and strips metadata from images before they are sent.
+    Batches run in a process pool so every core is used, and results are
+    cached by content hash so the same image is only encoded once. If the
+    re-encoded image is not smaller, or the image cannot be decoded or
+    re-encoded, the original is kept.
+
+    Args:
+        max_dimension: Longest side in pixels after scaling (0 = no limit)
+        image_format: Output format: 'WEBP', 'JPEG' or 'PNG'
+        quality: Encoder quality for WEBP/JPEG (1-100)
+        max_workers: Processes in the pool (defaults to the CPU count)
+        max_cache_bytes: Total size of optimized images kept in the cache
+    """
+
+    def __init__(
+        self,
+        max_dimension: int = 1920,
+        image_format: str = 'WEBP',
+        quality: int = 80,
+        max_workers: int = None,
+        max_cache_bytes: int = 64 * 1024 * 1024
+    ):
+        if Image is None:
+            raise ImportError("Pillow is required for image optimization: pip install Pillow")
+        if image_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        self.max_dimension = max_dimension
+        self.image_format = image_format
+        self.quality = quality
+        self.max_workers = max_workers or os.cpu_count()
+        self.max_cache_bytes = max_cache_bytes
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self.stats = {'images': 0, 'cache_hits': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def _key(self, data: bytes) -> str:
+        digest = hashlib.blake2b(data, digest_size=20)
+        digest.update(f"{self.max_dimension}:{self.image_format}:{self.quality}".encode())
+        return digest.hexdigest()
+
+    def _rename(self, filename: str, image_format: str) -> str:
+        root, ext = os.path.splitext(filename)
+        new_ext = FORMAT_EXTENSIONS[image_format]
+        if ext.lower() in ('.jpeg', '.jpg') and new_ext == '.jpg':
+            return filename
+        return root + new_ext
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key: str, entry: Tuple[bytes, str]):
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = entry
+            self._cache_bytes += len(entry[0])
+            while self._cache_bytes > self.max_cache_bytes and self._cache:
+                _, (old, _) = self._cache.popitem(last=False)
+                self._cache_bytes -= len(old)
+
+    def _encoded(self, filename: str, encode, *args) -> Optional[Tuple[bytes, str]]:
+        try:
+            return encode(*args)
+        except Exception as e:
+            # Files Pillow cannot read (or re-encode) are uploaded as they are
+            logger.warning("Could not optimize image %s, uploading original: %s", filename, e)
+            return None
+
+    def _result(self, data: bytes, filename: str, entry: Optional[Tuple[bytes, str]]) -> Tuple[bytes, str]:
+        if entry is None:
+            optimized, image_format = data, None
+        else:
+            optimized, image_format = entry
+        if image_format is None or len(optimized) >= len(data):
+            optimized = data
+        else:
+            filename = self._rename(filename, image_format)
+
+        with self._lock:
+            self.stats['images'] += 1
+            self.stats['bytes_in'] += len(data)
+            self.stats['bytes_out'] += len(optimized)
+        return optimized, filename
+
+    def optimize(self, data: bytes, filename: str) -> Tuple[bytes, str]:
+        """
+        Optimize one image in the current process
+
+        Args:
+            data: Encoded image bytes
+            filename: Original file name
+
+        Returns:
+            (bytes to upload, file name with the new extension)
+        """
+        return self.optimize_many([(data, filename)], use_pool=False)[0]
+
+    def optimize_many(
+        self,
+        images: List[Tuple[bytes, str]],
+        use_pool: bool = True
+    ) -> List[Tuple[bytes, str]]:
+        """
+        Optimize a batch of images, encoding cache misses in parallel
+
+        Args:
+            images: (bytes, filename) pairs
+            use_pool: Encode in the process pool (False = this process)
+
+        Returns:
+            (bytes to upload, file name) for each input, in order
+        """
+        keys = [self._key(data) for data, _ in images]
+        entries = [self._cache_get(key) for key in keys]
+        misses = [i for i, entry in enumerate(entries) if entry is None]
+        with self._lock:
+            self.stats['cache_hits'] += len(images) - len(misses)
+
+        jobs = [
+            (images[i][0], self.max_dimension, self.image_format, self.quality)
+            for i in misses
+        ]
+        if use_pool and len(jobs) > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            futures = [self._pool.submit(_optimize_worker, job) for job in jobs]
+            encoded = [self._encoded(images[i][1], future.result) for i, future in zip(misses, futures)]
+        else:
+            encoded = [self._encoded(images[i][1], _optimize_worker, job) for i, job in zip(misses, jobs)]
+
+        for i, entry in zip(misses, encoded):
+            if entry is None:
+                continue
+            self._cache_put(keys[i], entry)
+            entries[i] = entry
+
+        return [
+            self._result(data, filename, entry)
+            for (data, filename), entry in zip(images, entries)
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get optimizer counters
+
+        Returns:
+            images processed, cache hits, bytes in and bytes out
+        """
+        with self._lock:
+            return dict(self.stats)
+
+    def close(self):
+        """
+        Shut down the process pool
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
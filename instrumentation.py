@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Any, Optional
+from slack_sdk.errors import SlackApiError
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+# Called with one event dict per Web API call
+Hook = Callable[[Dict[str, Any]], None]
+
+
+def payload_size(kwargs: Dict[str, Any]) -> int:
+    """
+    Approximate request size of a Web API call's arguments
+
+    Strings and bytes count their encoded length, local file paths their
+    file size, and lists or dicts (blocks, attachments) their JSON length.
+
+    Args:
+        kwargs: Arguments passed to the WebClient method
+
+    Returns:
+        Size in bytes
+    """
+    size = 0
+    for key, value in kwargs.items():
+        if value is None:
+            continue
+        if key == 'file' and isinstance(value, str):
+            try:
+                size += os.path.getsize(value)
+            except OSError:
+                pass
+        elif isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, str):
+            size += len(value.encode('utf-8'))
+        elif isinstance(value, (list, dict)):
+            size += len(json.dumps(value, default=str))
+    return size
+
+
+def call_event(
+    method: str,
+    channel: Optional[str],
+    kwargs: Dict[str, Any],
+    duration: float,
+    rate_limit_wait: float,
+    retries: int,
+    error: Optional[BaseException] = None
+) -> Dict[str, Any]:
+    """
+    Build the event passed to hooks for one Web API call
+
+    Args:
+        method: Web API method name
+        channel: Channel the call targeted
+        kwargs: Arguments passed to the WebClient method
+        duration: Seconds from first rate limit wait to final response
+        rate_limit_wait: Seconds of that spent waiting on the rate limiter
+        retries: Attempts repeated after HTTP 429
+        error: Exception the call ended with, if any
+
+    Returns:
+        Dict with method, channel, duration, rate_limit_wait, retries,
+        payload_bytes, ok, error and status
+    """
+    status = 200
+    error_code = None
+    if isinstance(error, SlackApiError):
+        status = getattr(error.response, 'status_code', None)
+        error_code = error.response.get('error') if hasattr(error.response, 'get') else None
+        error_code = error_code or 'slack_api_error'
+    elif error is not None:
+        status = None
+        error_code = type(error).__name__
+    return {
+        'method': method,
+        'channel': channel,
+        'duration': duration,
+        'rate_limit_wait': rate_limit_wait,
+        'retries': retries,
+        'payload_bytes': payload_size(kwargs),
+        'ok': error is None,
+        'error': error_code,
+        'status': status
+    }
+
+
+def emit(hooks: List[Hook], event: Dict[str, Any]):
+    """
+    Pass an event to every hook; a failing hook never fails the call
+
+    Args:
+        hooks: Hook callables
+        event: Event from call_event()
+    """
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            logger.exception("Instrumentation hook %r failed", hook)
+
+
+class LoggingHook:
+    """
+    Logs one line per Web API call
+
+    Args:
+        level: Logging level of the lines
+        logger_name: Logger to write to
+    """
+
+    def __init__(self, level: int = logging.DEBUG, logger_name: str = 'slack_api'):
+        self.level = level
+        self.logger = logging.getLogger(logger_name)
+
+    def __call__(self, event: Dict[str, Any]):
+        self.logger.log(
+            self.level,
+            "%s channel=%s %.1fms wait=%.3fs retries=%d bytes=%d error=%s",
+            event['method'], event['channel'], event['duration'] * 1000,
+            event['rate_limit_wait'], event['retries'], event['payload_bytes'], event['error']
+        )
+
+
+class PrometheusHook:
+    """
+    Records Web API calls as Prometheus metrics
+
+    Metrics (with prefix namespace, default 'slack'):
+        <ns>_api_calls_total{method, outcome}: outcome is 'ok' or the Slack error
+        <ns>_api_call_duration_seconds{method}: histogram of call time
+        <ns>_api_rate_limit_wait_seconds{method}: histogram of limiter waits
+        <ns>_api_retries_total{method}: retries after HTTP 429
+        <ns>_api_request_bytes_total{method}: approximate bytes sent
+
+    Channels are not used as labels, to keep cardinality bounded.
+
+    Args:
+        registry: prometheus_client registry (default: the global one)
+        namespace: Metric name prefix
+    """
+
+    def __init__(self, registry=None, namespace: str = 'slack'):
+        if prometheus_client is None:
+            raise ImportError("prometheus-client is required for PrometheusHook")
+        extra = {} if registry is None else {'registry': registry}
+        self.calls = prometheus_client.Counter(
+            'api_calls', 'Slack Web API calls', ['method', 'outcome'],
+            namespace=namespace, **extra
+        )
+        self.duration = prometheus_client.Histogram(
+            'api_call_duration_seconds', 'Slack Web API call time, including retries',
+            ['method'], namespace=namespace, **extra
+        )
+        self.wait = prometheus_client.Histogram(
+            'api_rate_limit_wait_seconds', 'Time spent waiting on the client rate limiter',
+            ['method'], namespace=namespace,
+            buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60), **extra
+        )
+        self.retries = prometheus_client.Counter(
+            'api_retries', 'Slack Web API calls repeated after HTTP 429', ['method'],
+            namespace=namespace, **extra
+        )
+        self.request_bytes = prometheus_client.Counter(
+            'api_request_bytes', 'Approximate bytes sent to the Slack Web API', ['method'],
+            namespace=namespace, **extra
+        )
+
+    def __call__(self, event: Dict[str, Any]):
+        method = event['method']
+        self.calls.labels(method, event['error'] or 'ok').inc()
+        self.duration.labels(method).observe(event['duration'])
+        self.wait.labels(method).observe(event['rate_limit_wait'])
+        if event['retries']:
+            self.retries.labels(method).inc(event['retries'])
+        self.request_bytes.labels(method).inc(event['payload_bytes'])
+
+
+class OpenTelemetryHook:
+    """
+    Records each Web API call as an OpenTelemetry client span
+
+    The span is created when the call finishes, with its start time set
+    back by the call's duration. Hooks run on the calling thread, so the
+    span is parented to whatever span was current around the client call.
+
+    Args:
+        tracer: Tracer to use (default: one from the global provider)
+    """
+
+    def __init__(self, tracer=None):
+        if trace is None:
+            raise ImportError("opentelemetry-api is required for OpenTelemetryHook")
+        self.tracer = tracer or trace.get_tracer(__name__)
+
+    def __call__(self, event: Dict[str, Any]):
+        end = time.time_ns()
+        attributes = {
+            'slack.method': event['method'],
+            'slack.retries': event['retries'],
+            'slack.rate_limit_wait': event['rate_limit_wait'],
+            'slack.payload_bytes': event['payload_bytes'],
+        }
+        if event['channel']:
+            attributes['slack.channel'] = event['channel']
+        if event['status'] is not None:
+            attributes['http.status_code'] = event['status']
+        span = self.tracer.start_span(
+            f"slack {event['method']}",
+            kind=SpanKind.CLIENT,
+            start_time=end - int(event['duration'] * 1e9),
+            attributes=attributes
+        )
+        if not event['ok']:
+            span.set_status(Status(StatusCode.ERROR, event['error']))
+        span.end(end_time=end)
@@ -0,0 +1,176 @@
+import json
+import logging
+import threading
+import time
+from typing import Optional, Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+
+class LiveMessage:
+    """
+    A posted message that is kept up to date with chat.update
+
+    set_text() / set_blocks() only record the desired state. An update is
+    sent when the rendered payload differs from what Slack already shows,
+    at most once per min_interval; changes made in between, including
+    while an update is in flight, are folded into one trailing update.
+    close() always pushes the final state.
+
+    Args:
+        client: SlackThreadClient that posted the message
+        channel: Channel ID of the message
+        ts: Message timestamp (also the thread_ts for replies)
+        text: Text the message was posted with
+        blocks: Blocks the message was posted with
+        min_interval: Seconds between updates (defaults to the rate
+            limiter's chat.update rate)
+    """
+
+    def __init__(
+        self,
+        client,
+        channel: str,
+        ts: str,
+        text: str,
+        blocks: List[Dict] = None,
+        min_interval: float = None
+    ):
+        self.client = client
+        self.channel = channel
+        self.ts = ts
+        if min_interval is None:
+            rate, _ = client.rate_limiter.method_limits['chat.update']
+            min_interval = 1.0 / rate
+        self.min_interval = min_interval
+        self.stats = {'updates': 0, 'skipped': 0, 'coalesced': 0, 'errors': 0}
+        self._text = text
+        self._blocks = blocks
+        self._sent_payload = self._render(text, blocks)
+        self._last_sent = time.monotonic()
+        self._timer = None
+        # True while chat.update is in flight; changes made meanwhile wait
+        # for the trailing update scheduled when it returns
+        self._sending = False
+        self._changed_while_sending = False
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+
+    @property
+    def thread_ts(self) -> str:
+        return self.ts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _render(text: str, blocks: Optional[List[Dict]]) -> str:
+        return json.dumps({'text': text, 'blocks': blocks}, sort_keys=True)
+
+    def set_text(self, text: str):
+        """
+        Change the message text
+
+        Args:
+            text: New message text
+        """
+        self.set(text=text, blocks=self._blocks)
+
+    def set_blocks(self, blocks: List[Dict], text: str = None):
+        """
+        Change the message blocks
+
+        Args:
+            blocks: New Slack blocks
+            text: New fallback text (keeps the current text if omitted)
+        """
+        self.set(text=self._text if text is None else text, blocks=blocks)
+
+    def set(self, text: str, blocks: List[Dict] = None):
+        """
+        Change text and blocks together
+
+        Args:
+            text: New message text
+            blocks: New Slack blocks
+        """
+        with self._lock:
+            self._text, self._blocks = text, blocks
+            if self._timer is not None or self._sending:
+                self._changed_while_sending = self._sending
+                self.stats['coalesced'] += 1
+                return
+            if self._render(text, blocks) == self._sent_payload:
+                self.stats['skipped'] += 1
+                return
+            wait = self._last_sent + self.min_interval - time.monotonic()
+            if wait > 0:
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        self.flush()
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """
+        Send the current state now if Slack does not have it yet
+
+        Returns:
+            update_message result, or None if nothing changed
+        """
+        with self._send_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                text, blocks = self._text, self._blocks
+                payload = self._render(text, blocks)
+                if payload == self._sent_payload:
+                    return None
+                self._sending = True
+                self._changed_while_sending = False
+
+            response = None
+            try:
+                response = self.client.update_message(
+                    channel=self.channel,
+                    ts=self.ts,
+                    text=text,
+                    blocks=blocks
+                )
+            finally:
+                with self._lock:
+                    self._sending = False
+                    self._last_sent = time.monotonic()
+                    if response and response.get('ok'):
+                        self._sent_payload = payload
+                        self.stats['updates'] += 1
+                    else:
+                        self.stats['errors'] += 1
+                    if self._changed_while_sending and self._timer is None:
+                        self._timer = threading.Timer(self.min_interval, self.flush)
+                        self._timer.daemon = True
+                        self._timer.start()
+            return response
+
+    def close(self) -> Optional[Dict[str, Any]]:
+        """
+        Push the final state, ignoring the throttle
+
+        Returns:
+            update_message result, or None if nothing changed
+        """
+        return self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get update counters
+
+        Returns:
+            updates sent, skipped (unchanged), coalesced and errors
+        """
+        with self._lock:
+            return dict(self.stats)
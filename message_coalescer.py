@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingReplies:
+    def __init__(self, channel: str, now: float):
+        self.channel = channel
+        self.texts = []
+        self.chars = 0
+        self.first_at = now
+        self.last_at = now
+        self.ticket = 0
+
+
+class MessageCoalescer:
+    """
+    Batches high-frequency replies to the same thread
+
+    Replies are buffered per thread and sent once the thread has been quiet
+    for window seconds, or at the latest max_latency seconds after the
+    first buffered reply. In 'merge' mode the buffered replies are posted
+    as one message joined by newlines; in 'update' mode the thread gets a
+    single status message that is edited in place with the latest reply.
+    Batches for the same thread are always sent in the order they were
+    taken from the buffer, whichever thread sends them.
+
+    Args:
+        client: SlackThreadClient used to send
+        window: Quiet period in seconds before a thread is flushed
+        max_latency: Longest a reply may wait in the buffer
+        mode: 'merge' or 'update'
+        max_chars: Flush early once a merged message would exceed this
+        max_status_messages: Status messages remembered in 'update' mode;
+            the least recently used thread starts a new one
+    """
+
+    def __init__(
+        self,
+        client,
+        window: float = 2.0,
+        max_latency: float = 10.0,
+        mode: str = 'merge',
+        max_chars: int = 4000,
+        max_status_messages: int = 10000
+    ):
+        if mode not in ('merge', 'update'):
+            raise ValueError(f"Unknown coalescing mode: {mode}")
+        self.client = client
+        self.window = window
+        self.max_latency = max_latency
+        self.mode = mode
+        self.max_chars = max_chars
+        self.max_status_messages = max_status_messages
+        self.stats = {'replies': 0, 'api_calls': 0, 'errors': 0}
+        self._pending = {}
+        self._status_ts = OrderedDict()
+        # thread_ts -> next ticket to hand out / ticket whose turn it is to send
+        self._tickets = {}
+        self._turns = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='slack-coalescer', daemon=True)
+        self._thread.start()
+
+    def reply(self, thread_ts: str, text: str, channel: str = None):
+        """
+        Buffer a reply to a thread
+
+        Args:
+            thread_ts: Thread timestamp
+            text: Reply message text
+            channel: Channel ID (defaults to the thread's channel)
+        """
+        if not channel:
+            thread = self.client.active_threads.get(thread_ts)
+            channel = thread['channel'] if thread else self.client.default_channel
+
+        overflow = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MessageCoalescer is closed")
+            now = time.monotonic()
+            pending = self._pending.get(thread_ts)
+            if (
+                pending is not None and self.mode == 'merge'
+                and pending.chars + len(text) + 1 > self.max_chars
+            ):
+                overflow = self._take(thread_ts)
+                pending = None
+            if pending is None:
+                pending = self._pending[thread_ts] = _PendingReplies(channel, now)
+            pending.texts.append(text)
+            pending.chars += len(text) + 1
+            pending.last_at = now
+            self.stats['replies'] += 1
+            self._cond.notify()
+
+        if overflow is not None:
+            self._send(thread_ts, overflow)
+
+    def flush(self, thread_ts: str = None):
+        """
+        Send buffered replies now
+
+        Args:
+            thread_ts: Only flush this thread (default: all threads)
+        """
+        with self._cond:
+            if thread_ts is None:
+                batches = [(ts, self._take(ts)) for ts in list(self._pending)]
+            else:
+                batches = [(thread_ts, self._take(thread_ts))] if thread_ts in self._pending else []
+        for ts, pending in batches:
+            self._send(ts, pending)
+
+    def finish(self, thread_ts: str):
+        """
+        Flush a thread and forget its status message
+
+        Call when a job reporting to the thread is done; in 'update' mode
+        a later reply to the thread starts a new status message.
+
+        Args:
+            thread_ts: Thread timestamp
+        """
+        self.flush(thread_ts)
+        with self._cond:
+            # Let a send already taken by the flusher finish first
+            while thread_ts in self._tickets:
+                self._cond.wait()
+            self._status_ts.pop(thread_ts, None)
+
+    def close(self):
+        """
+        Flush everything and stop the background flusher
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        with self._cond:
+            self._status_ts.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing counters
+
+        Returns:
+            replies buffered, api_calls made, calls_saved and errors
+        """
+        with self._cond:
+            stats = dict(self.stats)
+            buffered = sum(len(p.texts) for p in self._pending.values())
+        stats['calls_saved'] = stats['replies'] - buffered - stats['api_calls']
+        return stats
+
+    def _deadline(self, pending: _PendingReplies) -> float:
+        return min(pending.last_at + self.window, pending.first_at + self.max_latency)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = [
+                    ts for ts, pending in self._pending.items()
+                    if self._deadline(pending) <= now
+                ]
+                batches = [(ts, self._take(ts)) for ts in due]
+                if not batches:
+                    deadlines = [self._deadline(p) for p in self._pending.values()]
+                    timeout = min(deadlines) - now if deadlines else None
+                    self._cond.wait(timeout)
+                    continue
+            for ts, pending in batches:
+                self._send(ts, pending)
+
+    def _take(self, thread_ts: str) -> _PendingReplies:
+        # Caller holds self._cond; tickets fix the order batches are sent in
+        pending = self._pending.pop(thread_ts)
+        pending.ticket = self._tickets.get(thread_ts, 0)
+        self._tickets[thread_ts] = pending.ticket + 1
+        return pending
+
+    def _send(self, thread_ts: str, pending: _PendingReplies):
+        # An overflow or manual flush on the caller's thread can race the
+        # flusher; wait until every earlier batch of this thread is sent
+        with self._cond:
+            while self._turns.get(thread_ts, 0) != pending.ticket:
+                self._cond.wait()
+            status_ts = self._status_ts.get(thread_ts)
+
+        response = None
+        try:
+            if self.mode == 'update' and status_ts:
+                response = self.client.update_message(
+                    channel=pending.channel,
+                    ts=status_ts,
+                    text=pending.texts[-1]
+                )
+            else:
+                text = pending.texts[-1] if self.mode == 'update' else '\n'.join(pending.texts)
+                response = self.client.send_message(
+                    text=text,
+                    channel=pending.channel,
+                    thread_ts=thread_ts
+                )
+        finally:
+            with self._cond:
+                if self.mode == 'update' and response and response.get('ok'):
+                    self._status_ts[thread_ts] = status_ts or response['ts']
+                    self._status_ts.move_to_end(thread_ts)
+                    while len(self._status_ts) > self.max_status_messages:
+                        self._status_ts.popitem(last=False)
+                self.stats['api_calls'] += 1
+                if not response or not response.get('ok'):
+                    self.stats['errors'] += 1
+                if self._tickets.get(thread_ts) == pending.ticket + 1:
+                    # Nothing else taken for this thread
+                    del self._tickets[thread_ts]
+                    self._turns.pop(thread_ts, None)
+                else:
+                    self._turns[thread_ts] = pending.ticket + 1
+                self._cond.notify_all()
+        if len(pending.texts) > 1:
+            logger.debug("Coalesced %s replies into one call for thread %s", len(pending.texts), thread_ts)
@@ -0,0 +1,82 @@
+from typing import Dict, List
+
+# chat.postMessage truncates text past 40,000 characters
+MAX_TEXT_CHARS = 40000
+MAX_BLOCKS = 50
+# Above this many characters a message is uploaded as a text snippet
+UPLOAD_THRESHOLD = 200000
+
+FENCE = '```'
+
+
+def split_text(text: str, limit: int = MAX_TEXT_CHARS) -> List[str]:
+    """
+    Split text into chunks of at most limit characters
+
+    Chunks end on line boundaries where possible; only a single line
+    longer than the limit is cut mid-line. A code block that spans two
+    chunks is closed at the end of the first and reopened at the start of
+    the next, so both render as code.
+
+    Args:
+        text: Message text
+        limit: Maximum characters per chunk
+
+    Returns:
+        List of chunks, in order (at least one)
+    """
+    if len(text) <= limit:
+        return [text]
+    if limit < 64:
+        raise ValueError(f"limit too small to split text: {limit}")
+
+    # Room for the "\n```" that closes a code block cut at a chunk end
+    budget = limit - len(FENCE) - 1
+    chunks = []
+    fence = None
+    prefix = current = ''
+
+    def flush():
+        chunk = current.rstrip('\n')
+        if chunk.strip() and chunk != prefix.rstrip('\n'):
+            if fence is not None:
+                chunk += '\n' + FENCE
+            chunks.append(chunk)
+
+    for line in text.splitlines(keepends=True):
+        rest = line
+        while rest:
+            room = budget - len(current)
+            if len(rest) <= room:
+                current += rest
+                break
+            if current != prefix:
+                flush()
+            else:
+                # A line that does not fit in an empty chunk is cut
+                current += rest[:room]
+                rest = rest[room:]
+                flush()
+            prefix = current = '' if fence is None else FENCE + '\n'
+
+        if line.count(FENCE) % 2:
+            fence = line if fence is None else None
+
+    flush()
+    # Text that is only whitespace leaves no chunk; send it cut to the limit
+    # and let Slack decide, rather than sending nothing
+    return chunks or [text[:limit]]
+
+
+def split_blocks(blocks: List[Dict], limit: int = MAX_BLOCKS) -> List[List[Dict]]:
+    """
+    Split a block list into groups of at most limit blocks
+
+    Args:
+        blocks: Slack blocks
+        limit: Maximum blocks per message
+
+    Returns:
+        List of block lists, in order
+    """
+    return [blocks[i:i + limit] for i in range(0, len(blocks), limit)] or [blocks]
@@ -0,0 +1,393 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional, Dict, List, Any
+from slack_sdk.errors import SlackApiError
+from config import Config
+from circuit_breaker import CircuitOpenError
+import message_splitter
+
+logger = logging.getLogger(__name__)
+
+# Errors that will not go away by retrying
+PERMANENT_ERRORS = {
+    'channel_not_found', 'not_in_channel', 'is_archived', 'invalid_auth',
+    'account_inactive', 'token_revoked', 'msg_too_long', 'no_text',
+    'invalid_blocks', 'invalid_attachments', 'missing_scope', 'restricted_action',
+    'thread_reply_not_supported'
+}
+
+METADATA_EVENT_TYPE = 'outbox_message'
+
+
+class Outbox:
+    """
+    Durable outbound message queue for a SlackThreadClient
+
+    enqueue() appends the message to a SQLite write-ahead log and returns
+    immediately; a background thread sends queued messages in order with
+    retries and exponential backoff. Each message carries an idempotency
+    key, which is also attached to the Slack message as metadata. After a
+    crash, messages that were in flight are looked up in Slack by that key
+    before being sent again, so they are not posted twice.
+
+    Messages to the same channel and thread are always sent in enqueue
+    order; a message waiting on a retry holds back the ones behind it.
+    Delivery goes through the client's own posting path, so sent messages
+    are registered and indexed just like send_message's. Each queued
+    message is posted as one Slack message and is never split, so text
+    past Slack's limits is rejected by enqueue(); send_message splits
+    before it queues.
+
+    Args:
+        client: SlackThreadClient used to send
+        path: SQLite database file for the queue (defaults to Config.OUTBOX_PATH)
+        max_attempts: Attempts before a message is marked failed
+        base_delay: First retry delay in seconds (doubles per attempt)
+        max_delay: Upper bound on the retry delay
+        poll_interval: Seconds the sender sleeps when nothing is due
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            channel TEXT NOT NULL,
+            thread_ts TEXT,
+            text TEXT,
+            blocks TEXT,
+            attachments TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            attempted_at REAL,
+            created_at REAL NOT NULL,
+            sent_ts TEXT,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_outbox_status_due
+            ON outbox (status, next_attempt_at);
+        CREATE INDEX IF NOT EXISTS idx_outbox_thread
+            ON outbox (channel, thread_ts, status);
+    """
+
+    def __init__(
+        self,
+        client,
+        path: str = None,
+        max_attempts: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+        poll_interval: float = 1.0
+    ):
+        self.client = client
+        self.path = path or Config.OUTBOX_PATH
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # The WAL survives a process crash at this level; only an OS crash
+        # or power loss can lose the last commits
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def enqueue(
+        self,
+        text: str,
+        channel: str = None,
+        thread_ts: str = None,
+        blocks: List[Dict] = None,
+        attachments: List[Dict] = None,
+        idempotency_key: str = None
+    ) -> str:
+        """
+        Queue a message for delivery
+
+        Enqueuing the same idempotency_key twice is a no-op, so callers can
+        safely retry after their own crash.
+
+        Args:
+            text: Message text
+            channel: Channel ID (defaults to the thread's or configured channel)
+            thread_ts: Thread timestamp for threading
+            blocks: Slack blocks for rich formatting
+            attachments: Message attachments
+            idempotency_key: Unique key for this message (generated if omitted)
+
+        Returns:
+            The idempotency key
+
+        Raises:
+            ValueError: If text or blocks are past Slack's per-message limits
+        """
+        too_many_blocks = isinstance(blocks, list) and len(blocks) > message_splitter.MAX_BLOCKS
+        if len(text or '') > message_splitter.MAX_TEXT_CHARS or too_many_blocks:
+            raise ValueError("Message is too long for one Slack message; split it before queuing")
+        if not channel:
+            thread = self.client.active_threads.get(thread_ts) if thread_ts else None
+            channel = thread['channel'] if thread else self.client.default_channel
+        idempotency_key = idempotency_key or uuid.uuid4().hex
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO outbox '
+                '(idempotency_key, channel, thread_ts, text, blocks, attachments, '
+                'next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    idempotency_key, channel, thread_ts, text,
+                    json.dumps(blocks) if blocks else None,
+                    json.dumps(attachments) if attachments else None,
+                    now, now
+                )
+            )
+        self._wakeup.set()
+        return idempotency_key
+
+    def get(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the delivery state of a queued message
+
+        Args:
+            idempotency_key: Key returned by enqueue()
+
+        Returns:
+            Dict with status, attempts, ts (once sent) and error, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, attempts, channel, thread_ts, sent_ts, error '
+                'FROM outbox WHERE idempotency_key = ?',
+                (idempotency_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'status': row[0],
+            'attempts': row[1],
+            'channel': row[2],
+            'thread_ts': row[3],
+            'ts': row[4],
+            'error': row[5]
+        }
+
+    def start(self):
+        """
+        Recover in-flight messages and start the background sender
+        """
+        if self._thread is not None:
+            return
+        self.recover()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='slack-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """
+        Stop the background sender after its current message
+
+        Args:
+            timeout: Seconds to wait for the sender thread
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until nothing is pending or in flight
+
+        Args:
+            timeout: Maximum seconds to wait (None = forever)
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending_count():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._wakeup.set()
+            time.sleep(0.05)
+        return True
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Count messages by status
+
+        Returns:
+            Dict of status -> count (pending, sending, sent, failed)
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status')
+            stats = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+            stats.update(dict(rows.fetchall()))
+        return stats
+
+    def recover(self) -> int:
+        """
+        Resolve messages left in flight by a previous process
+
+        A message marked 'sending' may or may not have reached Slack. It is
+        looked up by its idempotency key in the channel or thread; if found
+        it is marked sent, otherwise (or if the lookup fails) it is queued
+        again.
+
+        Returns:
+            Number of messages that had already been delivered
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, idempotency_key, channel, thread_ts, attempted_at "
+                "FROM outbox WHERE status = 'sending'"
+            ).fetchall()
+
+        delivered = 0
+        for row_id, key, channel, thread_ts, attempted_at in rows:
+            ts = self._find_delivered(key, channel, thread_ts, attempted_at)
+            with self._lock:
+                if ts:
+                    delivered += 1
+                    self._conn.execute(
+                        "UPDATE outbox SET status = 'sent', sent_ts = ? WHERE id = ?",
+                        (ts, row_id)
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE outbox SET status = 'pending' WHERE id = ?", (row_id,)
+                    )
+        if rows:
+            logger.info("Outbox recovery: %s/%s in-flight messages were delivered", delivered, len(rows))
+        return delivered
+
+    def _find_delivered(self, key: str, channel: str, thread_ts: str, attempted_at: float) -> Optional[str]:
+        # Look a little before the attempt to allow for clock skew
+        oldest = str((attempted_at or time.time()) - 60)
+        method, kwargs = 'conversations.history', {}
+        if thread_ts:
+            method, kwargs = 'conversations.replies', {'ts': thread_ts}
+        cursor = None
+        try:
+            while True:
+                response = self.client._api_call(
+                    method,
+                    channel=channel,
+                    oldest=oldest,
+                    limit=200,
+                    cursor=cursor,
+                    include_all_metadata=True,
+                    **kwargs
+                )
+                for message in response.get('messages', []):
+                    payload = (message.get('metadata') or {}).get('event_payload') or {}
+                    if payload.get('idempotency_key') == key:
+                        return message['ts']
+                cursor = (response.get('response_metadata') or {}).get('next_cursor')
+                if not cursor:
+                    return None
+        except SlackApiError as e:
+            # Without history access we can only resend (at-least-once)
+            logger.warning("Outbox recovery lookup failed: %s", e.response.get('error'))
+        except Exception as e:
+            # Network errors, open circuit: resend rather than fail start()
+            logger.warning("Outbox recovery lookup failed: %s", e)
+        return None
+
+    def _next_due(self) -> Optional[tuple]:
+        # The oldest due message whose thread has nothing older still queued
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, idempotency_key, channel, thread_ts, text, blocks, attachments, attempts "
+                "FROM outbox AS o WHERE status = 'pending' AND next_attempt_at <= ? "
+                "AND NOT EXISTS ("
+                "  SELECT 1 FROM outbox AS e WHERE e.channel = o.channel "
+                "  AND e.thread_ts IS o.thread_ts AND e.id < o.id "
+                "  AND e.status IN ('pending', 'sending')"
+                ") ORDER BY id LIMIT 1",
+                (time.time(),)
+            ).fetchone()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _send(self, row: tuple):
+        row_id, key, channel, thread_ts, text, blocks, attachments, attempts = row
+        attempts += 1
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sending', attempts = ?, attempted_at = ? WHERE id = ?",
+                (attempts, time.time(), row_id)
+            )
+
+        try:
+            response = self.client._post_message(
+                channel=channel,
+                text=text,
+                thread_ts=thread_ts,
+                blocks=json.loads(blocks) if blocks else None,
+                attachments=json.loads(attachments) if attachments else None,
+                metadata={
+                    'event_type': METADATA_EVENT_TYPE,
+                    'event_payload': {'idempotency_key': key}
+                }
+            )
+        except CircuitOpenError as e:
+            # Not an attempt: wait for the circuit to close without using up retries
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ? WHERE id = ?",
+                    (attempts - 1, time.time() + e.retry_in, row_id)
+                )
+            return
+        except Exception as e:
+            error = e.response.get('error') if isinstance(e, SlackApiError) else str(e)
+            if error in PERMANENT_ERRORS or attempts >= self.max_attempts:
+                status, next_attempt_at = 'failed', time.time()
+                logger.error("Outbox message %s failed: %s", key, error)
+            else:
+                status, next_attempt_at = 'pending', time.time() + self._backoff(attempts)
+                logger.warning("Outbox message %s attempt %s failed: %s", key, attempts, error)
+            with self._lock:
+                self._conn.execute(
+                    'UPDATE outbox SET status = ?, next_attempt_at = ?, error = ? WHERE id = ?',
+                    (status, next_attempt_at, error, row_id)
+                )
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sent', sent_ts = ?, error = NULL WHERE id = ?",
+                (response['ts'], row_id)
+            )
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+            row = self._next_due()
+            if row is None:
+                self._wakeup.wait(self.poll_interval)
+                continue
+            self._send(row)
+
+    def close(self):
+        self.stop()
+        self._conn.close()
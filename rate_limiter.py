@@ -0,0 +1,369 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from typing import Optional, Dict, Tuple, Any
+
+# Sustained requests/second and burst size per Web API method.
+# Tier 2 = 20+/min, Tier 3 = 50+/min, Tier 4 = 100+/min
+# (https://api.slack.com/docs/rate-limits)
+METHOD_LIMITS = {
+    # Workspace-wide ceiling; the real constraint is the per-channel limit below
+    'chat.postMessage': (5.0, 20),
+    'chat.update': (50 / 60, 10),
+    'chat.delete': (50 / 60, 10),
+    'conversations.replies': (50 / 60, 10),
+    'conversations.history': (50 / 60, 10),
+    'files.upload_v2': (100 / 60, 20),
+    'files.getUploadURLExternal': (100 / 60, 20),
+    'files.completeUploadExternal': (100 / 60, 20),
+    'auth.test': (100 / 60, 20),
+}
+DEFAULT_METHOD_LIMIT = (20 / 60, 5)
+
+# Methods that are additionally limited per channel.
+# chat.postMessage allows about one message per second per channel,
+# with short bursts tolerated.
+CHANNEL_LIMITS = {
+    'chat.postMessage': (1.0, 3),
+}
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations
+
+    A reservation always succeeds and returns how long the caller has to
+    wait for its token, so concurrent callers are served in FIFO order
+    at exactly the configured rate.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """
+        Take one token and return the delay before it may be used
+
+        Args:
+            now: Current time.monotonic() value
+
+        Returns:
+            Seconds to wait (0 if a token was available)
+        """
+        # updated is in the future while the bucket is paused
+        start = max(now, self.updated)
+        self.tokens = min(self.capacity, self.tokens + (start - self.updated) * self.rate)
+        self.updated = start
+        self.tokens -= 1
+        return (start - now) + max(0.0, -self.tokens) / self.rate
+
+    def pause(self, now: float, seconds: float):
+        """
+        Stop handing out tokens for the given number of seconds
+
+        Args:
+            now: Current time.monotonic() value
+            seconds: Pause length, usually Slack's Retry-After value
+        """
+        # Saved-up burst is no longer valid once Slack says stop; only one
+        # call goes out when the pause ends
+        self.tokens = min(self.tokens, 1.0)
+        self.updated = max(self.updated, now + seconds)
+
+
+class RateLimiter:
+    """
+    Per-method and per-channel rate limit scheduler for Web API calls
+
+    Every call reserves a token from its method's bucket and, for methods
+    in CHANNEL_LIMITS, from the target channel's bucket too, then waits for
+    the later of the two. A 429 response pauses the affected buckets for
+    the Retry-After period.
+    """
+
+    def __init__(
+        self,
+        method_limits: Dict[str, Tuple[float, float]] = None,
+        channel_limits: Dict[str, Tuple[float, float]] = None
+    ):
+        self.method_limits = dict(METHOD_LIMITS)
+        self.method_limits.update(method_limits or {})
+        self.channel_limits = dict(CHANNEL_LIMITS)
+        self.channel_limits.update(channel_limits or {})
+        self._buckets = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: Tuple[str, Optional[str]], limit: Tuple[float, float]) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(*limit)
+        return bucket
+
+    def _keys(self, method: str, channel: str = None):
+        keys = [((method, None), self.method_limits.get(method, DEFAULT_METHOD_LIMIT))]
+        if channel and method in self.channel_limits:
+            keys.append(((method, channel), self.channel_limits[method]))
+        return keys
+
+    def _stats(self, method: str) -> Dict[str, Any]:
+        stats = self._metrics.get(method)
+        if stats is None:
+            stats = self._metrics[method] = {
+                'calls': 0,
+                'queue_depth': 0,
+                'max_queue_depth': 0,
+                'total_wait': 0.0,
+                'max_wait': 0.0,
+                'rate_limited': 0
+            }
+        return stats
+
+    def reserve(self, method: str, channel: str = None) -> float:
+        """
+        Reserve a slot for one call without blocking
+
+        Callers must wait the returned delay and then call release().
+
+        Args:
+            method: Web API method name, e.g. 'chat.postMessage'
+            channel: Channel ID the call targets
+
+        Returns:
+            Seconds to wait before making the call
+        """
+        with self._lock:
+            now = time.monotonic()
+            delay = 0.0
+            for key, limit in self._keys(method, channel):
+                delay = max(delay, self._bucket(key, limit).reserve(now))
+
+            stats = self._stats(method)
+            stats['calls'] += 1
+            stats['queue_depth'] += 1
+            stats['max_queue_depth'] = max(stats['max_queue_depth'], stats['queue_depth'])
+            stats['total_wait'] += delay
+            stats['max_wait'] = max(stats['max_wait'], delay)
+            return delay
+
+    def release(self, method: str):
+        """
+        Mark a reserved call as no longer waiting in the queue
+
+        Args:
+            method: Web API method name passed to reserve()
+        """
+        with self._lock:
+            self._stats(method)['queue_depth'] -= 1
+
+    def acquire(self, method: str, channel: str = None) -> float:
+        """
+        Block until a call to method is allowed
+
+        Args:
+            method: Web API method name, e.g. 'chat.postMessage'
+            channel: Channel ID the call targets
+
+        Returns:
+            Seconds spent waiting
+        """
+        delay = self.reserve(method, channel)
+        try:
+            if delay > 0:
+                time.sleep(delay)
+        finally:
+            self.release(method)
+        return delay
+
+    async def acquire_async(self, method: str, channel: str = None) -> float:
+        """
+        asyncio version of acquire()
+
+        Args:
+            method: Web API method name, e.g. 'chat.postMessage'
+            channel: Channel ID the call targets
+
+        Returns:
+            Seconds spent waiting
+        """
+        delay = self.reserve(method, channel)
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+        finally:
+            self.release(method)
+        return delay
+
+    def backoff(self, method: str, retry_after: float, channel: str = None):
+        """
+        Pause a method or method/channel pair after Slack returned HTTP 429
+
+        Args:
+            method: Web API method name that was rate limited
+            retry_after: Seconds from the Retry-After header
+            channel: Channel ID the call targeted
+        """
+        with self._lock:
+            # A channel-scoped limit only holds back that channel; other
+            # channels keep sending under the method-wide bucket
+            key, limit = self._keys(method, channel)[-1]
+            self._bucket(key, limit).pause(time.monotonic(), retry_after)
+            self._stats(method)['rate_limited'] += 1
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get scheduler metrics per method
+
+        Returns:
+            Dictionary of method -> calls, current and max queue depth,
+            total/max/avg wait seconds and number of 429 responses
+        """
+        with self._lock:
+            metrics = {}
+            for method, stats in self._metrics.items():
+                metrics[method] = dict(stats)
+                metrics[method]['avg_wait'] = (
+                    stats['total_wait'] / stats['calls'] if stats['calls'] else 0.0
+                )
+            return metrics
+
+
+def unlimited_rate_limiter() -> RateLimiter:
+    """
+    RateLimiter that never waits, for benchmarks and offline tests
+
+    Returns:
+        RateLimiter with every known limit raised out of reach
+    """
+    unlimited = (1e9, 1e9)
+    return RateLimiter(
+        method_limits={method: unlimited for method in METHOD_LIMITS},
+        channel_limits={method: unlimited for method in CHANNEL_LIMITS}
+    )
+
+
+class SharedLimits:
+    """
+    Method-wide token buckets in shared memory
+
+    Created once in the parent process and passed to worker processes,
+    which build a SharedRateLimiter from it. Each method in the limit
+    table gets its own slot; methods not in the table share one slot at
+    DEFAULT_METHOD_LIMIT.
+
+    Args:
+        method_limits: Overrides for METHOD_LIMITS
+        context: multiprocessing context that will start the workers
+    """
+
+    def __init__(self, method_limits: Dict[str, Tuple[float, float]] = None, context=None):
+        context = context or multiprocessing.get_context()
+        self.limits = dict(METHOD_LIMITS)
+        self.limits.update(method_limits or {})
+        self.slots = {method: i for i, method in enumerate(sorted(self.limits))}
+        # Two doubles per slot: tokens, updated (time.monotonic() is
+        # system-wide, so processes agree on it)
+        self.state = context.Array('d', 2 * (len(self.slots) + 1), lock=False)
+        self.lock = context.Lock()
+        now = time.monotonic()
+        for method, slot in self.slots.items():
+            self.state[2 * slot] = self.limits[method][1]
+            self.state[2 * slot + 1] = now
+        default_slot = len(self.slots)
+        self.state[2 * default_slot] = DEFAULT_METHOD_LIMIT[1]
+        self.state[2 * default_slot + 1] = now
+
+    def slot(self, method: str) -> Tuple[int, Tuple[float, float]]:
+        if method in self.slots:
+            return self.slots[method], self.limits[method]
+        return len(self.slots), DEFAULT_METHOD_LIMIT
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose state lives in a SharedLimits slot"""
+
+    def __init__(self, shared: SharedLimits, method: str):
+        self.shared = shared
+        slot, (self.rate, self.capacity) = shared.slot(method)
+        self._index = 2 * slot
+
+    @property
+    def tokens(self) -> float:
+        return self.shared.state[self._index]
+
+    @tokens.setter
+    def tokens(self, value: float):
+        self.shared.state[self._index] = value
+
+    @property
+    def updated(self) -> float:
+        return self.shared.state[self._index + 1]
+
+    @updated.setter
+    def updated(self, value: float):
+        self.shared.state[self._index + 1] = value
+
+    def reserve(self, now: float) -> float:
+        with self.shared.lock:
+            return super().reserve(now)
+
+    def pause(self, now: float, seconds: float):
+        with self.shared.lock:
+            super().pause(now, seconds)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose method-wide buckets are shared between processes
+
+    Per-channel buckets stay local to the process, which is correct as
+    long as each channel is only ever sent to from one process (see
+    ShardedSender).
+
+    Args:
+        shared: SharedLimits created by the parent process
+        channel_limits: Overrides for CHANNEL_LIMITS
+    """
+
+    def __init__(self, shared: SharedLimits, channel_limits: Dict[str, Tuple[float, float]] = None):
+        super().__init__(shared.limits, channel_limits)
+        self.shared = shared
+
+    def _bucket(self, key: Tuple[str, Optional[str]], limit: Tuple[float, float]) -> TokenBucket:
+        method, channel = key
+        if channel is not None:
+            return super()._bucket(key, limit)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = SharedTokenBucket(self.shared, method)
+        return bucket
+
+
+def get_retry_after(error: Exception, default: float = 1.0) -> Optional[float]:
+    """
+    Extract the Retry-After delay from a rate-limited SlackApiError
+
+    Args:
+        error: Exception raised by a WebClient call
+        default: Delay to use when a 429 carries no Retry-After header
+
+    Returns:
+        Seconds to wait, or None if the error is not a rate limit error
+    """
+    response = getattr(error, 'response', None)
+    if response is None or getattr(response, 'status_code', None) != 429:
+        return None
+    headers = getattr(response, 'headers', None) or {}
+    for name, value in headers.items():
+        if name.lower() == 'retry-after':
+            if isinstance(value, list):
+                value = value[0]
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                break
+    return default
@@ -0,0 +1,235 @@
+import sqlite3
+import threading
+from typing import Dict, List, Any, Iterable
+from config import Config
+
+
+def phrase_query(text: str) -> str:
+    """
+    Turn literal text into an FTS5 phrase query
+
+    Punctuation in the text is not treated as query syntax, so an order ID
+    such as ORD-1234 or an error string matches as written.
+
+    Args:
+        text: Text to search for
+
+    Returns:
+        FTS5 query string
+    """
+    return '"' + text.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 full-text index of thread messages
+
+    Messages are stored once in search_messages, keyed by (channel, ts),
+    and the FTS5 table indexes their text as external content, kept in
+    step by triggers. Re-adding a message only touches the index when its
+    text changed, so refetching a thread is cheap. Queries are ranked with
+    bm25 and can be limited to a channel, a thread and a time range.
+
+    Args:
+        path: SQLite database file (defaults to Config.SEARCH_INDEX_PATH)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS search_messages (
+            id INTEGER PRIMARY KEY,
+            channel TEXT NOT NULL,
+            thread_ts TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            ts_num REAL NOT NULL,
+            user TEXT,
+            text TEXT NOT NULL,
+            -- thread_ts as one token, so a thread filter is a single term lookup
+            thread_key TEXT GENERATED ALWAYS AS ('t' || replace(thread_ts, '.', '')) VIRTUAL,
+            UNIQUE (channel, ts)
+        );
+        CREATE INDEX IF NOT EXISTS search_messages_thread
+            ON search_messages (channel, thread_ts);
+        CREATE INDEX IF NOT EXISTS search_messages_time
+            ON search_messages (ts_num);
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+            text, channel, thread_key, content='search_messages', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS search_messages_ai AFTER INSERT ON search_messages BEGIN
+            INSERT INTO search_fts (rowid, text, channel, thread_key)
+                VALUES (new.id, new.text, new.channel, new.thread_key);
+        END;
+        CREATE TRIGGER IF NOT EXISTS search_messages_ad AFTER DELETE ON search_messages BEGIN
+            INSERT INTO search_fts (search_fts, rowid, text, channel, thread_key)
+                VALUES ('delete', old.id, old.text, old.channel, old.thread_key);
+        END;
+        CREATE TRIGGER IF NOT EXISTS search_messages_au AFTER UPDATE ON search_messages BEGIN
+            INSERT INTO search_fts (search_fts, rowid, text, channel, thread_key)
+                VALUES ('delete', old.id, old.text, old.channel, old.thread_key);
+            INSERT INTO search_fts (rowid, text, channel, thread_key)
+                VALUES (new.id, new.text, new.channel, new.thread_key);
+        END;
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.SEARCH_INDEX_PATH
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def add(self, channel: str, messages: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index messages, replacing the text of ones already indexed
+
+        Messages without a thread_ts are indexed as the parent of their
+        own thread. Tombstones (deleted messages) and messages without
+        text are removed from the index.
+
+        Args:
+            channel: Channel ID
+            messages: Message dicts as returned by Slack
+
+        Returns:
+            Number of messages added or changed
+        """
+        rows, gone = [], []
+        for message in messages:
+            ts = message.get('ts')
+            if not ts:
+                continue
+            text = message.get('text')
+            if message.get('subtype') == 'tombstone' or not text:
+                gone.append((channel, ts))
+                continue
+            rows.append((
+                channel, message.get('thread_ts') or ts, ts, float(ts),
+                message.get('user') or message.get('bot_id'), text
+            ))
+
+        conn = self._conn()
+        with conn:
+            # Unchanged messages match the WHERE false and are left alone
+            changed = conn.executemany(
+                'INSERT INTO search_messages (channel, thread_ts, ts, ts_num, user, text) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (channel, ts) DO UPDATE SET '
+                'thread_ts = excluded.thread_ts, user = excluded.user, text = excluded.text '
+                'WHERE text IS NOT excluded.text OR thread_ts IS NOT excluded.thread_ts',
+                rows
+            ).rowcount if rows else 0
+            if gone:
+                conn.executemany('DELETE FROM search_messages WHERE channel = ? AND ts = ?', gone)
+        return changed
+
+    def remove(self, channel: str, ts: str):
+        """
+        Remove a message from the index
+
+        Args:
+            channel: Channel ID
+            ts: Message timestamp
+        """
+        with self._conn() as conn:
+            conn.execute('DELETE FROM search_messages WHERE channel = ? AND ts = ?', (channel, ts))
+
+    def search(
+        self,
+        query: str,
+        channel: str = None,
+        thread_ts: str = None,
+        since: float = None,
+        until: float = None,
+        limit: int = 20,
+        raw: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Find messages matching a query, best matches first
+
+        Args:
+            query: Text to find; matched as a phrase unless raw is set
+            channel: Only search this channel
+            thread_ts: Only search this thread
+            since: Only messages at or after this Unix time
+            until: Only messages before this Unix time
+            limit: Maximum number of results
+            raw: Pass query to FTS5 unchanged (AND, OR, NOT, NEAR, prefix*)
+
+        Returns:
+            List of dicts with channel, thread_ts, ts, user, text, snippet
+            and score (bm25; lower is a better match)
+        """
+        # Channel and thread are also FTS columns, so filtering on them
+        # intersects posting lists instead of scanning every text match
+        match = [f'text : ({query if raw else phrase_query(query)})']
+        sql = [
+            "SELECT m.channel, m.thread_ts, m.ts, m.user, m.text, "
+            "snippet(search_fts, 0, '*', '*', '...', 12), bm25(search_fts, 1.0, 0.0, 0.0) AS score "
+            "FROM search_fts JOIN search_messages m ON m.id = search_fts.rowid "
+            "WHERE search_fts MATCH ?"
+        ]
+        params = []
+        if channel:
+            match.append(f'channel : {phrase_query(channel)}')
+            sql.append('AND m.channel = ?')
+            params.append(channel)
+        if thread_ts:
+            match.append('thread_key : ' + phrase_query('t' + thread_ts.replace('.', '')))
+            sql.append('AND m.thread_ts = ?')
+            params.append(thread_ts)
+        params.insert(0, ' AND '.join(match))
+        if since is not None:
+            sql.append('AND m.ts_num >= ?')
+            params.append(since)
+        if until is not None:
+            sql.append('AND m.ts_num < ?')
+            params.append(until)
+        sql.append('ORDER BY score LIMIT ?')
+        params.append(limit)
+
+        rows = self._conn().execute(' '.join(sql), params)
+        return [
+            {
+                'channel': row[0], 'thread_ts': row[1], 'ts': row[2], 'user': row[3],
+                'text': row[4], 'snippet': row[5], 'score': row[6]
+            }
+            for row in rows
+        ]
+
+    def count(self, channel: str = None) -> int:
+        """
+        Number of indexed messages
+
+        Args:
+            channel: Only count this channel
+
+        Returns:
+            Message count
+        """
+        if channel:
+            row = self._conn().execute(
+                'SELECT COUNT(*) FROM search_messages WHERE channel = ?', (channel,)
+            ).fetchone()
+        else:
+            row = self._conn().execute('SELECT COUNT(*) FROM search_messages').fetchone()
+        return row[0]
+
+    def optimize(self):
+        """
+        Merge the FTS5 index segments, e.g. after a large backfill
+        """
+        with self._conn() as conn:
+            conn.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
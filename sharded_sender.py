@@ -0,0 +1,287 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import zlib
+from typing import Optional, Dict, List, Any, Iterator, Tuple
+from config import Config
+from rate_limiter import SharedLimits, SharedRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Client methods a worker will run
+WORKER_METHODS = {
+    'send_message', 'reply_to_thread', 'send_long_message',
+    'update_message', 'upload_file'
+}
+
+
+def jump_hash(key: str, buckets: int) -> int:
+    """
+    Jump consistent hash of a string key
+
+    A key keeps its bucket when buckets grows unless it moves to the new
+    one, so resizing a pool only reshuffles about 1/buckets of channels.
+
+    Args:
+        key: Key to place, e.g. a channel ID
+        buckets: Number of buckets
+
+    Returns:
+        Bucket index in range(buckets)
+    """
+    # Lamping & Veach, "A Fast, Minimal Memory, Consistent Hash Algorithm"
+    h = zlib.crc32(key.encode('utf-8')) | (zlib.adler32(key.encode('utf-8')) << 32)
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        h = (h * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((h >> 33) + 1)))
+    return b
+
+
+def _run_worker(
+    index: int,
+    token: str,
+    base_url: Optional[str],
+    shared: SharedLimits,
+    channel_limits: Optional[Dict[str, Tuple[float, float]]],
+    lanes: int,
+    tasks,
+    results
+):
+    # Imported here so the parent does not need a client of its own
+    from slack_thread_client import SlackThreadClient
+
+    client = SlackThreadClient(
+        token=token,
+        rate_limiter=SharedRateLimiter(shared, channel_limits),
+        base_url=base_url
+    )
+
+    def run_lane(lane_queue: queue.Queue):
+        while True:
+            task = lane_queue.get()
+            if task is None:
+                return
+            task_id, method, kwargs = task
+            try:
+                result = getattr(client, method)(**kwargs)
+            except Exception as e:
+                logger.error("Worker %s task %s failed: %s", index, task_id, e)
+                result = {'ok': False, 'error': str(e)}
+            results.put((task_id, result))
+
+    # Tasks for one channel always use the same lane, so they stay in order
+    # while a channel waiting on its rate limit does not hold up the others
+    lane_queues = [queue.Queue() for _ in range(lanes)]
+    threads = [
+        threading.Thread(target=run_lane, args=(q,), name=f'slack-shard-{index}-{i}', daemon=True)
+        for i, q in enumerate(lane_queues)
+    ]
+    for thread in threads:
+        thread.start()
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        # Salted so lanes do not line up with the process-level hash
+        channel = task[2].get('channel') or ''
+        lane_queues[jump_hash(f'lane:{channel}', lanes)].put(task)
+
+    for lane_queue in lane_queues:
+        lane_queue.put(None)
+    for thread in threads:
+        thread.join()
+
+
+class ShardedSender:
+    """
+    Sends through a pool of worker processes, one SlackThreadClient each
+
+    Every channel is mapped to one worker with a consistent hash, so
+    messages to a channel (and so to each of its threads) are sent in
+    submission order by a single process, which also owns that channel's
+    rate limit. Method-wide (workspace) limits are shared between the
+    workers through SharedLimits. Results come back on one queue as
+    (task_id, result) pairs.
+
+    Threads started by a worker are registered in that worker's thread
+    registry only; pass channel explicitly when replying.
+
+    Args:
+        processes: Number of worker processes (default: CPU count)
+        token: Bot token (defaults to Config.SLACK_BOT_TOKEN)
+        base_url: Web API base URL (defaults to Config.SLACK_API_BASE_URL)
+        lanes: Sending threads per worker
+        method_limits: Overrides for METHOD_LIMITS
+        channel_limits: Overrides for CHANNEL_LIMITS
+        start_method: multiprocessing start method ('spawn', 'fork', ...)
+    """
+
+    def __init__(
+        self,
+        processes: int = None,
+        token: str = None,
+        base_url: str = None,
+        lanes: int = 4,
+        method_limits: Dict[str, Tuple[float, float]] = None,
+        channel_limits: Dict[str, Tuple[float, float]] = None,
+        start_method: str = None
+    ):
+        self.processes = processes or Config.SLACK_WORKER_PROCESSES or os.cpu_count() or 1
+        self.token = token or Config.SLACK_BOT_TOKEN
+        self.base_url = base_url
+        self.default_channel = Config.SLACK_CHANNEL_ID
+        self.lanes = lanes
+        self.channel_limits = channel_limits
+        self._context = multiprocessing.get_context(start_method)
+        self.shared = SharedLimits(method_limits, self._context)
+        self._task_ids = itertools.count(1)
+        self._submitted = 0
+        self._received = 0
+        self._tasks = []
+        self._results = None
+        self._workers = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        """
+        Start the worker processes
+        """
+        if self._workers:
+            return
+        self._results = self._context.Queue()
+        for index in range(self.processes):
+            tasks = self._context.Queue()
+            worker = self._context.Process(
+                target=_run_worker,
+                args=(
+                    index, self.token, self.base_url, self.shared, self.channel_limits,
+                    self.lanes, tasks, self._results
+                ),
+                name=f'slack-shard-{index}',
+                daemon=True
+            )
+            worker.start()
+            self._tasks.append(tasks)
+            self._workers.append(worker)
+        logger.info("Started %s sending processes", self.processes)
+
+    def shard_for(self, channel: str) -> int:
+        """
+        Get the worker index that handles a channel
+
+        Args:
+            channel: Channel ID
+
+        Returns:
+            Worker index
+        """
+        return jump_hash(channel, self.processes)
+
+    def submit(self, method: str, channel: str = None, **kwargs) -> int:
+        """
+        Queue a SlackThreadClient call on the channel's worker
+
+        Args:
+            method: Client method name, e.g. 'send_message'
+            channel: Channel ID (defaults to configured channel)
+            **kwargs: Arguments for the client method
+
+        Returns:
+            Task ID, reported with the result
+        """
+        if method not in WORKER_METHODS:
+            raise ValueError(f"Unsupported worker method: {method}")
+        if not self._workers:
+            self.start()
+        channel = channel or self.default_channel
+        task_id = next(self._task_ids)
+        self._tasks[self.shard_for(channel)].put((task_id, method, dict(kwargs, channel=channel)))
+        self._submitted += 1
+        return task_id
+
+    def send_message(
+        self,
+        text: str,
+        channel: str = None,
+        thread_ts: str = None,
+        blocks: List[Dict] = None,
+        attachments: List[Dict] = None
+    ) -> int:
+        """
+        Queue a message (same arguments as SlackThreadClient.send_message)
+
+        Returns:
+            Task ID
+        """
+        return self.submit(
+            'send_message',
+            channel=channel,
+            text=text,
+            thread_ts=thread_ts,
+            blocks=blocks,
+            attachments=attachments
+        )
+
+    def results(self, timeout: float = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yield (task_id, result) as workers finish, until every submitted
+        task has reported
+
+        Results for one channel arrive in submission order; across
+        channels they are interleaved.
+
+        Args:
+            timeout: Seconds to wait for each result (None = forever)
+
+        Yields:
+            (task_id, result dict)
+        """
+        while self._received < self._submitted:
+            try:
+                item = self._results.get(timeout=timeout)
+            except queue.Empty:
+                return
+            self._received += 1
+            yield item
+
+    def join(self, timeout: float = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Wait for all submitted tasks
+
+        Args:
+            timeout: Seconds to wait for each result (None = forever)
+
+        Returns:
+            Dictionary of task_id -> result
+        """
+        return dict(self.results(timeout))
+
+    def close(self, timeout: float = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Finish queued work and stop the workers
+
+        Args:
+            timeout: Seconds to wait for each result and worker
+
+        Returns:
+            Results not yet collected, as task_id -> result
+        """
+        remaining = self.join(timeout) if self._workers else {}
+        for tasks in self._tasks:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+        self._tasks, self._workers = [], []
+        return remaining
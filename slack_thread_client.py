@@ -1,25 +1,229 @@
+import itertools
+import json
 import logging
-from typing import Optional, Dict, List, Any
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Dict, List, Any, Iterator, Iterable, Tuple, Union, BinaryIO
+from urllib.request import Request
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from config import Config
+from rate_limiter import RateLimiter, get_retry_after
+from thread_registry import ThreadRegistry, create_thread_registry, sqlite_path
+from thread_cache import ThreadMessageCache
+from search_index import SearchIndex
+import streaming_upload
+from image_optimizer import ImageOptimizer, is_optimizable
+from upload_cache import UploadCache, content_digest
+from live_message import LiveMessage
+import message_splitter
+from instrumentation import Hook, call_event, emit
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from http_transport import HttpTransport, default_transport
+
+if TYPE_CHECKING:
+    from outbox import Outbox
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _parse_blocks(blocks: Union[List[Dict], str, None]) -> Optional[List[Dict]]:
+    # The WebClient sends a JSON body, where blocks given as a JSON string
+    # would be encoded a second time, so they are decoded first
+    if isinstance(blocks, str):
+        try:
+            blocks = json.loads(blocks)
+        except ValueError:
+            pass
+    if blocks is not None and not isinstance(blocks, list):
+        raise ValueError('blocks must be a list')
+    return blocks
+
+class _WebClient(WebClient):
+    """
+    WebClient whose timeout can be lowered for calls on one thread, and
+    whose HTTP requests can go through a pooled HttpTransport
+
+    A transport is shared between clients, so it carries the proxy and SSL
+    context; a client whose own proxy or ssl differs from its transport's
+    is rejected rather than silently ignoring them.
+    """
+
+    def __init__(self, *args, transport: HttpTransport = None, **kwargs):
+        self._call_timeout = threading.local()
+        self.transport = transport
+        super().__init__(*args, **kwargs)
+        if transport is not None:
+            if self.proxy and self.proxy != transport.proxy:
+                raise ValueError(
+                    f"Proxy {self.proxy} differs from the transport's ({transport.proxy}); "
+                    "set it on the transport"
+                )
+            if self.ssl is not None and self.ssl is not transport.ssl:
+                raise ValueError("Set the SSL context on the transport instead of the client")
+
+    @property
+    def timeout(self) -> int:
+        return getattr(self._call_timeout, 'value', None) or self._timeout
+
+    @timeout.setter
+    def timeout(self, value: int):
+        self._timeout = value
+
+    def set_call_timeout(self, timeout: Optional[float]):
+        self._call_timeout.value = timeout
+
+    def _perform_urllib_http_request_internal(self, url: str, req: Request) -> Dict[str, Any]:
+        if self.transport is None:
+            return super()._perform_urllib_http_request_internal(url, req)
+        status, headers, body = self.transport.request(
+            req.get_method(),
+            url,
+            req.data,
+            dict(req.header_items()),
+            getattr(self._call_timeout, 'value', None)
+        )
+        if status == 429 and 'retry-after' in headers:
+            # Same spelling urllib's HTTPError path gives the retry handlers
+            headers['Retry-After'] = headers['retry-after']
+        if (headers.get('content-type') or '').startswith('application/gzip'):
+            return {'status': status, 'headers': headers, 'body': body}
+        return {'status': status, 'headers': headers, 'body': body.decode('utf-8')}
+
 class SlackThreadClient:
-    def __init__(self, token: str = None):
+    def __init__(
+        self,
+        token: str = None,
+        rate_limiter: RateLimiter = None,
+        max_retries: int = None,
+        thread_registry: ThreadRegistry = None,
+        message_cache: ThreadMessageCache = None,
+        image_optimizer: ImageOptimizer = None,
+        upload_cache: UploadCache = None,
+        base_url: str = None,
+        hooks: List[Hook] = None,
+        circuit_breaker: CircuitBreaker = None,
+        search_index: SearchIndex = None,
+        transport: HttpTransport = None
+    ):
         self.token = token or Config.SLACK_BOT_TOKEN
-        self.client = WebClient(token=self.token)
+        self.client = _WebClient(
+            token=self.token,
+            base_url=base_url or Config.SLACK_API_BASE_URL or WebClient.BASE_URL,
+            transport=transport or default_transport()
+        )
         self.default_channel = Config.SLACK_CHANNEL_ID
-        self.active_threads = {}
+        self.active_threads = (
+            create_thread_registry() if thread_registry is None else thread_registry
+        )
+        self.message_cache = message_cache
+        self.image_optimizer = image_optimizer
+        self.upload_cache = upload_cache
+        self.outbox = None
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = Config.SLACK_MAX_RETRIES if max_retries is None else max_retries
+        self.hooks = list(hooks or [])
+        self.circuit_breaker = circuit_breaker
+        self.search_index = search_index
+
+    def add_hook(self, hook: Hook):
+        """
+        Register an instrumentation hook
+
+        The hook is called after every Web API call with a dict of method,
+        channel, duration, rate_limit_wait, retries, payload_bytes, ok,
+        error and status (see instrumentation.py).
+
+        Args:
+            hook: Callable taking the event dict
+        """
+        self.hooks.append(hook)
+
+    def _index_messages(self, channel: str, messages: List[Dict[str, Any]]):
+        # The index is a local convenience; failing to update it never fails the call
+        if self.search_index is None or not messages:
+            return
+        try:
+            self.search_index.add(channel, messages)
+        except Exception as e:
+            logger.warning("Could not update search index: %s", e)
+
+    def _api_call(self, method: str, **kwargs):
+        """
+        Call a Web API method through the rate limiter
+
+        Waits for the method's (and channel's) rate limit, and on HTTP 429
+        pauses for Retry-After and tries again up to max_retries times.
+        With a circuit breaker, calls fail fast with CircuitOpenError while
+        the method's circuit is open, and each attempt uses the breaker's
+        latency-based timeout. Registered hooks get one event per call.
+
+        Args:
+            method: Web API method name, e.g. 'chat.postMessage'
+            **kwargs: Arguments for the WebClient method
+
+        Returns:
+            SlackResponse from the WebClient
+        """
+        api = getattr(self.client, method.replace('.', '_'))
+        channel = kwargs.get('channel') or kwargs.get('channels')
+        attempt = 0
+        waited = 0.0
+        error = None
+        start = time.perf_counter()
+
+        breaker = self.circuit_breaker
+
+        try:
+            while True:
+                if breaker is not None:
+                    breaker.before_call(method)
+                call_start = None
+                call_error = None
+                try:
+                    if breaker is not None:
+                        self.client.set_call_timeout(breaker.timeout_for(method, self.client._timeout))
+                    waited += self.rate_limiter.acquire(method, channel)
+                    call_start = time.perf_counter()
+                    return api(**kwargs)
+                except SlackApiError as e:
+                    call_error = e
+                    retry_after = get_retry_after(e)
+                    if retry_after is None or attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    logger.warning("Rate limited on %s, retrying in %ss", method, retry_after)
+                    self.rate_limiter.backoff(method, retry_after, channel)
+                except Exception as e:
+                    call_error = e
+                    raise
+                finally:
+                    if breaker is not None:
+                        self.client.set_call_timeout(None)
+                        if call_start is None:
+                            # Never reached Slack; give back a half-open probe slot
+                            breaker.release(method)
+                        else:
+                            breaker.after_call(method, call_error, time.perf_counter() - call_start)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.hooks:
+                emit(self.hooks, call_event(
+                    method, channel, kwargs, time.perf_counter() - start, waited, attempt, error
+                ))
 
     def send_message(
         self,
         text: str,
         channel: str = None,
         thread_ts: str = None,
-        blocks: List[Dict] = None,
+        blocks: Union[List[Dict], str] = None,
         attachments: List[Dict] = None
     ) -> Optional[Dict[str, Any]]:
         """
@@ -29,55 +233,203 @@ class SlackThreadClient:
             text: Message text
             channel: Channel ID (defaults to configured channel)
             thread_ts: Thread timestamp for threading
-            blocks: Slack blocks for rich formatting
+            blocks: Slack blocks for rich formatting, as a list or a JSON
+                array string (decoded before sending)
             attachments: Message attachments
 
+        Text past Slack's 40,000 characters, or more than 50 blocks, is
+        sent with send_long_message: the first part here, the rest as
+        replies in its thread.
+
         Returns:
-            Response with thread_ts for future replies
+            Response with thread_ts for future replies. If the circuit
+            breaker is open and an outbox is enabled, the message is queued
+            and the response has queued=True and its idempotency_key.
         """
         try:
-            channel = channel or self.default_channel
+            blocks = _parse_blocks(blocks)
+        except ValueError as e:
+            logger.error("%s, got %s", e, type(blocks).__name__)
+            return {'ok': False, 'error': str(e)}
 
-            response = self.client.chat_postMessage(
-                channel=channel,
+        try:
+            if len(text or '') > message_splitter.MAX_TEXT_CHARS or len(blocks or []) > message_splitter.MAX_BLOCKS:
+                # Parts are posted as messages, never as a snippet, so the
+                # result keeps its ts and thread_ts
+                return self.send_long_message(
+                    text=text,
+                    channel=channel,
+                    thread_ts=thread_ts,
+                    blocks=blocks,
+                    upload_threshold=0,
+                    attachments=attachments
+                )
+
+            return self._post_message(
                 text=text,
+                channel=channel or self.default_channel,
                 thread_ts=thread_ts,
                 blocks=blocks,
                 attachments=attachments
             )
 
-            result = {
+        except CircuitOpenError as e:
+            if self.outbox is not None:
+                key = self.outbox.enqueue(
+                    text=text,
+                    channel=channel,
+                    thread_ts=thread_ts,
+                    blocks=blocks,
+                    attachments=attachments
+                )
+                logger.warning("%s; message queued in outbox as %s", e, key)
+                return {'ok': False, 'error': 'circuit_open', 'queued': True, 'idempotency_key': key}
+            logger.error("%s", e)
+            return {'ok': False, 'error': 'circuit_open', 'retry_in': e.retry_in}
+        except SlackApiError as e:
+            logger.error("Slack API Error: %s", e.response['error'])
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            logger.error("Unexpected error sending message: %s", e)
+            return {'ok': False, 'error': str(e)}
+
+    def _post_message(
+        self,
+        text: str,
+        channel: str,
+        thread_ts: str = None,
+        blocks: Union[List[Dict], str] = None,
+        attachments: List[Dict] = None,
+        metadata: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Post one message and record it in the thread registry and search index
+
+        Shared by send_message and the outbox. Unlike send_message, errors
+        are raised and the text is not split.
+
+        Args:
+            text: Message text
+            channel: Channel ID
+            thread_ts: Thread timestamp for threading
+            blocks: Slack blocks for rich formatting
+            attachments: Message attachments
+            metadata: Message metadata (event_type and event_payload)
+
+        Returns:
+            send_message-style result
+        """
+        response = self._api_call(
+            'chat.postMessage',
+            channel=channel,
+            text=text,
+            thread_ts=thread_ts,
+            blocks=blocks,
+            attachments=attachments,
+            metadata=metadata
+        )
+
+        result = {
+            'ok': True,
+            'channel': response['channel'],
+            'ts': response['ts'],
+            'thread_ts': thread_ts or response['ts'],
+            'message': response.get('message', {})
+        }
+        self._index_messages(response['channel'], [dict(
+            response.get('message') or {},
+            ts=response['ts'],
+            text=text,
+            thread_ts=thread_ts or response['ts']
+        )])
+
+        if not thread_ts:
+            logger.info("New message sent. Thread ID: %s", response['ts'])
+            self.active_threads[response['ts']] = {
+                'channel': channel,
+                'initial_message': (text or '')[:100]
+            }
+        else:
+            logger.info("Reply added to thread: %s", thread_ts)
+
+        return result
+
+    def update_message(
+        self,
+        channel: str,
+        ts: str,
+        text: str,
+        blocks: List[Dict] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Edit a message the bot already posted
+
+        Args:
+            channel: Channel ID
+            ts: Timestamp of the message to edit
+            text: New message text
+            blocks: New Slack blocks
+
+        Returns:
+            Response with channel and ts of the edited message, or
+            {'ok': False, 'error': 'circuit_open', 'retry_in': ...} while
+            the circuit breaker is open
+        """
+        try:
+            response = self._api_call(
+                'chat.update',
+                channel=channel,
+                ts=ts,
+                text=text,
+                blocks=blocks
+            )
+            logger.info("Message updated: %s", ts)
+            return {
                 'ok': True,
                 'channel': response['channel'],
                 'ts': response['ts'],
-                'thread_ts': thread_ts or response['ts'],
                 'message': response.get('message', {})
             }
 
-            if not thread_ts:
-                logger.info(f"New message sent. Thread ID: {response['ts']}")
-                self.active_threads[response['ts']] = {
-                    'channel': channel,
-                    'initial_message': text[:100]
-                }
-            else:
-                logger.info(f"Reply added to thread: {thread_ts}")
-
-            return result
-
+        except CircuitOpenError as e:
+            logger.error("%s", e)
+            return {'ok': False, 'error': 'circuit_open', 'retry_in': e.retry_in}
         except SlackApiError as e:
-            logger.error(f"Slack API Error: {e.response['error']}")
+            logger.error("Slack API Error: %s", e.response['error'])
             return {'ok': False, 'error': str(e)}
         except Exception as e:
-            logger.error(f"Unexpected error sending message: {str(e)}")
+            logger.error("Unexpected error updating message: %s", e)
             return {'ok': False, 'error': str(e)}
 
+    def enable_outbox(self, path: str = None, **kwargs) -> 'Outbox':
+        """
+        Switch on durable, asynchronous sending through an Outbox
+
+        Messages passed to client.outbox.enqueue() are written to a local
+        write-ahead log and delivered by a background thread, surviving
+        process crashes.
+
+        Args:
+            path: SQLite file for the queue (defaults to Config.OUTBOX_PATH)
+            **kwargs: Retry settings passed to Outbox
+
+        Returns:
+            The started Outbox
+        """
+        from outbox import Outbox
+
+        if self.outbox is None:
+            self.outbox = Outbox(self, path=path, **kwargs)
+            self.outbox.start()
+        return self.outbox
+
     def start_thread(
         self,
         initial_message: str,
         channel: str = None,
-        blocks: List[Dict] = None
-    ) -> Optional[str]:
+        blocks: List[Dict] = None,
+        live: bool = False
+    ) -> Optional[Union[str, LiveMessage]]:
         """
         Create a new thread and return thread_ts for future replies
 
@@ -85,9 +437,12 @@ class SlackThreadClient:
             initial_message: The first message in the thread
             channel: Channel ID
             blocks: Slack blocks for rich formatting
+            live: Return a LiveMessage that edits the first message in
+                place instead of the bare thread_ts
 
         Returns:
-            Thread timestamp (use this for future replies)
+            Thread timestamp (use this for future replies), or a
+            LiveMessage whose thread_ts is the thread timestamp
         """
         response = self.send_message(
             text=initial_message,
@@ -97,7 +452,15 @@ class SlackThreadClient:
 
         if response and response.get('ok'):
             thread_ts = response['ts']
-            logger.info(f"Thread started with ID: {thread_ts}")
+            logger.info("Thread started with ID: %s", thread_ts)
+            if live:
+                return LiveMessage(
+                    self,
+                    channel=response['channel'],
+                    ts=thread_ts,
+                    text=initial_message,
+                    blocks=blocks
+                )
             return thread_ts
         return None
 
@@ -120,10 +483,9 @@ class SlackThreadClient:
         Returns:
             Response from Slack API
         """
-        if thread_ts in self.active_threads:
-            channel = channel or self.active_threads[thread_ts]['channel']
-        else:
-            channel = channel or self.default_channel
+        if not channel:
+            thread = self.active_threads.get(thread_ts)
+            channel = thread['channel'] if thread else self.default_channel
 
         return self.send_message(
             text=text,
@@ -137,40 +499,288 @@ class SlackThreadClient:
         thread_ts: str,
         messages: List[str],
         channel: str = None,
-        delay_seconds: float = 0.5
+        delay_seconds: float = 0
     ) -> List[Dict]:
         """
         Send multiple messages to a thread
 
+        Messages are paced by the rate limiter, so no delay is needed to
+        stay under Slack's limits.
+
         Args:
             thread_ts: Thread timestamp
             messages: List of message texts
             channel: Channel ID
-            delay_seconds: Delay between messages
+            delay_seconds: Extra delay between messages
 
         Returns:
             List of responses
         """
-        import time
         responses = []
 
-        for message in messages:
+        for i, message in enumerate(messages):
             response = self.reply_to_thread(
                 thread_ts=thread_ts,
                 text=message,
                 channel=channel
             )
             responses.append(response)
-            if delay_seconds > 0 and message != messages[-1]:
+            if delay_seconds > 0 and i < len(messages) - 1:
                 time.sleep(delay_seconds)
 
         return responses
 
+    def send_long_message(
+        self,
+        text: str,
+        channel: str = None,
+        thread_ts: str = None,
+        blocks: Union[List[Dict], str] = None,
+        max_chars: int = message_splitter.MAX_TEXT_CHARS,
+        upload_threshold: int = message_splitter.UPLOAD_THRESHOLD,
+        filename: str = 'message.txt',
+        attachments: List[Dict] = None
+    ) -> Dict[str, Any]:
+        """
+        Send a message that may be past Slack's size limits
+
+        Text is split on line or code-block boundaries and blocks into
+        groups of 50. The first part is posted (to thread_ts if given) and
+        the rest follow in order as replies in its thread. Text longer
+        than upload_threshold is uploaded as a snippet instead.
+
+        Args:
+            text: Message text (fallback text when blocks are given)
+            channel: Channel ID
+            thread_ts: Thread timestamp for threading
+            blocks: Slack blocks for rich formatting, as a list or a JSON
+                array string
+            max_chars: Maximum characters of text per message
+            upload_threshold: Upload text longer than this as a file
+                (0 = always split)
+            filename: Name of the snippet file
+            attachments: Message attachments, sent with the first part
+
+        Returns:
+            Dict with ok, channel, ts and thread_ts of the first part,
+            parts sent, uploaded and every response
+        """
+        text = text or ''
+        try:
+            blocks = _parse_blocks(blocks)
+        except ValueError as e:
+            logger.error("%s, got %s", e, type(blocks).__name__)
+            return {'ok': False, 'error': str(e), 'parts': 0, 'uploaded': False, 'responses': []}
+
+        if not blocks and upload_threshold and len(text) > upload_threshold:
+            first_line = text.split('\n', 1)[0][:200]
+            response = self.upload_file(
+                file_content=text.encode('utf-8'),
+                filename=filename,
+                channel=channel,
+                thread_ts=thread_ts,
+                initial_comment=first_line,
+                title=filename
+            )
+            response = response or {'ok': False, 'error': 'upload failed'}
+            return {**response, 'parts': 1, 'uploaded': True, 'responses': [response]}
+
+        if blocks:
+            groups = message_splitter.split_blocks(blocks)
+            fallback = message_splitter.split_text(text, max_chars)[0]
+            parts = [
+                (fallback if i == 0 else f"{fallback[:max_chars - 16]} ({i + 1}/{len(groups)})", group)
+                for i, group in enumerate(groups)
+            ]
+        else:
+            parts = [(chunk, None) for chunk in message_splitter.split_text(text, max_chars)]
+
+        first_text, first_blocks = parts[0]
+        first = self.send_message(
+            text=first_text,
+            channel=channel,
+            thread_ts=thread_ts,
+            blocks=first_blocks,
+            attachments=attachments
+        )
+        result = {**first, 'parts': 1, 'uploaded': False, 'responses': [first]}
+        if not first.get('ok'):
+            return result
+
+        # Replies go one at a time so they keep their order in the thread
+        for part_text, part_blocks in parts[1:]:
+            response = self.reply_to_thread(
+                thread_ts=first['thread_ts'],
+                text=part_text,
+                channel=first['channel'],
+                blocks=part_blocks
+            )
+            result['responses'].append(response)
+            if not response.get('ok'):
+                result.update(ok=False, error=response.get('error'))
+                break
+            result['parts'] += 1
+
+        if len(parts) > 1:
+            logger.info("Long message sent as %s/%s parts in thread %s", result['parts'], len(parts), first['thread_ts'])
+        return result
+
+    def _resolve_target(self, target: Union[str, Tuple[str, str]]) -> Tuple[str, str]:
+        """
+        Turn a broadcast target into a (channel, thread_ts) pair
+
+        Args:
+            target: thread_ts, or (channel, thread_ts) tuple
+
+        Returns:
+            (channel, thread_ts)
+        """
+        if isinstance(target, str):
+            thread = self.active_threads.get(target)
+            return (thread['channel'] if thread else self.default_channel), target
+        return target[0], target[1]
+
+    def broadcast_to_threads(
+        self,
+        targets: List[Union[str, Tuple[str, str]]],
+        text: str,
+        blocks: List[Dict] = None,
+        max_workers: int = 8
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Post the same reply to many threads concurrently
+
+        Targets are grouped by channel and each channel is handled by one
+        worker, so different channels are sent in parallel while sends to
+        any one channel (and therefore any one thread) keep the order of
+        targets. Results are yielded as each send completes.
+
+        Args:
+            targets: thread_ts values, or (channel, thread_ts) tuples
+            text: Reply message text
+            blocks: Slack blocks for rich formatting
+            max_workers: Maximum number of channels sent to at once
+
+        Returns:
+            Iterator of send_message result dicts; 'channel' and 'thread_ts'
+            are always set so failures can be matched to their target
+        """
+        by_channel = {}
+        for target in targets:
+            channel, thread_ts = self._resolve_target(target)
+            by_channel.setdefault(channel, []).append(thread_ts)
+
+        results = queue.Queue()
+        stopped = threading.Event()
+
+        def send_channel(channel, thread_list):
+            for thread_ts in thread_list:
+                if stopped.is_set():
+                    break
+                try:
+                    result = self.send_message(
+                        text=text,
+                        channel=channel,
+                        thread_ts=thread_ts,
+                        blocks=blocks
+                    ) or {'ok': False, 'error': 'no response'}
+                except Exception as e:
+                    # Every target must produce a result or the caller waits forever
+                    logger.error("Unexpected error broadcasting to thread %s: %s", thread_ts, e)
+                    result = {'ok': False, 'error': str(e)}
+                result.setdefault('channel', channel)
+                result.setdefault('thread_ts', thread_ts)
+                results.put(result)
+
+        total = sum(len(thread_list) for thread_list in by_channel.values())
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(by_channel) or 1)))
+        for channel, thread_list in by_channel.items():
+            executor.submit(send_channel, channel, thread_list)
+
+        try:
+            for _ in range(total):
+                yield results.get()
+        finally:
+            # Stop early if the caller abandons the iterator
+            stopped.set()
+            executor.shutdown(wait=True)
+
+    def iter_thread_replies(
+        self,
+        channel: str,
+        thread_ts: str,
+        page_size: int = 200,
+        prefetch: bool = False,
+        oldest: str = None
+    ) -> Iterator[Dict]:
+        """
+        Iterate over every message in a thread, one page at a time
+
+        Follows response_metadata.next_cursor until the thread is exhausted,
+        yielding messages as each page arrives, so only one or two pages are
+        held in memory.
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+            page_size: Messages requested per conversations.replies call
+            prefetch: Fetch the next page in the background while the
+                caller is processing the current one
+            oldest: Only return replies newer than this ts (the parent
+                message is still returned first)
+
+        Returns:
+            Iterator of messages, parent message first
+
+        Raises:
+            SlackApiError: If a page cannot be fetched
+            CircuitOpenError: If the circuit breaker is open for
+                conversations.replies
+        """
+        def fetch(cursor):
+            return self._api_call(
+                'conversations.replies',
+                channel=channel,
+                ts=thread_ts,
+                limit=page_size,
+                cursor=cursor,
+                oldest=oldest
+            )
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        count = 0
+
+        try:
+            response = fetch(None)
+            while True:
+                cursor = (response.get('response_metadata') or {}).get('next_cursor')
+                pending = executor.submit(fetch, cursor) if executor and cursor else None
+
+                for message in response.get('messages', []):
+                    count += 1
+                    yield message
+
+                if not cursor:
+                    break
+                response = pending.result() if pending else fetch(cursor)
+
+            logger.info("Retrieved %s messages from thread %s", count, thread_ts)
+
+        except SlackApiError as e:
+            logger.error("Error fetching thread replies: %s", e.response['error'])
+            raise
+        except CircuitOpenError as e:
+            logger.error("Error fetching thread replies: %s", e)
+            raise
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
     def get_thread_replies(
         self,
         channel: str,
         thread_ts: str,
-        limit: int = 100
+        limit: int = None
     ) -> Optional[List[Dict]]:
         """
         Get all replies in a thread
@@ -178,34 +788,80 @@ class SlackThreadClient:
         Args:
             channel: Channel ID
             thread_ts: Thread timestamp
-            limit: Maximum number of messages to retrieve
+            limit: Maximum number of messages to retrieve (default: all)
 
         Returns:
-            List of messages in the thread
+            List of messages in the thread, or None if it could not be
+            fetched (including while the circuit breaker is open)
         """
         try:
-            response = self.client.conversations_replies(
+            replies = self.iter_thread_replies(
                 channel=channel,
-                ts=thread_ts,
-                limit=limit
+                thread_ts=thread_ts,
+                page_size=min(limit, 200) if limit else 200
             )
-
-            messages = response.get('messages', [])
-            logger.info(f"Retrieved {len(messages)} messages from thread {thread_ts}")
+            messages = list(itertools.islice(replies, limit))
+            self._index_messages(channel, messages)
             return messages
 
-        except SlackApiError as e:
-            logger.error(f"Error fetching thread replies: {e.response['error']}")
+        except (SlackApiError, CircuitOpenError):
             return None
 
+    def sync_thread(
+        self,
+        channel: str,
+        thread_ts: str,
+        full: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Bring the local copy of a thread up to date
+
+        Only replies newer than the cached watermark are requested, and
+        edits and tombstones among them are merged into the cache. Edits
+        and deletions of older replies are only seen by a full sync, which
+        re-reads the whole thread and marks missing messages deleted.
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+            full: Re-read the whole thread instead of only new replies
+
+        Returns:
+            Dict with ok, fetched, new, updated, deleted and latest_ts, or
+            ok=False and error ('circuit_open' with retry_in while the
+            circuit breaker is open)
+        """
+        if self.message_cache is None:
+            self.message_cache = ThreadMessageCache(sqlite_path(Config.SQLALCHEMY_DATABASE_URI))
+
+        oldest = None if full else self.message_cache.get_watermark(channel, thread_ts)
+        try:
+            messages = list(self.iter_thread_replies(
+                channel=channel,
+                thread_ts=thread_ts,
+                oldest=oldest
+            ))
+        except CircuitOpenError as e:
+            return {'ok': False, 'error': 'circuit_open', 'retry_in': e.retry_in}
+        except SlackApiError as e:
+            return {'ok': False, 'error': str(e)}
+
+        stats = self.message_cache.merge(channel, thread_ts, messages, complete=oldest is None)
+        self._index_messages(channel, messages)
+        logger.info(
+            "Synced thread %s: %s new, %s updated, %s deleted",
+            thread_ts, stats['new'], stats['updated'], stats['deleted']
+        )
+        return {'ok': True, 'fetched': len(messages), **stats}
+
     def get_active_threads(self) -> Dict:
         """
-        Get all active thread IDs stored in memory
+        Get all active thread IDs stored in the thread registry
 
         Returns:
             Dictionary of active threads with their metadata
         """
-        return self.active_threads
+        return self.active_threads.to_dict()
 
     def upload_file(
         self,
@@ -220,6 +876,9 @@ class SlackThreadClient:
         """
         Upload a file or image to Slack channel or thread
 
+        With an upload_cache configured, bytes that were uploaded before are
+        not sent again; a message linking the existing file is posted instead.
+
         Args:
             file_path: Path to local file (use this OR file_content)
             file_content: File bytes content (use this OR file_path)
@@ -244,21 +903,45 @@ class SlackThreadClient:
             if thread_ts:
                 upload_kwargs['thread_ts'] = thread_ts
 
+            digest = None
+            if self.upload_cache and (file_path or (file_content and filename)):
+                digest = content_digest(file_path, file_content)
+                cached = self.upload_cache.get(digest)
+                if cached:
+                    return self._share_uploaded_file(cached, channel, thread_ts, initial_comment)
+
+            if self.image_optimizer:
+                name = filename or (os.path.basename(file_path) if file_path else None)
+                if name and is_optimizable(name):
+                    try:
+                        if file_path:
+                            with open(file_path, 'rb') as f:
+                                data = f.read()
+                        else:
+                            data = file_content
+                        if data:
+                            file_content, filename = self.image_optimizer.optimize(data, name)
+                            file_path = None
+                    except Exception as e:
+                        logger.warning("Could not optimize image %s, uploading original: %s", name, e)
+
             if file_path:
                 # Upload from file path using files_upload_v2 (requires files:read)
-                response = self.client.files_upload_v2(
+                response = self._api_call(
+                    'files.upload_v2',
                     file=file_path,
                     **upload_kwargs
                 )
-                logger.info(f"File uploaded from path: {file_path}")
+                logger.info("File uploaded from path: %s", file_path)
             elif file_content and filename:
                 # Upload from bytes content using files_upload_v2
-                response = self.client.files_upload_v2(
+                response = self._api_call(
+                    'files.upload_v2',
                     content=file_content,
                     filename=filename,
                     **upload_kwargs
                 )
-                logger.info(f"File uploaded from content: {filename}")
+                logger.info("File uploaded from content: %s", filename)
             else:
                 logger.error("Must provide either file_path or (file_content + filename)")
                 return None
@@ -273,16 +956,297 @@ class SlackThreadClient:
                     'thread_ts': thread_ts
                 }
 
+                if digest and result['file_id'] and result['permalink']:
+                    self.upload_cache.put(
+                        digest,
+                        result['file_id'],
+                        result['permalink'],
+                        url=result['url'],
+                        size=file_info.get('size')
+                    )
+
                 if thread_ts:
-                    logger.info(f"File uploaded to thread: {thread_ts}")
+                    logger.info("File uploaded to thread: %s", thread_ts)
                 else:
-                    logger.info(f"File uploaded to channel: {channel}")
+                    logger.info("File uploaded to channel: %s", channel)
 
                 return result
 
         except SlackApiError as e:
-            logger.error(f"Error uploading file: {e.response['error']}")
+            logger.error("Error uploading file: %s", e.response['error'])
             return {'ok': False, 'error': str(e)}
         except Exception as e:
-            logger.error(f"Unexpected error uploading file: {str(e)}")
-            return {'ok': False, 'error': str(e)}
\ No newline at end of file
+            logger.error("Unexpected error uploading file: %s", e)
+            return {'ok': False, 'error': str(e)}
+
+    def _share_uploaded_file(
+        self,
+        cached: Dict[str, Any],
+        channel: str,
+        thread_ts: str = None,
+        initial_comment: str = None
+    ) -> Dict:
+        """
+        Post a link to a file that was already uploaded instead of re-uploading
+
+        Args:
+            cached: UploadCache entry (file_id, permalink, url)
+            channel: Channel ID
+            thread_ts: Thread timestamp for threading
+            initial_comment: Comment to put before the link
+
+        Returns:
+            upload_file-style result with deduplicated=True
+        """
+        text = f"{initial_comment}\n{cached['permalink']}" if initial_comment else cached['permalink']
+        response = self.send_message(text=text, channel=channel, thread_ts=thread_ts)
+        if not response.get('ok'):
+            return response
+
+        logger.info("Reused uploaded file %s instead of uploading again", cached['file_id'])
+        return {
+            'ok': True,
+            'file_id': cached['file_id'],
+            'url': cached['url'],
+            'permalink': cached['permalink'],
+            'thread_ts': thread_ts,
+            'deduplicated': True
+        }
+
+    def upload_stream(
+        self,
+        source: Union[str, BinaryIO, Iterable[bytes]],
+        filename: str,
+        length: int = None,
+        channel: str = None,
+        thread_ts: str = None,
+        initial_comment: str = None,
+        title: str = None,
+        chunk_size: int = streaming_upload.DEFAULT_CHUNK_SIZE
+    ) -> Optional[Dict]:
+        """
+        Upload a large file without loading it into memory
+
+        Uses files.getUploadURLExternal, streams the bytes to the returned
+        URL in chunks, then shares the file with files.completeUploadExternal.
+        Paths are read through a memory map; iterators of unknown length are
+        spooled to a temporary file first.
+
+        Args:
+            source: File path, binary file-like object, or iterator of bytes
+            filename: Name for the file
+            length: Total size in bytes (avoids spooling iterators)
+            channel: Channel ID
+            thread_ts: Thread timestamp for threading
+            initial_comment: Comment with the file
+            title: File title
+            chunk_size: Bytes read and sent per chunk
+
+        Returns:
+            upload_file-style result plus bytes, seconds, bytes_per_second,
+            peak_buffer_bytes and peak_rss_bytes
+        """
+        try:
+            channel = channel or self.default_channel
+            started = time.perf_counter()
+
+            file_id, stats = self._push_upload(source, filename, length, chunk_size)
+            response = self._api_call(
+                'files.completeUploadExternal',
+                files=[{'id': file_id, 'title': title or filename}],
+                channel_id=channel,
+                thread_ts=thread_ts,
+                initial_comment=initial_comment
+            )
+
+            elapsed = time.perf_counter() - started
+            file_info = (response.get('files') or [{}])[0]
+            logger.info(
+                "File streamed: %s (%s bytes in %.2fs)", filename, stats.bytes_sent, elapsed
+            )
+            return {
+                'ok': True,
+                'file_id': file_id,
+                'url': file_info.get('url_private'),
+                'permalink': file_info.get('permalink'),
+                'thread_ts': thread_ts,
+                'bytes': stats.bytes_sent,
+                'seconds': elapsed,
+                'bytes_per_second': stats.bytes_sent / elapsed if elapsed else None,
+                'peak_buffer_bytes': stats.peak_buffer_bytes,
+                'peak_rss_bytes': streaming_upload.peak_rss_bytes()
+            }
+
+        except SlackApiError as e:
+            logger.error("Error uploading file: %s", e.response['error'])
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            logger.error("Unexpected error uploading file: %s", e)
+            return {'ok': False, 'error': str(e)}
+
+    def _push_upload(
+        self,
+        source: Union[str, BinaryIO, Iterable[bytes]],
+        filename: str,
+        length: int = None,
+        chunk_size: int = streaming_upload.DEFAULT_CHUNK_SIZE
+    ) -> Tuple[str, streaming_upload.UploadStats]:
+        """
+        Get an upload URL for one file and stream its bytes to it
+
+        The file is not visible in Slack until it is passed to
+        files.completeUploadExternal.
+
+        Args:
+            source: File path, binary file-like object, or iterator of bytes
+            filename: Name for the file
+            length: Total size in bytes, if known
+            chunk_size: Bytes read and sent per chunk
+
+        Returns:
+            (file_id, UploadStats)
+        """
+        chunks, length, spool = streaming_upload.prepare_source(
+            source, length=length, chunk_size=chunk_size
+        )
+        try:
+            upload = self._api_call(
+                'files.getUploadURLExternal',
+                filename=filename,
+                length=length
+            )
+            stats = streaming_upload.UploadStats()
+            streaming_upload.post_chunks(
+                upload['upload_url'],
+                stats.count(chunks),
+                length,
+                timeout=self.client.timeout
+            )
+            return upload['file_id'], stats
+        finally:
+            if spool is not None:
+                spool.close()
+
+    def _optimize_file_specs(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Run the images among upload specs through the image optimizer
+
+        All images are optimized as one batch so they are encoded in
+        parallel. The caller's dicts are not modified.
+
+        Args:
+            files: upload_files_to_thread file specs
+
+        Returns:
+            Specs with images replaced by optimized file_content; images
+            that cannot be read or optimized are left as they were
+        """
+        files = [dict(spec) for spec in files]
+        images = []
+        for i, spec in enumerate(files):
+            if spec.get('file_path') and is_optimizable(spec['file_path']):
+                # A file that cannot be read is left for push() to report
+                try:
+                    with open(spec['file_path'], 'rb') as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                images.append((i, data, spec.get('filename') or os.path.basename(spec['file_path'])))
+            elif spec.get('file_content') and spec.get('filename') and is_optimizable(spec['filename']):
+                images.append((i, spec['file_content'], spec['filename']))
+
+        try:
+            optimized = self.image_optimizer.optimize_many([(data, name) for _, data, name in images])
+        except Exception as e:
+            logger.warning("Could not optimize images, uploading originals: %s", e)
+            return files
+        for (i, _, _), (data, name) in zip(images, optimized):
+            files[i].pop('file_path', None)
+            files[i]['file_content'] = data
+            files[i]['filename'] = name
+        return files
+
+    def upload_files_to_thread(
+        self,
+        thread_ts: str,
+        files: List[Dict[str, Any]],
+        channel: str = None,
+        initial_comment: str = None,
+        max_workers: int = 4
+    ) -> List[Dict]:
+        """
+        Upload several files to a thread as a single message
+
+        Upload URLs are requested and the bytes pushed for all files
+        concurrently, then everything is shared with one
+        files.completeUploadExternal call so the files appear together.
+
+        Args:
+            thread_ts: Thread timestamp
+            files: Dicts with file_path, or file_content and filename, and
+                optionally title (same fields as upload_file)
+            channel: Channel ID (defaults to the thread's channel)
+            initial_comment: Comment shown with the files
+            max_workers: Files uploaded at once
+
+        Returns:
+            One upload_file-style result per entry in files, in order
+        """
+        if not channel:
+            thread = self.active_threads.get(thread_ts)
+            channel = thread['channel'] if thread else self.default_channel
+
+        if self.image_optimizer:
+            files = self._optimize_file_specs(files)
+
+        def push(spec):
+            if spec.get('file_path'):
+                filename = spec.get('filename') or os.path.basename(spec['file_path'])
+                return filename, self._push_upload(spec['file_path'], filename)[0]
+            if spec.get('file_content') and spec.get('filename'):
+                content = spec['file_content']
+                return spec['filename'], self._push_upload([content], spec['filename'], len(content))[0]
+            raise ValueError("Must provide either file_path or (file_content + filename)")
+
+        results = [None] * len(files)
+        uploaded = []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(push, spec) for spec in files]
+            for i, future in enumerate(futures):
+                try:
+                    filename, file_id = future.result()
+                    uploaded.append((i, file_id, files[i].get('title') or filename))
+                except SlackApiError as e:
+                    logger.error("Error uploading file: %s", e.response['error'])
+                    results[i] = {'ok': False, 'error': str(e)}
+                except Exception as e:
+                    logger.error("Unexpected error uploading file: %s", e)
+                    results[i] = {'ok': False, 'error': str(e)}
+
+        if uploaded:
+            try:
+                response = self._api_call(
+                    'files.completeUploadExternal',
+                    files=[{'id': file_id, 'title': title} for _, file_id, title in uploaded],
+                    channel_id=channel,
+                    thread_ts=thread_ts,
+                    initial_comment=initial_comment
+                )
+                file_infos = {f.get('id'): f for f in response.get('files') or []}
+                for i, file_id, _ in uploaded:
+                    file_info = file_infos.get(file_id, {})
+                    results[i] = {
+                        'ok': True,
+                        'file_id': file_id,
+                        'url': file_info.get('url_private'),
+                        'permalink': file_info.get('permalink'),
+                        'thread_ts': thread_ts
+                    }
+                logger.info("%s files uploaded to thread: %s", len(uploaded), thread_ts)
+
+            except SlackApiError as e:
+                logger.error("Error completing upload: %s", e.response['error'])
+                for i, _, _ in uploaded:
+                    results[i] = {'ok': False, 'error': str(e)}
+
+        return results
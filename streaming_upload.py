@@ -0,0 +1,160 @@
+import mmap
+import os
+import sys
+import tempfile
+import urllib.request
+from typing import Optional, Iterator, Iterable, Tuple, Union, BinaryIO
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadStats:
+    """
+    Byte counter for one streamed upload
+
+    Tracks the bytes sent and the largest chunk held in memory at once,
+    which is the upload path's own peak buffer.
+    """
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.peak_buffer_bytes = 0
+
+    def count(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.bytes_sent += len(chunk)
+            self.peak_buffer_bytes = max(self.peak_buffer_bytes, len(chunk))
+            yield chunk
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    Get the peak resident set size of this process
+
+    Returns:
+        Bytes, or None where the resource module is unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def iter_path_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read a file on disk in chunks through a read-only memory map
+
+    Args:
+        path: File to read
+        chunk_size: Bytes per chunk
+
+    Returns:
+        Iterator of byte chunks
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in range(0, len(mm), chunk_size):
+                yield mm[offset:offset + chunk_size]
+
+
+def iter_fileobj_chunks(fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read a binary file-like object in chunks until EOF
+
+    Args:
+        fileobj: Object with a read(size) method
+        chunk_size: Bytes per chunk
+
+    Returns:
+        Iterator of byte chunks
+    """
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def prepare_source(
+    source: Union[str, BinaryIO, Iterable[bytes]],
+    length: int = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    spool_memory: int = 8 * DEFAULT_CHUNK_SIZE
+) -> Tuple[Iterator[bytes], int, Optional[BinaryIO]]:
+    """
+    Turn an upload source into a chunk iterator with a known length
+
+    files.getUploadURLExternal needs the size up front. Paths and seekable
+    file objects are measured directly; anything else without a length is
+    spooled to a temporary file that keeps at most spool_memory bytes in RAM.
+
+    Args:
+        source: File path, binary file-like object, or iterator of bytes
+        length: Total size in bytes, if already known
+        chunk_size: Bytes per chunk when reading files
+        spool_memory: RAM limit for spooling sources of unknown length
+
+    Returns:
+        (chunks, length, spool) where spool must be closed by the caller
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return iter_path_chunks(source, chunk_size), os.path.getsize(source), None
+
+    if hasattr(source, 'read'):
+        if length is None and source.seekable():
+            position = source.tell()
+            length = source.seek(0, os.SEEK_END) - position
+            source.seek(position)
+        chunks = iter_fileobj_chunks(source, chunk_size)
+    else:
+        chunks = iter(source)
+
+    if length is not None:
+        return chunks, length, None
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_memory)
+    for chunk in chunks:
+        spool.write(chunk)
+    length = spool.tell()
+    spool.seek(0)
+    return iter_fileobj_chunks(spool, chunk_size), length, spool
+
+
+def post_chunks(
+    upload_url: str,
+    chunks: Iterable[bytes],
+    length: int,
+    timeout: float = 300
+) -> int:
+    """
+    Stream raw bytes to a files.getUploadURLExternal upload URL
+
+    Args:
+        upload_url: URL returned by files.getUploadURLExternal
+        chunks: Body as an iterator of byte chunks
+        length: Total body size (sent as Content-Length)
+        timeout: Socket timeout in seconds
+
+    Returns:
+        HTTP status code
+    """
+    request = urllib.request.Request(
+        upload_url,
+        data=chunks,
+        method='POST',
+        headers={
+            'Content-Length': str(length),
+            'Content-Type': 'application/octet-stream'
+        }
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
@@ -0,0 +1,80 @@
+"""
+Offline tests for AsyncSlackThreadClient against FakeSlackServer
+"""
+import asyncio
+import os
+import tempfile
+import threading
+
+import pytest
+from async_slack_thread_client import AsyncSlackThreadClient
+from thread_registry import SQLiteThreadRegistry
+
+
+@pytest.mark.parametrize('server', [{'latency': 0.02}], indirect=True)
+def test_concurrent_replies_share_connections(server, make_client):
+    async def run():
+        async with make_client(AsyncSlackThreadClient, max_connections=8) as client:
+            thread_ts = await client.start_thread("Async thread", channel='C1')
+            results = await asyncio.gather(*[
+                client.reply_to_thread(thread_ts, f"Reply {i}") for i in range(50)
+            ])
+            return thread_ts, results
+
+    thread_ts, results = asyncio.run(run())
+    assert all(result['ok'] for result in results)
+    assert len(server.get_thread('C1', thread_ts)) == 51
+    # Keep-alive: far fewer connections than requests
+    assert server.get_stats()['connections'] <= 8
+
+
+def test_get_thread_replies(make_client, make_thread):
+    thread_ts = make_thread(250)
+
+    async def run():
+        async with make_client(AsyncSlackThreadClient) as client:
+            return (
+                await client.get_thread_replies('C1', thread_ts),
+                await client.get_thread_replies('C1', thread_ts, limit=5)
+            )
+
+    everything, first = asyncio.run(run())
+    assert len(everything) == 251
+    assert [m['ts'] for m in first] == [m['ts'] for m in everything[:5]]
+
+
+def test_api_error_is_returned(server, make_client):
+    async def run():
+        async with make_client(AsyncSlackThreadClient) as client:
+            return await client.send_message("Hello", channel='C1')
+
+    server.inject_error('chat.postMessage', 'channel_not_found')
+    result = asyncio.run(run())
+    assert result['ok'] is False
+    assert 'channel_not_found' in result['error']
+
+
+def test_sqlite_registry_runs_off_the_event_loop(make_client):
+    class RecordingRegistry(SQLiteThreadRegistry):
+        def get(self, thread_ts, default=None):
+            threads.add(threading.get_ident())
+            return super().get(thread_ts, default)
+
+        def set(self, thread_ts, info):
+            threads.add(threading.get_ident())
+            super().set(thread_ts, info)
+
+    async def run(registry):
+        async with make_client(AsyncSlackThreadClient, thread_registry=registry) as client:
+            thread_ts = await client.start_thread("Parent", channel='C2')
+            # No channel given, so the registry supplies it
+            reply = await client.reply_to_thread(thread_ts, "Child")
+            return threading.get_ident(), reply
+
+    threads = set()
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = RecordingRegistry(os.path.join(tmp, 'threads.db'))
+        loop_thread, reply = asyncio.run(run(registry))
+        registry.close()
+    assert reply['ok'] and reply['channel'] == 'C2'
+    assert threads and loop_thread not in threads
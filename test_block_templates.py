@@ -0,0 +1,86 @@
+"""
+Offline tests for compiled Block Kit templates
+"""
+import json
+
+import pytest
+from block_templates import BlockTemplate, BlockValidationError, validate_blocks
+
+STATUS = [
+    {"type": "header", "text": {"type": "plain_text", "text": "Deploy {service}"}},
+    {"type": "section", "text": {"type": "mrkdwn", "text": "*Status:* {status}\n*Progress:* {pct:.0f}%"}},
+    {"type": "section", "fields": "{fields}"},
+    {"type": "divider"},
+]
+
+
+def _fields(n: int):
+    return [{"type": "mrkdwn", "text": f"*Host {i}*"} for i in range(n)]
+
+
+def test_render_fills_placeholders_and_inserts_values():
+    template = BlockTemplate(STATUS)
+    blocks = template.render(service="api", status="rolling", pct=42.4, fields=_fields(2))
+    assert blocks[0]['text']['text'] == "Deploy api"
+    assert blocks[1]['text']['text'] == "*Status:* rolling\n*Progress:* 42%"
+    assert blocks[2]['fields'] == _fields(2)
+    assert blocks[3] == {"type": "divider"}
+    assert template.fields == {'service', 'status', 'pct', 'fields'}
+
+
+def test_text_placeholder_is_a_string_and_dotted_names_resolve():
+    template = BlockTemplate([
+        {"type": "section", "text": {"type": "mrkdwn", "text": "{count}"}},
+        {"type": "context", "elements": [{"type": "mrkdwn", "text": "{user[name]}"}]},
+        {"type": "section", "fields": "{user[fields]}"},
+    ])
+    blocks = template.render(count=3, user={'name': 'ana', 'fields': _fields(1)})
+    assert blocks[0]['text']['text'] == "3"
+    assert blocks[1]['elements'][0]['text'] == "ana"
+    assert blocks[2]['fields'] == _fields(1)
+
+
+def test_renders_are_cached_and_handed_out_as_copies():
+    template = BlockTemplate(STATUS)
+    first = template.render(service="api", status="ok", pct=100, fields=_fields(1))
+    first[0]['text']['text'] = "changed by the caller"
+    second = template.render(service="api", status="ok", pct=100, fields=_fields(1))
+    assert second[0]['text']['text'] == "Deploy api"
+    assert template.get_stats() == {'renders': 2, 'cache_hits': 1, 'cached': 1}
+
+
+def test_render_json_matches_render():
+    template = BlockTemplate(json.dumps(STATUS))
+    context = {'service': "api", 'status': "ok", 'pct': 1, 'fields': _fields(3)}
+    assert json.loads(template.render_json(context)) == template.render(context)
+
+
+def test_limits_are_checked_at_compile_and_render_time():
+    with pytest.raises(BlockValidationError):
+        BlockTemplate([{"type": "header", "text": {"type": "plain_text", "text": "x" * 151}}])
+
+    template = BlockTemplate(STATUS)
+    with pytest.raises(BlockValidationError) as excinfo:
+        template.render(service="api", status="ok", pct=1, fields=_fields(11))
+    assert "11 fields" in str(excinfo.value)
+    with pytest.raises(KeyError):
+        template.render(service="api")
+
+
+def test_validate_blocks_reports_every_problem():
+    blocks = [{"type": "divider"}] * 49 + [
+        {"type": "section", "text": {"type": "mrkdwn", "text": "x" * 3001}},
+        {"type": "context", "elements": [{"type": "mrkdwn", "text": "y"}] * 11},
+        {"type": "actions", "block_id": "b" * 256, "elements": [{"type": "button"}] * 26},
+    ]
+    errors = validate_blocks(blocks)
+    assert len(errors) == 5
+    assert validate_blocks(STATUS[:2] + STATUS[3:]) == []
+
+
+def test_rendered_blocks_are_sent_as_a_list(server, client):
+    template = BlockTemplate(STATUS)
+    blocks = template.render(service="api", status="ok", pct=100, fields=_fields(2))
+    result = client.send_message("Deploy api: ok", blocks=blocks)
+    assert result['ok']
+    assert server.get_thread('C1', result['ts'])[0]['blocks'] == blocks
@@ -0,0 +1,63 @@
+"""
+Offline tests for broadcast_to_threads fan-out
+"""
+import asyncio
+import threading
+
+from async_slack_thread_client import AsyncSlackThreadClient
+
+
+def _collect(results, timeout: float = 10):
+    # A lost result would block the generator forever; fail instead
+    collected = []
+    worker = threading.Thread(target=lambda: collected.extend(results), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    assert not worker.is_alive(), "broadcast_to_threads never returned every result"
+    return collected
+
+
+def test_every_target_gets_the_reply_in_order(server, client, make_thread):
+    targets = [(channel, make_thread(0, channel=channel)) for channel in ('C1', 'C2', 'C3') for _ in range(3)]
+    first = client.start_thread("Registered", channel='C4')
+    targets.append(first)
+
+    results = _collect(client.broadcast_to_threads(targets, "Maintenance at 18:00", max_workers=2))
+    assert len(results) == len(targets) and all(r['ok'] for r in results)
+    assert {(r['channel'], r['thread_ts']) for r in results} == {
+        target if isinstance(target, tuple) else ('C4', target) for target in targets
+    }
+    # Sends to one channel keep the order of targets
+    for channel in ('C1', 'C2', 'C3'):
+        sent = [r['thread_ts'] for r in results if r['channel'] == channel]
+        assert sent == [ts for c, ts in targets[:-1] if c == channel]
+    assert server.get_thread('C4', first)[-1]['text'] == "Maintenance at 18:00"
+
+
+def test_raising_send_still_yields_a_result(client, make_thread):
+    targets = [('C1', make_thread(0, channel='C1')), ('C2', make_thread(0, channel='C2'))]
+
+    def broken_send(**kwargs):
+        raise RuntimeError("boom")
+
+    client.send_message = broken_send
+    results = _collect(client.broadcast_to_threads(targets, "Hello"))
+    assert [r['ok'] for r in results] == [False, False]
+    assert all('boom' in r['error'] for r in results)
+    assert {(r['channel'], r['thread_ts']) for r in results} == set(targets)
+
+
+def test_async_raising_send_still_yields_a_result(make_client, make_thread):
+    targets = [('C1', make_thread(0, channel='C1')), ('C2', make_thread(0, channel='C2'))]
+
+    async def broken_send(**kwargs):
+        raise RuntimeError("boom")
+
+    async def run():
+        async with make_client(AsyncSlackThreadClient) as client:
+            client.send_message = broken_send
+            return [r async for r in client.broadcast_to_threads(targets, "Hello")]
+
+    results = asyncio.run(asyncio.wait_for(run(), 10))
+    assert [r['ok'] for r in results] == [False, False]
+    assert {(r['channel'], r['thread_ts']) for r in results} == set(targets)
@@ -0,0 +1,107 @@
+"""
+Offline tests for the per-method circuit breaker
+"""
+import time
+
+import pytest
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+METHOD = 'chat.postMessage'
+
+
+def _breaker(**kwargs):
+    options = {'min_calls': 4, 'open_seconds': 0.05}
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def _fail(breaker, times=1):
+    for _ in range(times):
+        breaker.before_call(METHOD)
+        breaker.after_call(METHOD, TimeoutError(), 1.0)
+
+
+def test_opens_at_the_error_threshold_and_fails_fast():
+    breaker = _breaker()
+    _fail(breaker, 3)
+    assert breaker.get_state(METHOD) == CLOSED
+    _fail(breaker)
+    assert breaker.get_state(METHOD) == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call(METHOD)
+    assert breaker.get_stats()[METHOD]['rejected'] == 1
+
+
+def test_half_open_probe_closes_or_reopens_for_longer():
+    breaker = _breaker()
+    _fail(breaker, 4)
+    time.sleep(0.06)
+    breaker.before_call(METHOD)
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call(METHOD)
+    breaker.after_call(METHOD, TimeoutError(), 1.0)
+    assert breaker.get_state(METHOD) == OPEN
+    assert breaker._circuits[METHOD].open_seconds == pytest.approx(0.1)
+
+    time.sleep(0.11)
+    breaker.before_call(METHOD)
+    breaker.after_call(METHOD, None, 0.1)
+    assert breaker.get_state(METHOD) == CLOSED
+
+
+def test_release_frees_the_probe_slot():
+    breaker = _breaker()
+    _fail(breaker, 4)
+    time.sleep(0.06)
+    breaker.before_call(METHOD)
+    breaker.release(METHOD)
+    assert breaker.get_state(METHOD) == HALF_OPEN
+    breaker.before_call(METHOD)
+
+
+def test_timeout_follows_observed_latency():
+    breaker = _breaker(min_samples=10, min_timeout=0.01)
+    for i in range(10):
+        breaker.before_call(METHOD)
+        assert breaker.timeout_for(METHOD, 30) is None
+        breaker.after_call(METHOD, None, 0.1 * (i + 1))
+    assert breaker.timeout_for(METHOD, 30) == pytest.approx(3.0)
+
+
+def test_slack_errors_do_not_open_the_circuit(server, make_client):
+    client = make_client(circuit_breaker=_breaker())
+    server.inject_error(METHOD, 'channel_not_found', count=4)
+    for _ in range(4):
+        assert not client.send_message("Hello")['ok']
+    assert client.circuit_breaker.get_state(METHOD) == CLOSED
+
+
+def test_server_errors_open_the_circuit(server, make_client):
+    client = make_client(circuit_breaker=_breaker())
+    server.inject_error(METHOD, status=500, count=4)
+    for _ in range(4):
+        assert not client.send_message("Hello")['ok']
+    result = client.send_message("Hello")
+    assert result['error'] == 'circuit_open' and result['retry_in'] > 0
+    assert server.calls[METHOD] == 4
+
+
+def test_failed_rate_limiter_releases_the_probe(server, make_client):
+    client = make_client(circuit_breaker=_breaker())
+    server.inject_error(METHOD, status=500, count=4)
+    for _ in range(4):
+        client.send_message("Hello")
+    time.sleep(0.06)
+
+    acquire = client.rate_limiter.acquire
+
+    def broken_acquire(method, channel=None):
+        raise RuntimeError("limiter unavailable")
+
+    client.rate_limiter.acquire = broken_acquire
+    assert client.send_message("Hello")['error'] == "limiter unavailable"
+    client.rate_limiter.acquire = acquire
+    # The probe slot was given back, so the next call can probe and close it
+    assert client.send_message("Hello")['ok']
+    assert client.circuit_breaker.get_state(METHOD) == CLOSED
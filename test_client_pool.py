@@ -0,0 +1,63 @@
+"""
+Offline tests for per-workspace clients in SlackClientPool
+"""
+import pytest
+from client_pool import SlackClientPool
+from config import Config
+from thread_registry import SQLiteThreadRegistry
+
+TOKENS = {'T1': 'xoxb-team-1', 'T2': 'xoxb-team-2', 'T3': 'xoxb-team-3'}
+
+
+@pytest.fixture
+def sqlite_registry(tmp_path, monkeypatch):
+    path = tmp_path / 'threads.db'
+    monkeypatch.setattr(Config, 'THREAD_REGISTRY_BACKEND', 'sqlite')
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{path}')
+    return str(path)
+
+
+def test_clients_are_reused_and_evicted_with_their_state(server):
+    pool = SlackClientPool(tokens=TOKENS, max_clients=2, base_url=server.base_url)
+    first = pool.get('T1')
+    assert pool.get('T1') is first and first.token == 'xoxb-team-1'
+    pool.get('T2')
+    pool.get('T3')
+
+    rebuilt = pool.get('T1')
+    assert rebuilt is not first
+    assert rebuilt.rate_limiter is first.rate_limiter
+    assert rebuilt.active_threads is first.active_threads
+    stats = pool.get_stats()
+    assert (stats['created'], stats['evicted'], stats['hits']) == (4, 2, 1)
+
+
+def test_unknown_workspace_is_an_error_result(server):
+    pool = SlackClientPool(tokens=TOKENS, base_url=server.base_url)
+    result = pool.send_message("Hello", team='T9', channel='C1')
+    assert result['ok'] is False and 'T9' in result['error']
+    resolved = SlackClientPool(token_resolver=lambda team: f'xoxb-{team}', base_url=server.base_url)
+    assert resolved.get('T9').token == 'xoxb-T9'
+
+
+def test_hook_events_carry_the_team(server):
+    events = []
+    pool = SlackClientPool(tokens=TOKENS, hooks=[events.append], base_url=server.base_url)
+    pool.send_message("Hello", team='T2', channel='C1')
+    assert [(event['team'], event['method']) for event in events] == [('T2', 'chat.postMessage')]
+
+
+def test_workspaces_do_not_share_sqlite_threads(server, sqlite_registry):
+    pool = SlackClientPool(tokens=TOKENS, base_url=server.base_url)
+    thread_ts = pool.call('T1', 'start_thread', "Team 1 incident", channel='C1')
+
+    first, second = pool.get('T1').active_threads, pool.get('T2').active_threads
+    assert isinstance(first, SQLiteThreadRegistry) and first.path == sqlite_registry
+    assert first.table != second.table
+    assert first.get(thread_ts)['channel'] == 'C1'
+    assert second.get(thread_ts) is None and len(second) == 0
+
+
+def test_registry_namespace_must_be_a_plain_name(tmp_path):
+    with pytest.raises(ValueError):
+        SQLiteThreadRegistry(str(tmp_path / 'threads.db'), namespace='T1; DROP TABLE slack_threads')
@@ -0,0 +1,89 @@
+"""
+Offline tests for EventReceiver with locally signed payloads
+"""
+import json
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+from events_receiver import EventReceiver, sign_request
+
+SECRET = 'test-signing-secret'
+
+
+def _event(event_id: str, thread_ts: str, text: str, channel: str = 'C1') -> bytes:
+    return json.dumps({
+        'type': 'event_callback',
+        'event_id': event_id,
+        'event': {
+            'type': 'message', 'channel': channel, 'user': 'U123',
+            'text': text, 'ts': f"{time.time():.6f}", 'thread_ts': thread_ts
+        }
+    }).encode('utf-8')
+
+
+@pytest.fixture
+def receiver():
+    receiver = EventReceiver(signing_secret=SECRET)
+    yield receiver
+    receiver.stop()
+
+
+def test_bad_signatures_are_rejected(receiver):
+    body = _event('Ev1', '1.000001', 'hello')
+    forged = sign_request('wrong-secret', body)
+    stale = sign_request(SECRET, body, timestamp=int(time.time()) - 600)
+    tampered = sign_request(SECRET, body)
+
+    assert receiver.handle(body, forged)[0] == 401
+    assert receiver.handle(body, stale)[0] == 401
+    assert receiver.handle(body + b' ', tampered)[0] == 401
+    assert receiver.handle(body, {})[0] == 401
+    assert receiver.get_stats()['rejected'] == 4
+
+
+def test_malformed_payloads_get_400(receiver):
+    for body in (b'not json', b'[1, 2]', b'"x"', b'{"type": "event_callback", "event": [1]}'):
+        assert receiver.handle(body, sign_request(SECRET, body))[0] == 400
+
+
+def test_url_verification_and_dedup(receiver):
+    received = []
+    receiver.on_message(received.append)
+
+    body = json.dumps({'type': 'url_verification', 'challenge': 'abc123'}).encode('utf-8')
+    assert receiver.handle(body, sign_request(SECRET, body))[2] == b'abc123'
+
+    body = _event('Ev1', '1.000001', 'hello')
+    for retry in range(3):
+        headers = dict(sign_request(SECRET, body), **{'X-Slack-Retry-Num': str(retry)})
+        assert receiver.handle(body, headers)[0] == 200
+    receiver.join()
+    assert len(received) == 1
+    assert receiver.get_stats()['duplicates'] == 2
+
+
+def test_thread_reply_reaches_its_handler_over_http(client, receiver):
+    thread_ts = client.start_thread("Any questions?")
+    other_ts = client.start_thread("Unrelated")
+
+    replies = []
+    done = threading.Event()
+    receiver.on_thread(thread_ts, lambda event: (replies.append(event['text']), done.set()), channel='C1')
+    host, port = receiver.serve(host='127.0.0.1', port=0)
+    url = f'http://{host}:{port}/slack/events'
+    for event_id, ts, text in (('Ev1', other_ts, 'elsewhere'), ('Ev2', thread_ts, 'Yes, one')):
+        body = _event(event_id, ts, text)
+        with urlopen(Request(url, data=body, headers=sign_request(SECRET, body)), timeout=5) as response:
+            assert response.status == 200
+
+    body = _event('Ev3', thread_ts, 'forged')
+    with pytest.raises(HTTPError) as excinfo:
+        urlopen(Request(url, data=body, headers=sign_request('wrong-secret', body)), timeout=5)
+    assert excinfo.value.code == 401
+
+    assert done.wait(5)
+    receiver.join()
+    assert replies == ['Yes, one']
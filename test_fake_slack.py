@@ -0,0 +1,65 @@
+"""
+Offline tests for the FakeSlackServer stand-in itself
+"""
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+from fake_slack import FakeSlackError
+
+TOKEN = 'xoxb-test'
+
+
+def _post(server, method, params, token=TOKEN):
+    request = urllib.request.Request(
+        server.base_url + method,
+        data=json.dumps(params).encode(),
+        headers={'Content-Type': 'application/json; charset=utf-8', 'Authorization': f'Bearer {token}'}
+    )
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_replies_are_paged_parent_first(server, make_thread):
+    thread_ts = make_thread(5)
+    pages, cursor = [], None
+    while True:
+        params = {'channel': 'C1', 'ts': thread_ts, 'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        response = server.call('conversations.replies', params, TOKEN)
+        pages.append([m['ts'] for m in response['messages']])
+        cursor = response['response_metadata']['next_cursor']
+        if not response['has_more']:
+            break
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert pages[0][0] == thread_ts
+    assert sum(pages, []) == [m['ts'] for m in server.get_thread('C1', thread_ts)]
+
+
+def test_injected_errors_are_used_up_in_order(server):
+    server.inject_error('chat.postMessage', 'channel_not_found', count=2)
+    for _ in range(2):
+        with pytest.raises(FakeSlackError) as excinfo:
+            server.call('chat.postMessage', {'channel': 'C1', 'text': 'x'}, TOKEN)
+        assert excinfo.value.error == 'channel_not_found'
+    assert server.call('chat.postMessage', {'channel': 'C1', 'text': 'x'}, TOKEN)['ok']
+    assert server.get_stats()['errors'] == {'chat.postMessage': 2}
+
+
+def test_http_rate_limit_sets_retry_after(server):
+    server.inject_error('chat.update', status=429, retry_after=1.5)
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        _post(server, 'chat.update', {'channel': 'C1', 'ts': '1.0', 'text': 'x'})
+    assert excinfo.value.code == 429
+    assert excinfo.value.headers['Retry-After'] == '2'
+    assert json.loads(excinfo.value.read()) == {'ok': False, 'error': 'ratelimited'}
+    assert server.get_stats()['rate_limited'] == {'chat.update': 1}
+
+
+def test_token_is_required_and_replies_bump_the_parent(server):
+    assert _post(server, 'auth.test', {}, token='')['error'] == 'not_authed'
+    parent = _post(server, 'chat.postMessage', {'channel': 'C1', 'text': 'Parent'})
+    _post(server, 'chat.postMessage', {'channel': 'C1', 'text': 'Reply', 'thread_ts': parent['ts']})
+    assert server.get_thread('C1', parent['ts'])[0]['reply_count'] == 1
@@ -0,0 +1,82 @@
+"""
+Offline tests for pooled HTTP transports against FakeSlackServer
+"""
+import socket
+import ssl
+from urllib.error import URLError
+
+import pytest
+import http_transport
+from config import Config
+from http_transport import HttpxTransport, Urllib3Transport, create_transport, default_transport
+from slack_thread_client import _WebClient
+
+TRANSPORTS = [
+    pytest.param(Urllib3Transport, marks=pytest.mark.skipif(http_transport.urllib3 is None, reason="urllib3")),
+    pytest.param(HttpxTransport, marks=pytest.mark.skipif(http_transport.httpx is None, reason="httpx")),
+]
+
+
+@pytest.fixture(params=TRANSPORTS)
+def transport(request):
+    transport = request.param(pool_size=2, proxy=None)
+    yield transport
+    transport.close()
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_calls_reuse_pooled_connections(server, make_client, make_thread, transport):
+    client = make_client(transport=transport)
+    thread_ts = client.start_thread("Parent")
+    for i in range(5):
+        assert client.reply_to_thread(thread_ts, f"Reply {i}")['ok']
+    assert server.get_stats()['connections'] == 1
+
+    # Large enough for a gzip-compressed response
+    big_ts = make_thread(200, text="x" * 100)
+    assert len(client.get_thread_replies('C1', big_ts)) == 201
+
+
+def test_rate_limit_retry_after_reaches_the_client(server, make_client, transport):
+    client = make_client(transport=transport)
+    server.inject_error('chat.postMessage', status=429, retry_after=0.01)
+    assert client.send_message("Retried")['ok']
+    assert server.get_stats()['rate_limited'] == {'chat.postMessage': 1}
+
+
+def test_connection_failure_is_a_urlerror(transport):
+    with pytest.raises(URLError):
+        transport.request('POST', f'http://127.0.0.1:{_closed_port()}/api/auth.test', b'', {})
+
+
+@pytest.mark.parametrize('server', [{'latency': 0.5}], indirect=True)
+def test_read_timeout_is_a_timeouterror(server, transport):
+    with pytest.raises(TimeoutError):
+        transport.request('POST', server.base_url + 'auth.test', b'', {}, timeout=0.1)
+
+
+def test_default_transport_is_built_once(monkeypatch):
+    monkeypatch.setattr(Config, 'SLACK_HTTP_TRANSPORT', 'urllib3')
+    monkeypatch.setattr(http_transport, '_default', None)
+    shared = default_transport()
+    assert isinstance(shared, Urllib3Transport)
+    assert default_transport() is shared
+    shared.close()
+
+    assert create_transport('urllib') is None
+    with pytest.raises(ValueError):
+        create_transport('carrier-pigeon')
+
+
+def test_client_proxy_or_ssl_must_match_the_transport():
+    transport = Urllib3Transport(proxy=None)
+    with pytest.raises(ValueError):
+        _WebClient(token='xoxb-test', transport=transport, proxy='http://proxy.internal:3128')
+    with pytest.raises(ValueError):
+        _WebClient(token='xoxb-test', transport=transport, ssl=ssl.create_default_context())
+    transport.close()
@@ -0,0 +1,68 @@
+"""
+Offline tests for the image optimization stage of the upload path
+"""
+import io
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from image_optimizer import ImageOptimizer, is_optimizable  # noqa: E402
+
+
+def _png(width: int, height: int) -> bytes:
+    # A smooth gradient: large as PNG, small once downscaled and re-encoded
+    img = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    out = io.BytesIO()
+    img.save(out, format='PNG')
+    return out.getvalue()
+
+
+@pytest.fixture
+def optimizer():
+    optimizer = ImageOptimizer(max_dimension=800, max_workers=2)
+    yield optimizer
+    optimizer.close()
+
+
+def test_large_image_is_downscaled_and_renamed(optimizer):
+    data = _png(2400, 1600)
+    optimized, filename = optimizer.optimize(data, 'screenshot.png')
+    assert filename == 'screenshot.webp'
+    assert len(optimized) < len(data)
+    with Image.open(io.BytesIO(optimized)) as img:
+        assert img.format == 'WEBP' and img.size == (800, 533)
+
+
+def test_unreadable_image_keeps_original_bytes(optimizer):
+    data = b'\x89PNG\r\n\x1a\n not really a png'
+    assert optimizer.optimize(data, 'broken.png') == (data, 'broken.png')
+
+
+def test_batch_uses_pool_and_cache(optimizer):
+    images = [(_png(1600, 1200), 'a.png'), (_png(1200, 1600), 'b.png'), (b'garbage', 'c.png')]
+    first = optimizer.optimize_many(images)
+    assert [name for _, name in first] == ['a.webp', 'b.webp', 'c.png']
+    assert first[2][0] == b'garbage'
+
+    again = optimizer.optimize_many(images[:2])
+    assert again == first[:2]
+    assert optimizer.get_stats()['cache_hits'] == 2
+
+
+def test_is_optimizable():
+    assert is_optimizable('photo.JPG') and is_optimizable('diagram.png')
+    # GIFs keep their animation
+    assert not is_optimizable('party.gif') and not is_optimizable('notes.txt')
+
+
+def test_upload_sends_optimized_bytes(server, make_client, optimizer):
+    client = make_client(image_optimizer=optimizer)
+    thread_ts = client.start_thread("Screenshots")
+    data = _png(2400, 1600)
+    result = client.upload_file(file_content=data, filename='screen.png', thread_ts=thread_ts)
+    broken = client.upload_file(file_content=b'not an image', filename='broken.png', thread_ts=thread_ts)
+
+    uploaded = server.files[result['file_id']]
+    assert uploaded['name'] == 'screen.webp' and uploaded['size'] < len(data)
+    assert broken['ok'] and server.files[broken['file_id']]['size'] == len(b'not an image')
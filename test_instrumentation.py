@@ -0,0 +1,76 @@
+"""
+Offline tests for per-call instrumentation hooks
+"""
+import pytest
+from instrumentation import PrometheusHook, OpenTelemetryHook, payload_size
+
+
+def test_hook_gets_one_event_per_call(server, client):
+    events = []
+    client.add_hook(events.append)
+    thread_ts = client.start_thread("Parent")
+    client.reply_to_thread(thread_ts, "Reply")
+
+    assert [event['method'] for event in events] == ['chat.postMessage'] * 2
+    event = events[1]
+    assert event['channel'] == 'C1' and event['ok'] and event['status'] == 200
+    assert event['retries'] == 0 and event['error'] is None
+    assert event['payload_bytes'] >= len("Reply") + len(thread_ts)
+
+
+def test_retries_and_errors_are_reported(server, client):
+    events = []
+    client.add_hook(events.append)
+    server.inject_error('chat.postMessage', status=429, retry_after=0.01)
+    assert client.send_message("Retried")['ok']
+    server.inject_error('chat.postMessage', 'channel_not_found')
+    assert not client.send_message("Failed")['ok']
+
+    assert events[0]['ok'] and events[0]['retries'] == 1
+    assert events[1]['ok'] is False
+    assert events[1]['error'] == 'channel_not_found' and events[1]['status'] == 200
+
+
+def test_failing_hook_does_not_fail_the_call(client):
+    def broken(event):
+        raise RuntimeError("exporter down")
+
+    client.add_hook(broken)
+    assert client.send_message("Still sent")['ok']
+
+
+def test_payload_size_counts_text_and_blocks():
+    blocks = [{'type': 'divider'}]
+    assert payload_size({'text': 'héllo', 'blocks': blocks, 'thread_ts': None}) == 6 + 21
+
+
+def test_prometheus_hook_records_calls(client):
+    prometheus_client = pytest.importorskip('prometheus_client')
+    registry = prometheus_client.CollectorRegistry()
+    client.add_hook(PrometheusHook(registry=registry))
+    client.send_message("Counted")
+
+    labels = {'method': 'chat.postMessage', 'outcome': 'ok'}
+    assert registry.get_sample_value('slack_api_calls_total', labels) == 1
+    assert registry.get_sample_value('slack_api_request_bytes_total', {'method': 'chat.postMessage'}) > 0
+
+
+def test_opentelemetry_hook_records_spans(server, client):
+    pytest.importorskip('opentelemetry.sdk')
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from opentelemetry.trace import StatusCode
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    client.add_hook(OpenTelemetryHook(tracer=provider.get_tracer(__name__)))
+    client.send_message("Traced")
+    server.inject_error('chat.postMessage', 'channel_not_found')
+    client.send_message("Failed")
+
+    ok, failed = exporter.get_finished_spans()
+    assert ok.name == "slack chat.postMessage"
+    assert ok.attributes['slack.channel'] == 'C1'
+    assert failed.status.status_code == StatusCode.ERROR
@@ -0,0 +1,65 @@
+"""
+Offline tests for LiveMessage throttled in-place updates
+"""
+import threading
+import time
+
+from live_message import LiveMessage
+
+
+def _text(server, channel, ts):
+    return server.get_thread(channel, ts)[0]['text']
+
+
+def test_unchanged_state_is_not_sent(server, client):
+    status = client.start_thread("Import: starting", live=True)
+    status.set_text("Import: starting")
+    assert status.get_stats()['skipped'] == 1
+    assert server.calls['chat.update'] == 0
+    status.close()
+
+
+def test_rapid_changes_fold_into_one_trailing_update(server, client):
+    status = client.start_thread("Import: starting", live=True)
+    status.min_interval = 0.2
+    for i in range(50):
+        status.set_text(f"Import: {i + 1}/50")
+    assert server.calls['chat.update'] == 0
+    time.sleep(0.4)
+    assert server.calls['chat.update'] == 1
+    assert _text(server, 'C1', status.ts) == "Import: 50/50"
+    assert status.get_stats()['coalesced'] == 49
+
+
+def test_close_pushes_final_state(server, client):
+    with client.start_thread("Import: starting", live=True) as status:
+        status.min_interval = 60
+        status.set_blocks([{'type': 'section', 'text': {'type': 'mrkdwn', 'text': '*done*'}}], text="Import: done")
+    assert _text(server, 'C1', status.ts) == "Import: done"
+    assert server.calls['chat.update'] == 1
+
+
+def test_change_during_an_update_waits_for_the_throttle(server, client):
+    thread_ts = client.start_thread("Import: starting")
+    update_message = client.update_message
+    sent_at = []
+
+    def slow_update(**kwargs):
+        sent_at.append(time.monotonic())
+        time.sleep(0.2)
+        return update_message(**kwargs)
+
+    client.update_message = slow_update
+    status = LiveMessage(client, 'C1', thread_ts, "Import: starting", min_interval=0.3)
+    time.sleep(0.35)
+    first = threading.Thread(target=status.set_text, args=("Import: 1/2",))
+    first.start()
+    time.sleep(0.05)
+    # Arrives while the first chat.update is still in flight
+    status.set_text("Import: 2/2")
+    first.join()
+    time.sleep(0.6)
+
+    assert len(sent_at) == 2
+    assert sent_at[1] - sent_at[0] >= 0.2 + 0.3 - 0.01
+    assert _text(server, 'C1', thread_ts) == "Import: 2/2"
@@ -0,0 +1,105 @@
+"""
+Offline tests for MessageCoalescer against FakeSlackServer
+"""
+import threading
+import time
+
+from message_coalescer import MessageCoalescer
+
+
+def _texts(server, thread_ts):
+    return [m['text'] for m in server.get_thread('C1', thread_ts)[1:]]
+
+
+def test_merge_mode_batches_replies(server, client):
+    thread_ts = client.start_thread("Job")
+    updates = MessageCoalescer(client, window=0.05, max_latency=1.0)
+    for i in range(20):
+        updates.reply(thread_ts, f"Processed {i + 1}/20")
+    updates.close()
+
+    assert _texts(server, thread_ts) == ['\n'.join(f"Processed {i + 1}/20" for i in range(20))]
+    stats = updates.get_stats()
+    assert stats['replies'] == 20 and stats['api_calls'] == 1 and stats['calls_saved'] == 19
+
+
+def test_max_latency_flushes_a_busy_thread(server, client):
+    thread_ts = client.start_thread("Job")
+    updates = MessageCoalescer(client, window=0.2, max_latency=0.3)
+    started = time.monotonic()
+    while time.monotonic() - started < 0.5:
+        updates.reply(thread_ts, "tick")
+        time.sleep(0.02)
+    # The window never closed, but max_latency forced a send
+    assert len(_texts(server, thread_ts)) >= 1
+    updates.close()
+
+
+def test_overflow_waits_for_the_flusher(server, client):
+    thread_ts = client.start_thread("Job")
+    send_message = client.send_message
+    flusher_sending = threading.Event()
+
+    def slow_first_send(text, **kwargs):
+        if text.startswith('a'):
+            flusher_sending.set()
+            time.sleep(0.3)
+        return send_message(text, **kwargs)
+
+    client.send_message = slow_first_send
+    updates = MessageCoalescer(client, window=0.01, max_latency=0.01, max_chars=10)
+    updates.reply(thread_ts, 'a')
+    assert flusher_sending.wait(2)
+    # Overflows on this thread while the flusher is still sending 'a'
+    for text in ('b' * 6, 'c' * 6):
+        updates.reply(thread_ts, text)
+    updates.close()
+    assert _texts(server, thread_ts) == ['a', 'b' * 6, 'c' * 6]
+
+
+def test_concurrent_writers_keep_per_thread_order(server, client):
+    thread_ts = client.start_thread("Job")
+    updates = MessageCoalescer(client, window=0.01, max_latency=0.02, max_chars=40)
+
+    def write(prefix):
+        for i in range(100):
+            updates.reply(thread_ts, f"{prefix}-{i:03d}")
+
+    writers = [threading.Thread(target=write, args=(prefix,)) for prefix in 'ab']
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    updates.close()
+
+    lines = '\n'.join(_texts(server, thread_ts)).split('\n')
+    for prefix in 'ab':
+        sent = [line for line in lines if line.startswith(prefix)]
+        assert sent == [f"{prefix}-{i:03d}" for i in range(100)]
+
+
+def test_update_mode_edits_one_status_message(server, client):
+    thread_ts = client.start_thread("Job")
+    updates = MessageCoalescer(client, window=0.01, mode='update')
+    for i in range(3):
+        updates.reply(thread_ts, f"Step {i + 1}")
+        updates.flush()
+    assert _texts(server, thread_ts) == ["Step 3"]
+    assert server.calls['chat.update'] == 2
+
+    # A finished thread starts a new status message next time
+    updates.finish(thread_ts)
+    updates.reply(thread_ts, "Rerun")
+    updates.close()
+    assert _texts(server, thread_ts) == ["Step 3", "Rerun"]
+
+
+def test_status_messages_are_bounded(client):
+    updates = MessageCoalescer(client, window=0.01, mode='update', max_status_messages=2)
+    threads = [client.start_thread(f"Job {i}") for i in range(3)]
+    for thread_ts in threads:
+        updates.reply(thread_ts, "Started")
+        updates.flush()
+    assert list(updates._status_ts) == threads[1:]
+    updates.close()
+    assert not updates._status_ts
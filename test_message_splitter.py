@@ -0,0 +1,67 @@
+"""
+Offline tests for splitting oversized messages into thread replies
+"""
+import json
+
+import message_splitter
+from message_splitter import split_text, split_blocks
+
+DIVIDERS = [{'type': 'divider'}] * 120
+
+
+def test_split_text_keeps_lines_and_code_blocks():
+    text = '\n'.join(f"line {i:04d}" for i in range(200))
+    chunks = split_text(text, 500)
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert '\n'.join(chunks) == text
+
+    code = 'Log:\n```\n' + '\n'.join('x' * 70 for _ in range(20)) + '\n```'
+    chunks = split_text(code, 400)
+    assert len(chunks) > 1
+    assert all(chunk.count('```') % 2 == 0 for chunk in chunks)
+
+
+def test_split_text_always_returns_a_chunk():
+    assert len(split_text('\n' * 50000, 40000)) == 1
+    assert split_text('', 100) == ['']
+
+
+def test_split_blocks():
+    assert [len(group) for group in split_blocks(DIVIDERS)] == [50, 50, 20]
+    assert split_blocks([]) == [[]]
+
+
+def test_long_text_becomes_ordered_replies(server, client):
+    text = '\n'.join(f"{i:06d} " + 'y' * 993 for i in range(100))
+    result = client.send_message(text)
+    assert result['ok'] and result['parts'] == 3
+    replies = server.get_thread('C1', result['ts'])
+    assert '\n'.join(m['text'] for m in replies) == text
+
+
+def test_whitespace_only_text_does_not_raise(client):
+    result = client.send_message(' ' * (message_splitter.MAX_TEXT_CHARS + 1))
+    assert isinstance(result, dict) and 'ok' in result
+
+
+def test_block_string_is_decoded_and_split(server, client):
+    sent = []
+    api_call = client._api_call
+
+    def recording(method, **kwargs):
+        sent.append(kwargs.get('blocks'))
+        return api_call(method, **kwargs)
+
+    client._api_call = recording
+    result = client.send_message("Report", blocks=json.dumps(DIVIDERS))
+    assert result['ok'] and result['parts'] == 3
+    # Sent as lists, not as a JSON string inside the JSON body
+    assert [len(blocks) for blocks in sent] == [50, 50, 20]
+    assert len(server.get_thread('C1', result['ts'])) == 3
+
+
+def test_non_list_blocks_are_rejected(server, client):
+    for blocks in ({'type': 'divider'}, '{"type": "divider"}', 'not json'):
+        result = client.send_message("Report", blocks=blocks)
+        assert result == {'ok': False, 'error': 'blocks must be a list'}
+    assert server.calls['chat.postMessage'] == 0
@@ -0,0 +1,49 @@
+"""
+Offline tests for upload_files_to_thread against FakeSlackServer
+"""
+import os
+import tempfile
+
+
+def test_files_share_one_message(server, client):
+    thread_ts = client.start_thread("Build artifacts")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'report.csv')
+        with open(path, 'wb') as f:
+            f.write(b'a,b\n1,2\n')
+        results = client.upload_files_to_thread(thread_ts, [
+            {'file_path': path},
+            {'file_content': b'{"ok": true}', 'filename': 'result.json', 'title': 'Result'},
+            {'file_content': b'\x00' * 50000, 'filename': 'core.bin'}
+        ], initial_comment="Run 42")
+
+    assert [r['ok'] for r in results] == [True, True, True]
+    assert server.calls['files.completeUploadExternal'] == 1
+    message = server.get_thread('C1', thread_ts)[-1]
+    assert message['text'] == "Run 42"
+    # Files appear in the order they were given
+    assert message['files'] == [r['file_id'] for r in results]
+    assert server.files[results[1]['file_id']]['title'] == 'Result'
+    assert server.files[results[2]['file_id']]['size'] == 50000
+
+
+def test_bad_entry_does_not_block_the_others(server, client):
+    thread_ts = client.start_thread("Artifacts")
+    results = client.upload_files_to_thread(thread_ts, [
+        {'file_content': b'one', 'filename': 'one.txt'},
+        {'filename': 'missing-content.txt'},
+        {'file_path': '/nonexistent/file.txt'}
+    ])
+    assert [r['ok'] for r in results] == [True, False, False]
+    assert server.get_thread('C1', thread_ts)[-1]['files'] == [results[0]['file_id']]
+
+
+def test_complete_failure_fails_every_file(server, client):
+    thread_ts = client.start_thread("Artifacts")
+    server.inject_error('files.completeUploadExternal', 'channel_not_found')
+    results = client.upload_files_to_thread(thread_ts, [
+        {'file_content': b'one', 'filename': 'one.txt'},
+        {'file_content': b'two', 'filename': 'two.txt'}
+    ])
+    assert [r['ok'] for r in results] == [False, False]
+    assert all('channel_not_found' in r['error'] for r in results)
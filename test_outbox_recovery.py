@@ -0,0 +1,111 @@
+"""
+Offline tests for outbox delivery and crash recovery against FakeSlackServer
+
+A crash is simulated by stopping a send part way through, leaving the
+message marked 'sending', and opening the same outbox file again.
+"""
+import os
+import tempfile
+
+import pytest
+from outbox import Outbox
+from search_index import SearchIndex
+
+
+class _Crash(BaseException):
+    """Stops a send the way a killed process would"""
+
+
+@pytest.fixture
+def outbox_path():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield os.path.join(tmp, 'outbox.db')
+
+
+def _crash_during_send(client, path: str, text: str, thread_ts: str, delivered: bool) -> str:
+    outbox = Outbox(client, path=path)
+    key = outbox.enqueue(text, thread_ts=thread_ts)
+    api_call = client._api_call
+
+    def crash(method, **kwargs):
+        if delivered:
+            api_call(method, **kwargs)
+        raise _Crash()
+
+    client._api_call = crash
+    try:
+        outbox._send(outbox._next_due())
+    except _Crash:
+        pass
+    finally:
+        client._api_call = api_call
+    assert outbox.get(key)['status'] == 'sending'
+    outbox._conn.close()
+    return key
+
+
+def _texts(server, thread_ts: str, text: str) -> int:
+    return sum(1 for m in server.get_thread('C1', thread_ts) if m['text'] == text)
+
+
+def test_delivered_message_is_not_sent_again(server, client, make_thread, outbox_path):
+    # Recent replies put the delivered message past the first page
+    thread_ts = make_thread(250, text='Noise')
+    key = _crash_during_send(client, outbox_path, "Step 1 done", thread_ts, delivered=True)
+
+    outbox = Outbox(client, path=outbox_path)
+    assert outbox.recover() == 1
+    assert outbox.get(key)['status'] == 'sent'
+    assert _texts(server, thread_ts, "Step 1 done") == 1
+    outbox.close()
+
+
+def test_undelivered_message_is_sent_once(server, client, outbox_path):
+    thread_ts = client.start_thread("Deploy")
+    key = _crash_during_send(client, outbox_path, "Step 2 done", thread_ts, delivered=False)
+
+    outbox = Outbox(client, path=outbox_path)
+    outbox.start()
+    assert outbox.flush(timeout=10)
+    assert outbox.get(key)['status'] == 'sent'
+    assert _texts(server, thread_ts, "Step 2 done") == 1
+    outbox.close()
+
+
+def test_failed_lookup_requeues_without_raising(server, client, outbox_path):
+    thread_ts = client.start_thread("Deploy")
+    key = _crash_during_send(client, outbox_path, "Step 3 done", thread_ts, delivered=False)
+
+    # Slack is unreachable while the process restarts
+    server.stop()
+    outbox = Outbox(client, path=outbox_path)
+    outbox.start()
+    outbox.stop()
+    assert outbox.get(key)['status'] == 'pending'
+    outbox.close()
+
+
+def test_delivery_is_registered_and_indexed(make_client, outbox_path):
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(os.path.join(tmp, 'search.db'))
+        client = make_client(search_index=index)
+        outbox = Outbox(client, path=outbox_path)
+        key = outbox.enqueue("Nightly export ORD-1234 finished", channel='C2')
+        outbox.start()
+        assert outbox.flush(timeout=10)
+
+        ts = outbox.get(key)['ts']
+        assert client.active_threads[ts]['channel'] == 'C2'
+        assert [hit['ts'] for hit in index.search("ORD-1234")] == [ts]
+        outbox.close()
+        index.close()
+
+
+def test_oversized_message_is_rejected(client, outbox_path):
+    outbox = Outbox(client, path=outbox_path)
+    with pytest.raises(ValueError):
+        outbox.enqueue('x' * 40001)
+    with pytest.raises(ValueError):
+        outbox.enqueue('Too many blocks', blocks=[{'type': 'divider'}] * 51)
+    assert outbox.get_stats()['pending'] == 0
+    outbox.close()
@@ -0,0 +1,77 @@
+"""
+Offline tests for the token-bucket scheduler in rate_limiter.py
+"""
+from rate_limiter import RateLimiter, TokenBucket
+
+
+def test_reservations_are_spaced_at_the_rate():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    now = bucket.updated
+    delays = [bucket.reserve(now) for _ in range(5)]
+    # Burst of two, then one token every 0.1s in arrival order
+    assert delays[:2] == [0.0, 0.0]
+    assert [round(d, 6) for d in delays[2:]] == [0.1, 0.2, 0.3]
+
+
+def test_tokens_refill_up_to_capacity():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    now = bucket.updated
+    bucket.reserve(now)
+    bucket.reserve(now)
+    assert bucket.reserve(now + 10) == 0.0
+    assert bucket.reserve(now + 10) == 0.0
+    assert bucket.reserve(now + 10) > 0
+
+
+def test_pause_drops_saved_burst():
+    bucket = TokenBucket(rate=1.0, capacity=5)
+    now = bucket.updated
+    bucket.pause(now, 3.0)
+    assert bucket.reserve(now) == 3.0
+    # Only one token was left for the end of the pause
+    assert bucket.reserve(now) == 4.0
+
+
+def test_channel_limit_only_holds_back_that_channel():
+    limiter = RateLimiter(
+        method_limits={'chat.postMessage': (100.0, 100)},
+        channel_limits={'chat.postMessage': (1.0, 2)}
+    )
+    c1 = [limiter.reserve('chat.postMessage', 'C1') for _ in range(3)]
+    c2 = limiter.reserve('chat.postMessage', 'C2')
+    assert max(c1[:2]) < 0.01 and c1[2] > 0.9
+    assert c2 < 0.01
+
+    limiter.backoff('chat.postMessage', 30.0, channel='C1')
+    assert limiter.reserve('chat.postMessage', 'C1') > 29
+    assert limiter.reserve('chat.postMessage', 'C3') < 0.01
+
+
+def test_metrics_track_queue_and_waits():
+    limiter = RateLimiter(method_limits={'chat.update': (10.0, 1)})
+    limiter.reserve('chat.update')
+    limiter.reserve('chat.update')
+    metrics = limiter.get_metrics()['chat.update']
+    assert metrics['calls'] == 2
+    assert metrics['queue_depth'] == metrics['max_queue_depth'] == 2
+    limiter.release('chat.update')
+    limiter.release('chat.update')
+    assert limiter.get_metrics()['chat.update']['queue_depth'] == 0
+    assert abs(metrics['avg_wait'] - 0.05) < 0.01
+
+
+def test_client_retries_after_429(server, make_client):
+    client = make_client(max_retries=2)
+    server.inject_error('chat.postMessage', status=429, retry_after=0.1, count=2)
+    result = client.send_message("Hello")
+    assert result['ok']
+    assert server.calls['chat.postMessage'] == 3
+    assert client.rate_limiter.get_metrics()['chat.postMessage']['rate_limited'] == 2
+
+
+def test_client_gives_up_after_max_retries(server, make_client):
+    client = make_client(max_retries=1)
+    server.inject_error('chat.postMessage', status=429, retry_after=0.1, count=2)
+    result = client.send_message("Hello")
+    assert result['ok'] is False
+    assert 'ratelimited' in result['error']
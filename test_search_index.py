@@ -0,0 +1,66 @@
+"""
+Offline tests for the SQLite FTS5 message search index
+"""
+import pytest
+from search_index import SearchIndex, phrase_query
+
+MESSAGES = [
+    {'ts': '1700000000.000100', 'user': 'U1', 'text': "Deploy of api failed with ORD-1234"},
+    {'ts': '1700000100.000100', 'thread_ts': '1700000000.000100', 'user': 'U2', 'text': "Rolled back api"},
+    {'ts': '1700000200.000100', 'user': 'U1', 'text': "Deploy of web finished"},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.db'))
+    yield index
+    index.close()
+
+
+def test_phrase_query_escapes_syntax():
+    assert phrase_query('ORD-1234') == '"ORD-1234"'
+    assert phrase_query('say "hi"') == '"say ""hi"""'
+
+
+def test_search_ranks_and_filters(index):
+    assert index.add('C1', MESSAGES) == 3
+    assert index.add('C2', [{'ts': '1700000300.000100', 'text': "Deploy of api started"}]) == 1
+
+    assert [hit['ts'] for hit in index.search("ORD-1234")] == [MESSAGES[0]['ts']]
+    assert {hit['channel'] for hit in index.search("deploy")} == {'C1', 'C2'}
+    assert len(index.search("deploy", channel='C1')) == 2
+    in_thread = index.search("api", thread_ts='1700000000.000100')
+    assert sorted(hit['ts'] for hit in in_thread) == [m['ts'] for m in MESSAGES[:2]]
+    assert [hit['ts'] for hit in index.search("deploy", since=1700000150, until=1700000250)] == [MESSAGES[2]['ts']]
+    assert len(index.search("deploy OR rolled", raw=True)) == 4
+    assert index.search("api", limit=1)[0]['snippet'].count('*') == 2
+
+
+def test_readding_only_touches_changed_messages(index):
+    index.add('C1', MESSAGES)
+    assert index.add('C1', MESSAGES) == 0
+    edited = dict(MESSAGES[1], text="Rolled forward api")
+    assert index.add('C1', [edited]) == 1
+    assert index.search("rolled forward")[0]['ts'] == edited['ts']
+    assert not index.search("rolled back")
+
+
+def test_tombstones_and_removals_leave_the_index(index):
+    index.add('C1', MESSAGES)
+    index.add('C1', [{'ts': MESSAGES[0]['ts'], 'subtype': 'tombstone', 'text': "This message was deleted."}])
+    index.remove('C1', MESSAGES[2]['ts'])
+    assert index.count() == 1 and index.count('C1') == 1
+    assert not index.search("deploy")
+    index.optimize()
+
+
+def test_client_indexes_sent_and_fetched_messages(server, make_client, make_thread, index):
+    client = make_client(search_index=index)
+    thread_ts = client.start_thread("Incident ORD-1234 opened")
+    client.reply_to_thread(thread_ts, "Paging on-call")
+    assert [hit['text'] for hit in index.search("ORD-1234")] == ["Incident ORD-1234 opened"]
+
+    fetched_ts = make_thread(3, text="Fetched reply")
+    client.get_thread_replies('C1', fetched_ts)
+    assert len(index.search("fetched reply", thread_ts=fetched_ts)) == 3
@@ -0,0 +1,61 @@
+"""
+Offline tests for ShardedSender worker processes against FakeSlackServer
+"""
+import pytest
+from rate_limiter import METHOD_LIMITS, CHANNEL_LIMITS, SharedLimits, SharedRateLimiter
+from sharded_sender import ShardedSender, jump_hash
+
+UNLIMITED = (1e9, 1e9)
+
+
+def test_jump_hash_moves_few_keys_when_growing():
+    keys = [f'C{i:05d}' for i in range(2000)]
+    before = {key: jump_hash(key, 4) for key in keys}
+    after = {key: jump_hash(key, 5) for key in keys}
+    assert set(before.values()) == {0, 1, 2, 3}
+    moved = [key for key in keys if before[key] != after[key]]
+    # Keys only ever move to the new bucket, about 1/5 of them
+    assert all(after[key] == 4 for key in moved)
+    assert 250 < len(moved) < 550
+
+
+def test_shared_limits_apply_across_limiters():
+    shared = SharedLimits({'chat.update': (1.0, 2)})
+    first, second = SharedRateLimiter(shared), SharedRateLimiter(shared)
+    assert first.reserve('chat.update') < 0.01
+    assert second.reserve('chat.update') < 0.01
+    # The burst is used up, whichever process asks next
+    assert first.reserve('chat.update') > 0.9
+
+
+def test_workers_keep_per_channel_order(server):
+    channels = ['C1', 'C2', 'C3', 'C4']
+    with ShardedSender(
+        processes=2,
+        token='xoxb-test',
+        base_url=server.base_url,
+        lanes=2,
+        method_limits={method: UNLIMITED for method in METHOD_LIMITS},
+        channel_limits={method: UNLIMITED for method in CHANNEL_LIMITS}
+    ) as sender:
+        parents = {}
+        for channel in channels:
+            task_id = sender.send_message("Parent", channel=channel)
+            parents[channel] = sender.join(timeout=30)[task_id]['ts']
+        task_ids = [
+            sender.send_message(f"{channel} reply {i}", channel=channel, thread_ts=parents[channel])
+            for i in range(25) for channel in channels
+        ]
+        results = sender.join(timeout=30)
+
+    assert sorted(results) == task_ids
+    assert all(result['ok'] for result in results.values())
+    for channel in channels:
+        texts = [m['text'] for m in server.get_thread(channel, parents[channel])[1:]]
+        assert texts == [f"{channel} reply {i}" for i in range(25)]
+
+
+def test_unsupported_method_is_rejected():
+    sender = ShardedSender(processes=1, token='xoxb-test')
+    with pytest.raises(ValueError):
+        sender.submit('delete_everything', channel='C1')
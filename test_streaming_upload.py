@@ -0,0 +1,57 @@
+"""
+Offline tests for upload_stream against FakeSlackServer
+"""
+import io
+import os
+import tempfile
+
+import streaming_upload
+
+CHUNK = 64 * 1024
+
+
+def _uploaded(server, result):
+    return server.files[result['file_id']]
+
+
+def test_path_is_streamed_in_chunks(server, client):
+    thread_ts = client.start_thread("Logs")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'big.log')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(3 * 1024 * 1024 + 17))
+        result = client.upload_stream(path, 'big.log', thread_ts=thread_ts, chunk_size=CHUNK)
+
+    assert result['ok'] and result['bytes'] == 3 * 1024 * 1024 + 17
+    assert _uploaded(server, result)['size'] == result['bytes']
+    # Never more than one chunk held at a time
+    assert result['peak_buffer_bytes'] <= CHUNK
+    assert server.get_thread('C1', thread_ts)[-1]['files'] == [result['file_id']]
+
+
+def test_file_object_and_iterator_sources(server, client):
+    from_file = client.upload_stream(io.BytesIO(b'x' * 200000), 'a.bin', chunk_size=CHUNK)
+    # Unknown length: spooled to a temporary file first
+    from_iter = client.upload_stream((b'y' * 1000 for _ in range(300)), 'b.bin', chunk_size=CHUNK)
+    # Known length: streamed straight through
+    sized = client.upload_stream(iter([b'z' * 5000] * 4), 'c.bin', length=20000, chunk_size=CHUNK)
+
+    assert [_uploaded(server, r)['size'] for r in (from_file, from_iter, sized)] == [200000, 300000, 20000]
+
+
+def test_iter_path_chunks_covers_the_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.bin')
+        data = os.urandom(CHUNK * 2 + 5)
+        with open(path, 'wb') as f:
+            f.write(data)
+        chunks = [bytes(chunk) for chunk in streaming_upload.iter_path_chunks(path, CHUNK)]
+    assert [len(c) for c in chunks] == [CHUNK, CHUNK, 5]
+    assert b''.join(chunks) == data
+
+
+def test_api_error_is_returned(server, client):
+    server.inject_error('files.getUploadURLExternal', 'not_allowed_token_type')
+    result = client.upload_stream(io.BytesIO(b'data'), 'x.bin')
+    assert result['ok'] is False
+    assert 'not_allowed_token_type' in result['error']
@@ -0,0 +1,58 @@
+"""
+Offline tests for incremental thread sync and ThreadMessageCache
+"""
+import os
+import tempfile
+
+import pytest
+from thread_cache import ThreadMessageCache
+
+
+@pytest.fixture
+def cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ThreadMessageCache(os.path.join(tmp, 'messages.db'))
+        yield cache
+        cache.close()
+
+
+def _counts(result):
+    return result['new'], result['updated'], result['deleted']
+
+
+def test_incremental_sync_counts_only_real_changes(make_client, make_thread, cache):
+    client = make_client(message_cache=cache)
+    thread_ts = make_thread(150)
+    first = client.sync_thread('C1', thread_ts)
+    assert first['ok'] and _counts(first) == (151, 0, 0)
+    assert _counts(client.sync_thread('C1', thread_ts)) == (0, 0, 0)
+
+    # New replies bump the parent's reply_count; that is not an edit
+    for i in range(3):
+        client.reply_to_thread(thread_ts, f"Late {i}", channel='C1')
+    later = client.sync_thread('C1', thread_ts)
+    assert _counts(later) == (3, 0, 0)
+    assert later['fetched'] < 10  # only the parent and replies after the watermark
+    assert len(cache.get_messages('C1', thread_ts)) == 154
+
+
+def test_parent_edit_is_counted(make_client, make_thread, cache):
+    client = make_client(message_cache=cache)
+    thread_ts = make_thread(5)
+    client.sync_thread('C1', thread_ts)
+    assert client.update_message('C1', thread_ts, "Parent (edited)")['ok']
+    assert _counts(client.sync_thread('C1', thread_ts)) == (0, 1, 0)
+    assert cache.get_messages('C1', thread_ts)[0]['text'] == "Parent (edited)"
+
+
+def test_tombstones_and_missing_messages_are_marked_deleted(cache):
+    messages = [{'ts': f'1.00000{i}', 'text': f"Message {i}"} for i in range(4)]
+    assert _counts(cache.merge('C1', '1.000000', messages, complete=True)) == (4, 0, 0)
+
+    tombstone = dict(messages[1], subtype='tombstone', text='This message was deleted.')
+    # messages[3] is gone from a complete re-read
+    stats = cache.merge('C1', '1.000000', [messages[0], tombstone, messages[2]], complete=True)
+    assert _counts(stats) == (0, 0, 2)
+    assert [m['ts'] for m in cache.get_messages('C1', '1.000000')] == ['1.000000', '1.000002']
+    assert len(cache.get_messages('C1', '1.000000', include_deleted=True)) == 4
+    assert cache.get_watermark('C1', '1.000000') == '1.000003'
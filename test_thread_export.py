@@ -0,0 +1,91 @@
+"""
+Offline tests for interrupted and resumed thread exports against
+FakeSlackServer
+"""
+import gzip
+import json
+
+import pytest
+import thread_export
+from thread_export import ThreadExporter
+
+TOKEN = 'xoxb-test'
+THREADS = 6
+REPLIES = 150
+
+
+class _Interrupted(BaseException):
+    """Stops an export the way Ctrl-C or a killed process would"""
+
+
+@pytest.fixture
+def workspace(server, client):
+    for i in range(THREADS):
+        channel = f'C{i % 2}'
+        thread_ts = client.start_thread(f"Incident {i}", channel=channel)
+        for j in range(REPLIES):
+            server.call(
+                'chat.postMessage',
+                {'channel': channel, 'thread_ts': thread_ts, 'text': f"Update {i}-{j}"},
+                TOKEN
+            )
+    return client
+
+
+def _export_twice(client, writer_class, path, checkpoint, monkeypatch, **kwargs):
+    write = writer_class.write
+    written = [0]
+
+    def interrupting_write(self, record):
+        written[0] += 1
+        if written[0] > 500:
+            raise _Interrupted()
+        write(self, record)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(writer_class, 'write', interrupting_write)
+        with pytest.raises(_Interrupted):
+            ThreadExporter(client, page_size=50).export(
+                path, checkpoint_path=checkpoint, checkpoint_every=200, **kwargs
+            )
+    with open(checkpoint) as f:
+        assert json.load(f)['messages'] == 400
+    return ThreadExporter(client, page_size=50).export(
+        path, checkpoint_path=checkpoint, checkpoint_every=200, **kwargs
+    )
+
+
+def test_jsonl_resume_writes_every_message_once(workspace, tmp_path, monkeypatch):
+    path = str(tmp_path / 'threads.jsonl.gz')
+    result = _export_twice(
+        workspace, thread_export._JsonlWriter, path, str(tmp_path / 'export.ckpt'), monkeypatch,
+        compression='gzip'
+    )
+    assert result['ok'] and result['messages'] == THREADS * (REPLIES + 1)
+
+    with gzip.open(path, 'rt') as f:
+        keys = [(r['channel'], r['ts']) for r in map(json.loads, f)]
+    assert len(keys) == len(set(keys)) == THREADS * (REPLIES + 1)
+
+
+def test_parquet_resume_writes_every_message_once(workspace, tmp_path, monkeypatch):
+    if thread_export.pyarrow is None:
+        pytest.skip("pyarrow not installed")
+    path = str(tmp_path / 'threads')
+    result = _export_twice(
+        workspace, thread_export._ParquetWriter, path, str(tmp_path / 'export.ckpt'), monkeypatch,
+        format='parquet'
+    )
+    assert result['ok'] and result['messages'] == THREADS * (REPLIES + 1)
+
+    table = thread_export.parquet.read_table(path)
+    keys = list(zip(table['channel'].to_pylist(), table['ts'].to_pylist()))
+    assert len(keys) == len(set(keys)) == THREADS * (REPLIES + 1)
+
+
+def test_finished_export_is_skipped(workspace, tmp_path):
+    path = str(tmp_path / 'threads.jsonl')
+    checkpoint = str(tmp_path / 'export.ckpt')
+    ThreadExporter(workspace).export(path, compression=None, checkpoint_path=checkpoint)
+    result = ThreadExporter(workspace).export(path, compression=None, checkpoint_path=checkpoint)
+    assert result['skipped'] == THREADS and result['threads'] == 0
@@ -0,0 +1,95 @@
+"""
+Offline tests for the in-memory and SQLite thread registries
+"""
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from thread_registry import MemoryThreadRegistry, SQLiteThreadRegistry, sqlite_path
+
+
+@pytest.fixture
+def sqlite_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield os.path.join(tmp, 'threads.db')
+
+
+def test_memory_registry_drops_least_recently_used():
+    registry = MemoryThreadRegistry(max_size=2)
+    registry['1.0'] = {'channel': 'C1'}
+    registry['2.0'] = {'channel': 'C2'}
+    assert registry.get('1.0')['channel'] == 'C1'  # now most recently used
+    registry['3.0'] = {'channel': 'C3'}
+    assert '2.0' not in registry
+    assert sorted(registry) == ['1.0', '3.0']
+
+
+def test_expired_threads_are_not_counted():
+    registry = MemoryThreadRegistry(ttl=0.05)
+    registry['1.0'] = {'channel': 'C1'}
+    registry['2.0'] = {'channel': 'C1'}
+    time.sleep(0.1)
+    registry['3.0'] = {'channel': 'C1'}
+    assert len(registry) == 1
+    assert len(registry) == len(registry.to_dict()) == sum(ts in registry for ts in ('1.0', '2.0', '3.0'))
+
+
+def test_sqlite_registry_is_shared_between_instances(sqlite_file):
+    writer = SQLiteThreadRegistry(sqlite_file)
+    writer['1.0'] = {'channel': 'C1', 'initial_message': 'Deploy'}
+
+    # Another process (or restart) opening the same file sees the thread
+    reader = SQLiteThreadRegistry(sqlite_file)
+    assert reader['1.0'] == {'channel': 'C1', 'initial_message': 'Deploy'}
+    del reader['1.0']
+    assert writer.get('1.0') is None
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_registry_from_many_threads(sqlite_file):
+    registry = SQLiteThreadRegistry(sqlite_file)
+
+    def register(n):
+        for i in range(50):
+            registry[f'{n}.{i:06d}'] = {'channel': f'C{n}'}
+
+    workers = [threading.Thread(target=register, args=(n,)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(registry) == 200
+    assert registry['3.000049']['channel'] == 'C3'
+    registry.close()
+
+
+def test_sqlite_registry_ttl(sqlite_file):
+    registry = SQLiteThreadRegistry(sqlite_file, ttl=0.05)
+    registry['1.0'] = {'channel': 'C1'}
+    time.sleep(0.1)
+    registry['2.0'] = {'channel': 'C1'}
+    assert '1.0' not in registry
+    assert len(registry) == 1
+    assert registry.evict_expired() == 1
+    registry.close()
+
+
+def test_sqlite_path():
+    assert sqlite_path('sqlite:///slack_messages.db') == 'slack_messages.db'
+    assert sqlite_path('sqlite:///') == ':memory:'
+    with pytest.raises(ValueError):
+        sqlite_path('postgresql://localhost/slack')
+
+
+def test_client_finds_channel_in_registry(server, make_client, sqlite_file):
+    registry = SQLiteThreadRegistry(sqlite_file)
+    thread_ts = make_client(thread_registry=registry).start_thread("Parent", channel='C2')
+
+    # A fresh client sharing the registry replies without being told the channel
+    reply = make_client(thread_registry=SQLiteThreadRegistry(sqlite_file)).reply_to_thread(thread_ts, "Child")
+    assert reply['ok'] and reply['channel'] == 'C2'
+    assert len(server.get_thread('C2', thread_ts)) == 2
+    registry.close()
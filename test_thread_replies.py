@@ -0,0 +1,33 @@
+"""
+Offline tests for paginated thread reads against FakeSlackServer
+"""
+
+
+def test_iter_thread_replies_follows_cursors(server, client, make_thread):
+    thread_ts = make_thread(450)
+    for prefetch in (False, True):
+        calls = server.calls['conversations.replies']
+        messages = list(client.iter_thread_replies('C1', thread_ts, page_size=100, prefetch=prefetch))
+        assert len(messages) == 451
+        assert messages[0]['ts'] == thread_ts
+        assert server.calls['conversations.replies'] - calls == 5
+
+
+def test_get_thread_replies_returns_whole_thread(client, make_thread):
+    thread_ts = make_thread(250)
+    everything = client.get_thread_replies('C1', thread_ts)
+    assert len(everything) == 251
+    assert len(client.get_thread_replies('C1', thread_ts, limit=10)) == 10
+
+
+def test_oldest_skips_earlier_replies(client, make_thread):
+    thread_ts = make_thread(20)
+    replies = client.get_thread_replies('C1', thread_ts)
+    newer = list(client.iter_thread_replies('C1', thread_ts, oldest=replies[10]['ts']))
+    # Parent first, then only replies after oldest
+    assert [m['ts'] for m in newer] == [thread_ts] + [m['ts'] for m in replies[11:]]
+
+
+def test_missing_thread_returns_none(client, make_thread):
+    make_thread(1)
+    assert client.get_thread_replies('C1', '1.000000') is None
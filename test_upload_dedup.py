@@ -0,0 +1,49 @@
+"""
+Offline tests for the upload dedup cache against FakeSlackServer
+"""
+import os
+import tempfile
+
+from upload_cache import UploadCache
+
+
+def test_identical_bytes_are_uploaded_once(server, make_client):
+    client = make_client(upload_cache=UploadCache())
+    thread_ts = client.start_thread("Reports")
+    first = client.upload_file(file_content=b'report body', filename='report.txt', thread_ts=thread_ts)
+    second = client.upload_file(file_content=b'report body', filename='copy.txt', thread_ts=thread_ts)
+
+    assert first['ok'] and not first.get('deduplicated')
+    assert second['ok'] and second['deduplicated']
+    assert second['file_id'] == first['file_id']
+    assert len(server.files) == 1
+    # The repeat is posted as a link to the existing file
+    assert server.get_thread('C1', thread_ts)[-1]['text'] == first['permalink']
+
+
+def test_path_and_bytes_share_a_digest(server, make_client):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.bin')
+        with open(path, 'wb') as f:
+            f.write(b'\x00' * 100000)
+        client = make_client(upload_cache=UploadCache())
+        first = client.upload_file(file_path=path)
+        second = client.upload_file(file_content=b'\x00' * 100000, filename='data.bin')
+        changed = client.upload_file(file_content=b'\x01' * 100000, filename='data.bin')
+
+    assert second['deduplicated'] and second['file_id'] == first['file_id']
+    assert not changed.get('deduplicated')
+    assert len(server.files) == 2
+
+
+def test_cache_survives_restart(make_client):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'uploads.db')
+        cache = UploadCache(path)
+        first = make_client(upload_cache=cache).upload_file(file_content=b'logo', filename='logo.png')
+        cache.close()
+
+        cache = UploadCache(path)
+        second = make_client(upload_cache=cache).upload_file(file_content=b'logo', filename='logo.png')
+        cache.close()
+    assert second['deduplicated'] and second['file_id'] == first['file_id']
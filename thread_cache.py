@@ -0,0 +1,196 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, List, Any, Iterable
+
+# Bookkeeping Slack changes on the parent message whenever someone replies
+THREAD_FIELDS = ('reply_count', 'reply_users', 'reply_users_count', 'latest_reply', 'last_read', 'subscribed')
+
+
+def _content(message: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in message.items() if key not in THREAD_FIELDS}
+
+
+class ThreadMessageCache:
+    """
+    Local SQLite copy of thread messages with a per-thread watermark
+
+    The watermark is the newest message ts seen in a thread, so later syncs
+    only need to ask Slack for messages after it. Deleted messages are kept
+    with deleted=1 so callers can tell a deletion from a cache miss.
+
+    Args:
+        path: SQLite database file
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS thread_messages (
+            channel TEXT NOT NULL,
+            thread_ts TEXT NOT NULL,
+            ts TEXT NOT NULL,
+            user TEXT,
+            text TEXT,
+            edited_ts TEXT,
+            deleted INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL,
+            PRIMARY KEY (channel, thread_ts, ts)
+        );
+        CREATE TABLE IF NOT EXISTS thread_watermarks (
+            channel TEXT NOT NULL,
+            thread_ts TEXT NOT NULL,
+            latest_ts TEXT NOT NULL,
+            synced_at REAL NOT NULL,
+            PRIMARY KEY (channel, thread_ts)
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get_watermark(self, channel: str, thread_ts: str) -> Optional[str]:
+        """
+        Get the newest message ts cached for a thread
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+
+        Returns:
+            Latest ts, or None if the thread was never synced
+        """
+        row = self._conn().execute(
+            'SELECT latest_ts FROM thread_watermarks WHERE channel = ? AND thread_ts = ?',
+            (channel, thread_ts)
+        ).fetchone()
+        return row[0] if row else None
+
+    def merge(
+        self,
+        channel: str,
+        thread_ts: str,
+        messages: Iterable[Dict[str, Any]],
+        complete: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Merge fetched messages into the cache and advance the watermark
+
+        New messages are inserted, changed ones (edits, reactions, reply
+        counts) are replaced and tombstones are marked deleted. When the
+        messages are the complete thread, cached messages missing from it
+        are marked deleted too. A parent whose only change is its reply
+        bookkeeping (THREAD_FIELDS) is stored but not counted as updated.
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+            messages: Messages from conversations.replies
+            complete: True if messages is the whole thread
+
+        Returns:
+            Counts of new, updated and deleted messages plus the latest ts
+        """
+        conn = self._conn()
+        stats = {'new': 0, 'updated': 0, 'deleted': 0}
+        latest = self.get_watermark(channel, thread_ts)
+        seen = set()
+
+        with conn:
+            for message in messages:
+                ts = message['ts']
+                seen.add(ts)
+                data = json.dumps(message, sort_keys=True)
+                deleted = 1 if message.get('subtype') == 'tombstone' else 0
+                row = conn.execute(
+                    'SELECT data, deleted FROM thread_messages '
+                    'WHERE channel = ? AND thread_ts = ? AND ts = ?',
+                    (channel, thread_ts, ts)
+                ).fetchone()
+
+                if row is not None and row[0] == data and row[1] == deleted:
+                    continue
+                if row is None:
+                    stats['new'] += 1
+                elif deleted and not row[1]:
+                    stats['deleted'] += 1
+                elif row[1] != deleted or _content(json.loads(row[0])) != _content(message):
+                    stats['updated'] += 1
+
+                conn.execute(
+                    'INSERT OR REPLACE INTO thread_messages '
+                    '(channel, thread_ts, ts, user, text, edited_ts, deleted, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        channel, thread_ts, ts,
+                        message.get('user') or message.get('bot_id'),
+                        message.get('text'),
+                        (message.get('edited') or {}).get('ts'),
+                        deleted, data
+                    )
+                )
+                if latest is None or float(ts) > float(latest):
+                    latest = ts
+
+            if complete:
+                cached = conn.execute(
+                    'SELECT ts FROM thread_messages '
+                    'WHERE channel = ? AND thread_ts = ? AND deleted = 0',
+                    (channel, thread_ts)
+                ).fetchall()
+                gone = [(channel, thread_ts, ts) for (ts,) in cached if ts not in seen]
+                conn.executemany(
+                    'UPDATE thread_messages SET deleted = 1 '
+                    'WHERE channel = ? AND thread_ts = ? AND ts = ?',
+                    gone
+                )
+                stats['deleted'] += len(gone)
+
+            if latest is not None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO thread_watermarks '
+                    '(channel, thread_ts, latest_ts, synced_at) VALUES (?, ?, ?, ?)',
+                    (channel, thread_ts, latest, time.time())
+                )
+
+        stats['latest_ts'] = latest
+        return stats
+
+    def get_messages(
+        self,
+        channel: str,
+        thread_ts: str,
+        include_deleted: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get cached messages for a thread in ts order
+
+        Args:
+            channel: Channel ID
+            thread_ts: Thread timestamp
+            include_deleted: Also return messages marked deleted
+
+        Returns:
+            List of message dicts as returned by Slack
+        """
+        query = 'SELECT data FROM thread_messages WHERE channel = ? AND thread_ts = ?'
+        if not include_deleted:
+            query += ' AND deleted = 0'
+        rows = self._conn().execute(query + ' ORDER BY CAST(ts AS REAL)', (channel, thread_ts))
+        return [json.loads(data) for (data,) in rows]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
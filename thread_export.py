@@ -0,0 +1,398 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Optional, Dict, List, Any, Iterator, Iterable, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'parquet')
+PARQUET_COLUMNS = ('channel', 'thread_ts', 'ts', 'user', 'subtype', 'text', 'data')
+
+Target = Union[str, Tuple[str, str]]
+
+
+def _record(channel: str, thread_ts: str, message: Dict[str, Any]) -> Dict[str, Any]:
+    # conversations.replies omits the channel; the parent may omit thread_ts
+    return dict(message, channel=channel, thread_ts=message.get('thread_ts') or thread_ts)
+
+
+class _JsonlWriter:
+    """
+    JSON Lines output, optionally zstd or gzip compressed
+
+    Each commit ends the current compressed frame (gzip member), so the
+    file is valid up to the committed offset and a resumed export can
+    truncate to it and append a new frame.
+    """
+
+    def __init__(self, path: str, compression: Optional[str], level: int, state: Dict[str, Any] = None):
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("zstandard is required for zstd compressed exports")
+        if compression not in ('zstd', 'gzip', None):
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.path = path
+        self.compression = compression
+        self.level = level
+        if state:
+            self.file = open(path, 'r+b')
+            self.file.truncate(state['offset'])
+            self.file.seek(state['offset'])
+        else:
+            self.file = open(path, 'wb')
+        self._stream = None
+
+    def write(self, record: Dict[str, Any]):
+        if self._stream is None:
+            if self.compression == 'zstd':
+                compressor = zstandard.ZstdCompressor(level=self.level)
+                self._stream = compressor.stream_writer(self.file, closefd=False)
+            elif self.compression == 'gzip':
+                self._stream = gzip.GzipFile(fileobj=self.file, mode='wb', compresslevel=self.level)
+            else:
+                self._stream = self.file
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str)
+        self._stream.write(line.encode('utf-8') + b'\n')
+
+    def commit(self) -> Dict[str, Any]:
+        if self._stream is not None and self._stream is not self.file:
+            self._stream.close()
+        self._stream = None
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {'offset': self.file.tell()}
+
+    def bytes_written(self) -> int:
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    """
+    Parquet output as a directory of part files
+
+    Rows are buffered up to row_group_size and written as row groups of
+    an in-progress part; each commit closes the part and renames it into
+    place, so only complete files are ever visible under their final name.
+    """
+
+    def __init__(self, path: str, compression: Optional[str], row_group_size: int, state: Dict[str, Any] = None):
+        if pyarrow is None:
+            raise ImportError("pyarrow is required for Parquet exports")
+        self.path = path
+        self.compression = compression or 'none'
+        self.row_group_size = row_group_size
+        self.parts = state['parts'] if state else 0
+        self.committed_bytes = state.get('bytes', 0) if state else 0
+        os.makedirs(path, exist_ok=True)
+        stale = glob.glob(os.path.join(path, '*.parquet.tmp'))
+        if not state:
+            stale += glob.glob(os.path.join(path, 'part-*.parquet'))
+        for name in stale:
+            os.remove(name)
+        self.schema = pyarrow.schema([(name, pyarrow.string()) for name in PARQUET_COLUMNS])
+        self._columns = {name: [] for name in PARQUET_COLUMNS}
+        self._rows = 0
+        self._writer = None
+        self._tmp_path = None
+
+    def write(self, record: Dict[str, Any]):
+        columns = self._columns
+        columns['channel'].append(record['channel'])
+        columns['thread_ts'].append(record['thread_ts'])
+        columns['ts'].append(record.get('ts'))
+        columns['user'].append(record.get('user') or record.get('bot_id'))
+        columns['subtype'].append(record.get('subtype'))
+        columns['text'].append(record.get('text'))
+        columns['data'].append(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str))
+        self._rows += 1
+        if self._rows >= self.row_group_size:
+            self._flush_rows()
+
+    def _flush_rows(self):
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._tmp_path = os.path.join(self.path, f'part-{self.parts:05d}.parquet.tmp')
+            self._writer = parquet.ParquetWriter(self._tmp_path, self.schema, compression=self.compression)
+        self._writer.write_table(pyarrow.Table.from_pydict(self._columns, schema=self.schema))
+        self._columns = {name: [] for name in PARQUET_COLUMNS}
+        self._rows = 0
+
+    def commit(self) -> Dict[str, Any]:
+        self._flush_rows()
+        if self._writer is not None:
+            self._writer.close()
+            final_path = self._tmp_path[:-len('.tmp')]
+            os.replace(self._tmp_path, final_path)
+            self.committed_bytes += os.path.getsize(final_path)
+            self.parts += 1
+            self._writer = None
+        return {'parts': self.parts, 'bytes': self.committed_bytes}
+
+    def bytes_written(self) -> int:
+        if self._tmp_path and self._writer is not None and os.path.exists(self._tmp_path):
+            return self.committed_bytes + os.path.getsize(self._tmp_path)
+        return self.committed_bytes
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self._tmp_path)
+            self._writer = None
+
+
+class ThreadExporter:
+    """
+    Streams whole threads to compressed JSON Lines or Parquet
+
+    Threads are fetched by a pool of workers with iter_thread_replies, so
+    every page goes through the client's rate limiter, and their messages
+    pass through a bounded queue to the single writer. Memory use stays at
+    roughly queue_size messages plus one page per worker (and one Parquet
+    row group), however large the export. Messages of one thread keep
+    their order; messages of different threads are interleaved.
+
+    With a checkpoint file, the writer is committed every checkpoint_every
+    messages, recording the threads finished by then and the last message
+    written for each unfinished one. An interrupted export started again
+    with the same arguments drops anything written after the last commit,
+    skips finished threads and continues the others after their last
+    message, so every message is written exactly once. Threads that failed
+    are continued the same way on the next run.
+
+    Args:
+        client: SlackThreadClient used to read threads
+        max_workers: Threads fetched at once
+        queue_size: Messages that may wait for the writer
+        page_size: Messages per conversations.replies call
+    """
+
+    def __init__(self, client, max_workers: int = 4, queue_size: int = 1000, page_size: int = 200):
+        self.client = client
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.page_size = page_size
+
+    def _stream(
+        self,
+        targets: List[Tuple[str, str]],
+        resume_after: Dict[Tuple[str, str], str] = None
+    ) -> Iterator[Tuple[str, str, str, Any]]:
+        """
+        Yield ('message', channel, thread_ts, message) for every message,
+        then ('done', channel, thread_ts, count) or ('failed', ..., error)
+        once per thread. Threads in resume_after only yield messages newer
+        than the given ts.
+        """
+        resume_after = resume_after or {}
+        work = queue.Queue()
+        for target in targets:
+            work.put(target)
+        events = queue.Queue(maxsize=self.queue_size)
+        stopped = threading.Event()
+
+        def put(event):
+            while not stopped.is_set():
+                try:
+                    events.put(event, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def run():
+            while not stopped.is_set():
+                try:
+                    channel, thread_ts = work.get_nowait()
+                except queue.Empty:
+                    break
+                count = 0
+                oldest = resume_after.get((channel, thread_ts))
+                try:
+                    for message in self.client.iter_thread_replies(
+                        channel=channel,
+                        thread_ts=thread_ts,
+                        page_size=self.page_size,
+                        oldest=oldest
+                    ):
+                        # The parent is returned even when oldest is set
+                        if oldest and float(message['ts']) <= float(oldest):
+                            continue
+                        if not put(('message', channel, thread_ts, message)):
+                            return
+                        count += 1
+                except Exception as e:
+                    logger.error("Export of thread %s failed: %s", thread_ts, e)
+                    put(('failed', channel, thread_ts, e))
+                    continue
+                put(('done', channel, thread_ts, count))
+            put(None)
+
+        workers = [
+            threading.Thread(target=run, name=f'slack-export-{i}', daemon=True)
+            for i in range(max(1, min(self.max_workers, len(targets))))
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            running = len(workers)
+            while running:
+                event = events.get()
+                if event is None:
+                    running -= 1
+                    continue
+                yield event
+        finally:
+            # Stop early if the caller abandons the iterator
+            stopped.set()
+            for worker in workers:
+                worker.join()
+
+    def _targets(self, threads: Optional[Iterable[Target]]) -> List[Tuple[str, str]]:
+        if threads is None:
+            threads = list(self.client.get_active_threads())
+        return [self.client._resolve_target(target) for target in threads]
+
+    def iter_messages(self, threads: Iterable[Target] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the messages of many threads, fetched concurrently
+
+        Args:
+            threads: thread_ts values or (channel, thread_ts) tuples
+                (default: every thread in the client's registry)
+
+        Returns:
+            Iterator of message dicts with channel and thread_ts set
+        """
+        for kind, channel, thread_ts, payload in self._stream(self._targets(threads)):
+            if kind == 'message':
+                yield _record(channel, thread_ts, payload)
+
+    def export(
+        self,
+        path: str,
+        threads: Iterable[Target] = None,
+        format: str = 'jsonl',
+        compression: Optional[str] = 'zstd',
+        level: int = 3,
+        checkpoint_path: str = None,
+        checkpoint_every: int = 50000,
+        row_group_size: int = 10000
+    ) -> Dict[str, Any]:
+        """
+        Export threads to a file (JSON Lines) or directory (Parquet parts)
+
+        Args:
+            path: Output file, or directory for Parquet
+            threads: thread_ts values or (channel, thread_ts) tuples
+                (default: every thread in the client's registry)
+            format: 'jsonl' or 'parquet'
+            compression: 'zstd', 'gzip' or None (Parquet also accepts
+                'snappy' and the other codecs pyarrow supports)
+            level: Compression level for JSON Lines
+            checkpoint_path: JSON file recording progress, for resuming
+            checkpoint_every: Messages written between checkpoints
+            row_group_size: Rows per Parquet row group
+
+        Returns:
+            Dict with ok, threads, skipped, failed, messages, bytes,
+            seconds, messages_per_sec and bytes_per_sec
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+
+        checkpoint = None
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('path') != path or checkpoint.get('format') != format:
+                raise ValueError(f"Checkpoint {checkpoint_path} belongs to another export")
+        done = {tuple(target) for target in checkpoint['done']} if checkpoint else set()
+        # (channel, thread_ts) -> ts of the last message written, for threads
+        # that are not finished
+        progress = {(c, t): ts for c, t, ts in checkpoint['partial']} if checkpoint else {}
+
+        if format == 'jsonl':
+            writer = _JsonlWriter(path, compression, level, checkpoint and checkpoint['writer'])
+        else:
+            writer = _ParquetWriter(path, compression, row_group_size, checkpoint and checkpoint['writer'])
+
+        targets = self._targets(threads)
+        pending = [target for target in targets if target not in done]
+        stats = {
+            'threads': 0, 'skipped': len(targets) - len(pending), 'failed': 0,
+            'messages': checkpoint['messages'] if checkpoint else 0
+        }
+        since_commit = 0
+        start = time.monotonic()
+        exported = 0
+
+        def commit():
+            nonlocal since_commit
+            state = writer.commit()
+            since_commit = 0
+            if checkpoint_path:
+                tmp_path = checkpoint_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump({
+                        'path': path, 'format': format, 'writer': state,
+                        'messages': stats['messages'], 'done': sorted(done),
+                        'partial': sorted([c, t, ts] for (c, t), ts in progress.items())
+                    }, f)
+                os.replace(tmp_path, checkpoint_path)
+            elapsed = time.monotonic() - start
+            logger.info(
+                "Exported %s messages from %s threads (%.0f msg/s, %s bytes)",
+                stats['messages'], stats['threads'], exported / elapsed if elapsed else 0.0,
+                writer.bytes_written()
+            )
+
+        try:
+            for kind, channel, thread_ts, payload in self._stream(pending, dict(progress)):
+                if kind == 'message':
+                    writer.write(_record(channel, thread_ts, payload))
+                    progress[(channel, thread_ts)] = payload['ts']
+                    stats['messages'] += 1
+                    exported += 1
+                    since_commit += 1
+                    if since_commit >= checkpoint_every:
+                        commit()
+                elif kind == 'done':
+                    stats['threads'] += 1
+                    progress.pop((channel, thread_ts), None)
+                    done.add((channel, thread_ts))
+                else:
+                    stats['failed'] += 1
+            commit()
+        finally:
+            writer.close()
+
+        elapsed = time.monotonic() - start
+        total_bytes = writer.bytes_written() if format == 'parquet' else os.path.getsize(path)
+        stats.update({
+            'ok': stats['failed'] == 0,
+            'bytes': total_bytes,
+            'seconds': elapsed,
+            'messages_per_sec': exported / elapsed if elapsed else 0.0,
+            'bytes_per_sec': total_bytes / elapsed if elapsed else 0.0
+        })
+        return stats
@@ -0,0 +1,275 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterator, Tuple
+from config import Config
+
+
+class ThreadRegistry:
+    """
+    Mapping of thread_ts -> thread metadata ({'channel', 'initial_message'})
+
+    Subclasses implement get/set/delete/items/evict_expired; the dict-style
+    helpers let the registry stand in for the old active_threads dict.
+    """
+
+    def get(self, thread_ts: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        """Get metadata for a thread, or default if unknown or expired"""
+        raise NotImplementedError
+
+    def set(self, thread_ts: str, info: Dict[str, Any]):
+        """Register a thread"""
+        raise NotImplementedError
+
+    def delete(self, thread_ts: str):
+        """Forget a thread"""
+        raise NotImplementedError
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Iterate over (thread_ts, metadata) for live threads"""
+        raise NotImplementedError
+
+    def evict_expired(self) -> int:
+        """Drop threads older than the TTL and return how many were removed"""
+        raise NotImplementedError
+
+    def __getitem__(self, thread_ts: str) -> Dict[str, Any]:
+        info = self.get(thread_ts)
+        if info is None:
+            raise KeyError(thread_ts)
+        return info
+
+    def __setitem__(self, thread_ts: str, info: Dict[str, Any]):
+        self.set(thread_ts, info)
+
+    def __delitem__(self, thread_ts: str):
+        self.delete(thread_ts)
+
+    def __contains__(self, thread_ts: str) -> bool:
+        return self.get(thread_ts) is not None
+
+    def __iter__(self):
+        return (thread_ts for thread_ts, _ in self.items())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of all live threads as a plain dict"""
+        return dict(self.items())
+
+
+class MemoryThreadRegistry(ThreadRegistry):
+    """
+    In-process registry with LRU eviction and optional TTL
+
+    Args:
+        max_size: Maximum number of threads kept (least recently used go first)
+        ttl: Seconds a thread stays registered (None or 0 = forever)
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._threads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl) and created_at < now - self.ttl
+
+    def get(self, thread_ts: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._threads.get(thread_ts)
+            if entry is None:
+                return default
+            created_at, info = entry
+            if self._expired(created_at, time.time()):
+                del self._threads[thread_ts]
+                return default
+            self._threads.move_to_end(thread_ts)
+            return info
+
+    def set(self, thread_ts: str, info: Dict[str, Any]):
+        with self._lock:
+            self._threads[thread_ts] = (time.time(), info)
+            self._threads.move_to_end(thread_ts)
+            while self.max_size and len(self._threads) > self.max_size:
+                self._threads.popitem(last=False)
+
+    def delete(self, thread_ts: str):
+        with self._lock:
+            self._threads.pop(thread_ts, None)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        now = time.time()
+        with self._lock:
+            snapshot = list(self._threads.items())
+        return iter([
+            (thread_ts, info) for thread_ts, (created_at, info) in snapshot
+            if not self._expired(created_at, now)
+        ])
+
+    def evict_expired(self) -> int:
+        if not self.ttl:
+            return 0
+        now = time.time()
+        with self._lock:
+            expired = [
+                thread_ts for thread_ts, (created_at, _) in self._threads.items()
+                if self._expired(created_at, now)
+            ]
+            for thread_ts in expired:
+                del self._threads[thread_ts]
+        return len(expired)
+
+    def __len__(self) -> int:
+        # Expired entries would otherwise be counted until the next get()
+        self.evict_expired()
+        return len(self._threads)
+
+
+class SQLiteThreadRegistry(ThreadRegistry):
+    """
+    Registry stored in SQLite, shared by every process using the same file
+
+    The database runs in WAL mode so readers in other processes do not
+    block writers. Expired rows are filtered out on read and deleted every
+    evict_every inserts. Registries with different namespaces (e.g. one
+    per workspace) keep their threads in separate tables of the same file.
+
+    Args:
+        path: SQLite database file
+        ttl: Seconds a thread stays registered (None or 0 = forever)
+        evict_every: Run evict_expired() after this many inserts
+        namespace: Letters, digits and underscores naming a separate set of
+            threads (default: the shared slack_threads table)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS {table} (
+            thread_ts TEXT PRIMARY KEY,
+            channel TEXT NOT NULL,
+            initial_message TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_{table}_channel_ts
+            ON {table} (channel, thread_ts);
+        CREATE INDEX IF NOT EXISTS idx_{table}_created_at
+            ON {table} (created_at);
+    """
+
+    def __init__(self, path: str, ttl: float = None, evict_every: int = 1000, namespace: str = None):
+        if namespace is not None and not re.fullmatch(r'\w+', namespace, re.ASCII):
+            raise ValueError(f"Invalid thread registry namespace: {namespace!r}")
+        self.path = path
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self.namespace = namespace
+        # Table names cannot be bound as parameters; the namespace is checked above
+        self.table = f'slack_threads_{namespace}' if namespace else 'slack_threads'
+        self._inserts = 0
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA.format(table=self.table))
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl if self.ttl else 0.0
+
+    def get(self, thread_ts: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            f'SELECT channel, initial_message FROM {self.table} '
+            'WHERE thread_ts = ? AND created_at >= ?',
+            (thread_ts, self._cutoff())
+        ).fetchone()
+        if row is None:
+            return default
+        return {'channel': row[0], 'initial_message': row[1]}
+
+    def set(self, thread_ts: str, info: Dict[str, Any]):
+        self._conn().execute(
+            f'INSERT OR REPLACE INTO {self.table} '
+            '(thread_ts, channel, initial_message, created_at) VALUES (?, ?, ?, ?)',
+            (thread_ts, info['channel'], info.get('initial_message'), time.time())
+        )
+        self._inserts += 1
+        if self.ttl and self._inserts % self.evict_every == 0:
+            self.evict_expired()
+
+    def delete(self, thread_ts: str):
+        self._conn().execute(f'DELETE FROM {self.table} WHERE thread_ts = ?', (thread_ts,))
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        rows = self._conn().execute(
+            f'SELECT thread_ts, channel, initial_message FROM {self.table} '
+            'WHERE created_at >= ? ORDER BY created_at',
+            (self._cutoff(),)
+        )
+        for thread_ts, channel, initial_message in rows:
+            yield thread_ts, {'channel': channel, 'initial_message': initial_message}
+
+    def evict_expired(self) -> int:
+        if not self.ttl:
+            return 0
+        cursor = self._conn().execute(
+            f'DELETE FROM {self.table} WHERE created_at < ?', (self._cutoff(),)
+        )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._conn().execute(
+            f'SELECT COUNT(*) FROM {self.table} WHERE created_at >= ?', (self._cutoff(),)
+        ).fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def sqlite_path(database_uri: str) -> str:
+    """
+    Get the file path from a sqlite:/// database URI
+
+    Args:
+        database_uri: URI such as 'sqlite:///slack_messages.db'
+
+    Returns:
+        Path usable with sqlite3.connect
+    """
+    prefix = 'sqlite:///'
+    if not database_uri.startswith(prefix):
+        raise ValueError(f"Only sqlite:/// database URIs are supported, got {database_uri}")
+    return database_uri[len(prefix):] or ':memory:'
+
+
+def create_thread_registry(backend: str = None, namespace: str = None) -> ThreadRegistry:
+    """
+    Build the thread registry selected in Config
+
+    Args:
+        backend: 'memory' or 'sqlite' (defaults to Config.THREAD_REGISTRY_BACKEND)
+        namespace: Keeps the threads apart from other registries in the same
+            SQLite file, e.g. a team ID (memory registries are never shared)
+
+    Returns:
+        ThreadRegistry instance
+    """
+    backend = backend or Config.THREAD_REGISTRY_BACKEND
+    ttl = Config.THREAD_REGISTRY_TTL or None
+    if backend == 'sqlite':
+        return SQLiteThreadRegistry(sqlite_path(Config.SQLALCHEMY_DATABASE_URI), ttl=ttl, namespace=namespace)
+    if backend == 'memory':
+        return MemoryThreadRegistry(max_size=Config.THREAD_REGISTRY_MAX_SIZE, ttl=ttl)
+    raise ValueError(f"Unknown thread registry backend: {backend}")
@@ -0,0 +1,163 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_digest(file_path: str = None, file_content: bytes = None) -> str:
+    """
+    BLAKE2b digest of a file's bytes
+
+    Args:
+        file_path: Path to local file (read in chunks)
+        file_content: File bytes content
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    if file_path:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    else:
+        digest.update(file_content)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """
+    Index of already-uploaded file contents: digest -> Slack file
+
+    Lets a repeat upload of identical bytes be replaced by a message that
+    links the existing file. Entries expire after ttl seconds and the
+    least recently used ones are dropped beyond max_entries (checked every
+    evict_every inserts). The index is stored in SQLite, so it survives
+    restarts when given a file path.
+
+    Args:
+        path: SQLite database file (':memory:' for a per-process cache)
+        max_entries: Maximum number of files remembered
+        ttl: Seconds an entry stays valid (None or 0 = forever)
+        evict_every: Run eviction after this many inserts
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS upload_cache (
+            digest TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            permalink TEXT NOT NULL,
+            url TEXT,
+            size INTEGER,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_upload_cache_last_used
+            ON upload_cache (last_used);
+        CREATE INDEX IF NOT EXISTS idx_upload_cache_created_at
+            ON upload_cache (created_at);
+    """
+
+    def __init__(
+        self,
+        path: str = ':memory:',
+        max_entries: int = 10000,
+        ttl: float = 30 * 24 * 3600,
+        evict_every: int = 100
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self._puts = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl if self.ttl else 0.0
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a previously uploaded file by content digest
+
+        Args:
+            digest: content_digest() of the bytes
+
+        Returns:
+            Dict with file_id, permalink and url, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT file_id, permalink, url FROM upload_cache '
+                'WHERE digest = ? AND created_at >= ?',
+                (digest, self._cutoff())
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute(
+                'UPDATE upload_cache SET last_used = ? WHERE digest = ?',
+                (time.time(), digest)
+            )
+            self.stats['hits'] += 1
+            return {'file_id': row[0], 'permalink': row[1], 'url': row[2]}
+
+    def put(self, digest: str, file_id: str, permalink: str, url: str = None, size: int = None):
+        """
+        Remember an uploaded file
+
+        Args:
+            digest: content_digest() of the bytes
+            file_id: Slack file ID
+            permalink: Slack permalink for the file
+            url: url_private of the file
+            size: Size in bytes
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO upload_cache '
+                '(digest, file_id, permalink, url, size, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (digest, file_id, permalink, url, size, now, now)
+            )
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self):
+        # Caller holds self._lock
+        evicted = self._conn.execute(
+            'DELETE FROM upload_cache WHERE created_at < ?', (self._cutoff(),)
+        ).rowcount
+        if self.max_entries:
+            evicted += self._conn.execute(
+                'DELETE FROM upload_cache WHERE digest IN ('
+                'SELECT digest FROM upload_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+        self.stats['evictions'] += evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            hits, misses, evictions, hit_rate and current entries
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = self._conn.execute('SELECT COUNT(*) FROM upload_cache').fetchone()[0]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        self._conn.close()